@@ -0,0 +1,144 @@
+"""
+Measures peak RSS of ingesting one PDF the old way (load every page, split,
+embed all chunks at once) against the streaming paths: ingest_document and the
+bulk pipeline (run_ingestion_pipeline, used by `manage.py ingest` and the task
+queue), whose parse workers send page windows instead of whole documents.
+
+Each mode runs in a fresh process so ru_maxrss is its own high-water mark; for
+the pipeline, the peak of its largest parse worker is shown too. The streaming
+modes write to a throwaway database and Chroma directory. Embeddings are
+computed with a local fake model of Gemini's dimension (768), so no API calls
+are made.
+
+Usage:
+    python benchmark_ingest_memory.py                      # synthetic 1500-page PDF
+    python benchmark_ingest_memory.py --pages 3000
+    python benchmark_ingest_memory.py --pdf media/source_documents/big.pdf --window 20
+"""
+import os
+import sys
+import time
+import argparse
+import shutil
+import resource
+import tempfile
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_pdf(path, pages):
+    import fitz
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        for line in range(45):
+            page.insert_text(
+                (40, 40 + line * 17),
+                f"Page {i + 1} clause {line}: the Islamic financial institution shall ensure that "
+                f"the asset is owned before it is sold ({i * line})."
+            )
+    doc.save(path)
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def setup_scratch(workdir, submitter):
+    """Django on a throwaway database, media and Chroma directory, with fake embeddings."""
+    import django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+    from django.conf import settings
+    from django.core.management import call_command
+    from evidence_engine import ingestion, pipeline
+
+    settings.DATABASES['default']['NAME'] = os.path.join(workdir, "db.sqlite3")
+    settings.MEDIA_ROOT = os.path.join(workdir, "media")
+    call_command('migrate', verbosity=0)
+    ingestion.CHROMA_DB_DIR = os.path.join(workdir, "chroma")
+    ingestion._submitter = submitter
+    get_vectorstore = ingestion.get_vectorstore
+    pipeline.get_vectorstore = ingestion.get_vectorstore = (
+        lambda embeddings=None, collection_name=None: get_vectorstore(submitter.embeddings, collection_name)
+    )
+
+
+def add_document(pdf_path):
+    from django.conf import settings
+    from evidence_engine.models import SourceDocument
+
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, "source_documents"))
+    shutil.copy(pdf_path, os.path.join(settings.MEDIA_ROOT, "source_documents", "bench.pdf"))
+    doc = SourceDocument.objects.create(title="bench", authority="BNM")
+    doc.file_path.name = "source_documents/bench.pdf"
+    doc.save()
+    return doc
+
+
+def run_mode(mode, pdf_path, window, result_queue):
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from evidence_engine.embedding import EmbeddingSubmitter
+
+    submitter = EmbeddingSubmitter(DeterministicFakeEmbedding(size=768), concurrency=1, rate_per_min=10 ** 9)
+    workdir = tempfile.mkdtemp(prefix="bench_ingest_")
+    try:
+        if mode != "whole":
+            setup_scratch(workdir, submitter)
+            from django.conf import settings
+            settings.INGEST_PAGE_WINDOW = window
+            doc = add_document(pdf_path)
+        started = time.monotonic()
+        chunks = 0
+        if mode == "whole":
+            from evidence_engine.parsing import parse_and_split
+            _, splits, ids, _ = parse_and_split(pdf_path, "bench", "BNM", "")
+            vectors = submitter.embed([s.page_content for s in splits])
+            chunks = len(vectors)
+        elif mode == "document":
+            from evidence_engine.ingestion import ingest_document
+            ingest_document(doc, force=True)
+            doc.refresh_from_db()
+            chunks = doc.chunk_count
+        else:
+            from evidence_engine.pipeline import run_ingestion_pipeline
+            run_ingestion_pipeline([doc], workers=1, force=True)
+            doc.refresh_from_db()
+            chunks = doc.chunk_count
+        workers = peak_rss_mb(resource.RUSAGE_CHILDREN) if mode == "pipeline" else None
+        result_queue.put((mode, chunks, time.monotonic() - started, peak_rss_mb(), workers))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to measure (default: generate a synthetic one)")
+    parser.add_argument("--pages", type=int, default=1500, help="Pages in the synthetic PDF")
+    parser.add_argument("--window", type=int, default=20, help="Pages per streaming window")
+    args = parser.parse_args()
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.gettempdir(), f"bench_ingest_{args.pages}p.pdf")
+        if not os.path.exists(pdf_path):
+            print(f"Generating {args.pages}-page test PDF at {pdf_path}...")
+            make_pdf(pdf_path, args.pages)
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    print(f"\n{'mode':<10} {'chunks':>8} {'seconds':>8} {'peak RSS':>10} {'parse worker':>13}")
+    for mode in ("whole", "document", "pipeline"):
+        proc = ctx.Process(target=run_mode, args=(mode, pdf_path, args.window, results))
+        proc.start()
+        name, chunks, seconds, peak, workers = results.get()
+        proc.join()
+        worker_peak = f"{workers:>10.0f} MB" if workers is not None else f"{'-':>13}"
+        print(f"{name:<10} {chunks:>8} {seconds:>8.1f} {peak:>8.0f} MB {worker_peak}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Measures how much faster EvidenceGenerator opens and renders a normalized PDF
+(evidence_engine/normalize.py) than the file as published.
+
+For each file it times:
+  open    fitz.open + loading a page (parses the xref chain and page tree)
+  render  EvidenceGenerator.generate_evidence on sample pages (open, highlight,
+          render at 1.5x, write the PNG), i.e. what every answer with evidence pays
+
+Without --pdf a synthetic "badly structured" PDF is generated: uncompressed
+streams, a font and image object duplicated on every page, and a chain of
+incremental updates, as some scraped publisher files have.
+
+Usage:
+    python benchmark_pdf_normalize.py
+    python benchmark_pdf_normalize.py --pdf media/source_documents/policy.pdf --repeat 20
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import django
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+import fitz
+from django.conf import settings
+from evidence_engine.services import EvidenceGenerator
+from evidence_engine.normalize import normalize_pdf
+
+
+def make_pdf(path, pages, updates):
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 300, 300), 0)
+    pixmap.set_rect(pixmap.irect, (200, 200, 230))
+    logo = pixmap.tobytes("png")
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        # Inserted separately on every page, so each page gets its own copy
+        page.insert_image(fitz.Rect(450, 20, 550, 120), stream=logo)
+        for line in range(45):
+            page.insert_text(
+                (40, 140 + line * 14),
+                f"Page {i + 1} clause {line}: the Islamic financial institution shall ensure that "
+                f"the asset is owned before it is sold ({i * line}).",
+                fontsize=9,
+            )
+    doc.save(path, garbage=0, deflate=False)
+    doc.close()
+    # Publishers' tools often append edits instead of rewriting the file
+    for n in range(updates):
+        doc = fitz.open(path)
+        doc[n % pages].insert_text((40, 800), f"Revision {n + 1}", fontsize=6)
+        doc.set_metadata({"title": f"Policy document rev {n + 1}"})
+        doc.save(path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+        doc.close()
+
+
+def time_open(path, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fitz.TOOLS.store_shrink(100)  # no cached objects from the previous run
+        with fitz.open(path) as doc:
+            doc.load_page(len(doc) // 2)
+    return (time.perf_counter() - started) / repeat
+
+
+def time_render(path, pages, repeat):
+    generator = EvidenceGenerator()
+    started = time.perf_counter()
+    for page_number in pages[:repeat]:
+        fitz.TOOLS.store_shrink(100)
+        generator.generate_evidence(path, page_number, "the asset is owned before it is sold")
+    return (time.perf_counter() - started) / min(repeat, len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to measure (default: generate a synthetic one)")
+    parser.add_argument("--pages", type=int, default=300, help="Pages in the synthetic PDF")
+    parser.add_argument("--updates", type=int, default=50, help="Incremental updates in the synthetic PDF")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per measurement")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_normalize_")
+    settings.MEDIA_ROOT = workdir  # evidence PNGs land here, not in the real media folder
+    original = args.pdf
+    if not original:
+        original = os.path.join(workdir, f"published_{args.pages}p.pdf")
+        print(f"Generating {args.pages}-page test PDF with {args.updates} incremental updates...")
+        make_pdf(original, args.pages, args.updates)
+    normalized = os.path.join(workdir, "normalized.pdf")
+
+    started = time.perf_counter()
+    before, after = normalize_pdf(original, normalized)
+    print(f"Normalized in {time.perf_counter() - started:.2f}s: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+    with fitz.open(original) as doc:
+        page_count = len(doc)
+    pages = random.Random(1).sample(range(1, page_count + 1), min(args.repeat, page_count))
+
+    print(f"\n{'file':<12} {'open':>10} {'render':>10}")
+    results = {}
+    for name, path in (("published", original), ("normalized", normalized)):
+        results[name] = (time_open(path, args.repeat), time_render(path, pages, args.repeat))
+        print(f"{name:<12} {results[name][0] * 1000:>8.1f}ms {results[name][1] * 1000:>8.1f}ms")
+    (open_a, render_a), (open_b, render_b) = results["published"], results["normalized"]
+    print(f"{'speedup':<12} {open_a / open_b:>9.1f}x {render_a / render_b:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
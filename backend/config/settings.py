@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -123,3 +124,138 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+
+# RAG pipeline
+
+# Per-endpoint request deadlines in seconds ('default' applies to anything not listed).
+RAG_DEADLINES = {
+    'default': 30.0,
+    'chat_message': 25.0,
+}
+
+# Minimum seconds that must remain before a stage is allowed to run at full strength.
+RAG_STAGE_BUDGETS = {
+    'retrieval': 3.0,     # below this, retrieve fewer chunks
+    'rerank': 6.0,        # below this, skip FlashRank reranking
+    'generation': 4.0,    # below this, skip the LLM and return raw context
+    'evidence': 1.5,      # per evidence image (render + DB write)
+    'summary': 8.0,       # below this, defer the conversation summary update
+}
+
+# Enough for the largest route context below; routes trim it down.
+RAG_RETRIEVAL_K = 20
+RAG_RETRIEVAL_K_DEGRADED = 5
+
+# FlashRank was aggressively downranking English/Malay hybrid documents, so it is off by default.
+RAG_RERANK_ENABLED = False
+
+# Conversation memory: the last N turns are sent verbatim, older ones as a rolling summary.
+CHAT_MEMORY_TURNS = 3
+CHAT_MEMORY_MESSAGE_CHARS = 600
+CHAT_SUMMARY_MAX_CHARS = 1500
+CHAT_SUMMARY_MODEL = 'gemini-2.0-flash'
+# Questions up to this many words that refer back (a pronoun, "and ...", "what about ...", no topic
+# of their own) are searched together with the previous question (memory.is_follow_up).
+CHAT_FOLLOWUP_MAX_WORDS = 8
+
+# Extractive fast path for definition/lookup questions (skips the LLM).
+# Chroma returns distances (lower is closer). Off until the thresholds below are
+# calibrated on a labelled eval set with `python tune_extractive.py <eval.jsonl>`.
+EXTRACTIVE_ENABLED = False
+EXTRACTIVE_MAX_DISTANCE = 0.30
+EXTRACTIVE_MIN_MARGIN = 0.02
+
+# Model routing: the first rule whose 'when' conditions all hold picks the model and
+# how many retrieved chunks go into the prompt. Conditions: query_type (lookup /
+# comparison / general), min_words, max_words, max_top_distance, min_spread, max_spread.
+RAG_ROUTES = [
+    {
+        'name': 'lookup',
+        'model': 'gemini-2.0-flash-lite',
+        'context_k': 5,
+        'when': {'query_type': ['lookup'], 'max_words': 12, 'max_top_distance': 0.5},
+    },
+    {
+        'name': 'comparison',
+        'model': 'gemini-2.0-flash',
+        'context_k': 20,
+        'when': {'query_type': ['comparison']},
+    },
+    {
+        'name': 'focused',
+        'model': 'gemini-2.0-flash',
+        'context_k': 8,
+        'when': {'min_spread': 0.25},
+    },
+    {
+        'name': 'default',
+        'model': 'gemini-2.0-flash',
+        'context_k': 15,
+    },
+]
+
+# Forces every route onto one model, e.g. a local stand-in when measuring routes.
+RAG_MODEL_OVERRIDE = os.getenv('RAG_MODEL_OVERRIDE')
+
+# One JSON line per answered question with route, model and latency (see routing_report.py).
+# Off by default: the file grows with every request. Questions are logged as a hash and length only.
+RAG_ROUTING_LOG_ENABLED = os.getenv('RAG_ROUTING_LOG_ENABLED', 'false').lower() == 'true'
+RAG_ROUTING_LOG = BASE_DIR / 'routing_log.jsonl'
+
+# Minimum rapidfuzz partial_ratio (0-100) for the LLM QUOTE to be mapped back to a chunk.
+QUOTE_MATCH_MIN_SCORE = 85
+
+# Embedding submitter shared by all ingestion paths (evidence_engine/embedding.py).
+# The rate adapts to 429 / RESOURCE_EXHAUSTED responses; this is the starting point.
+EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_MAX_BATCH_CHARS = 100000
+EMBEDDING_CONCURRENCY = 4
+EMBEDDING_RATE_PER_MIN = 1500  # texts per minute
+EMBEDDING_MAX_RETRIES = 8
+# Chunk embeddings cached by (model, text hash) as float32 blobs; survives wiping chroma_db.
+# Set to None to disable.
+EMBEDDING_CACHE_PATH = BASE_DIR / 'embedding_cache.sqlite3'
+
+# Parallel ingestion pipeline (evidence_engine/pipeline.py).
+INGEST_WORKERS = None  # parse/split processes, None = all cores
+INGEST_QUEUE_SIZE = 8  # page windows / write batches buffered between stages
+INGEST_WRITE_BATCH_SIZE = 256  # chunks per Chroma upsert / checkpoint
+INGEST_PAGE_WINDOW = 20  # pages parsed, split and embedded at a time (ingest_document and the pipeline)
+# Remove running headers/footers/page numbers repeated across pages before chunking.
+INGEST_STRIP_BOILERPLATE = True
+# Write a compacted copy of each PDF (evidence_engine/normalize.py) that evidence images are
+# rendered from; the original stays as published. See benchmark_pdf_normalize.py.
+INGEST_NORMALIZE_PDF = False
+# Near-duplicate chunks across documents are stored once (MinHash/LSH, evidence_engine/dedupe.py).
+DEDUPE_ENABLED = True
+DEDUPE_THRESHOLD = 0.9  # estimated Jaccard similarity of 5-word shingles
+
+# Chroma server, e.g. `chroma run --path chroma_db --port 8001`. A local chroma_db/ directory
+# supports one writing process at a time, so without a server, task workers (and `manage.py
+# ingest`) take turns on vector-writing tasks (tasks.VectorWriterLock). With a server set,
+# every process goes through it and workers write concurrently.
+CHROMA_SERVER_HOST = os.getenv('CHROMA_SERVER_HOST', '')
+CHROMA_SERVER_PORT = int(os.getenv('CHROMA_SERVER_PORT', '8001'))
+
+# Durable background task queue (evidence_engine/tasks.py, `manage.py taskworker`).
+TASK_VISIBILITY_TIMEOUT = 600  # seconds a worker holds a task without renewing its lease
+TASK_HEARTBEAT_INTERVAL = 60  # seconds between lease renewals while a task runs (well under the timeout)
+TASK_MAX_ATTEMPTS = 3
+TASK_RETRY_BACKOFF = 60  # seconds before the first retry, doubled on each further attempt
+TASK_POLL_INTERVAL = 5  # seconds an idle worker waits before checking the queue again
+
+# Blue/green vector collection rebuilds (evidence_engine/vector_collections.py).
+VECTOR_COLLECTIONS_KEEP = 1  # retired versions kept for rollback
+VECTOR_VALIDATION_PROBES = 20  # stored vectors searched for by themselves before a switch
+
+# Scraper downloads (scrapers/fetch.py): pooled HTTP client instead of browser downloads.
+SCRAPER_CONCURRENCY = 8  # downloads in flight across all hosts
+SCRAPER_PER_HOST_CONCURRENCY = 4
+SCRAPER_TIMEOUT = 60  # seconds per request
+SCRAPER_USER_AGENT = "Mozilla/5.0 (compatible; Al-Muwathiq document collector)"
+SCRAPER_HOST_MIN_INTERVAL = 0.25  # seconds between requests started against one host
+# Modules whose scrapers (@register, scrapers/base.py) `manage.py scrape` runs, one per authority
+SCRAPER_MODULES = [
+    'scrapers.bnm_scraper',
+]
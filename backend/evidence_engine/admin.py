@@ -1,18 +1,26 @@
 from django.contrib import admin, messages
-from .models import SourceDocument, ChatSession, ChatMessage, EvidenceArtifact
-from .ingestion import ingest_document
+from django.utils import timezone
+from .models import (
+    SourceDocument, ChatSession, ChatMessage, EvidenceArtifact, IngestionRun, IngestionCheckpoint,
+    BackgroundTask, VectorCollection, DocumentAlias,
+)
+from .tasks import enqueue
 
 @admin.action(description='Ingest selected documents into Vector DB')
 def ingest_documents(modeladmin, request, queryset):
-    count = 0
-    for doc in queryset:
-        try:
-            ingest_document(doc)
-            count += 1
-        except Exception as e:
-            modeladmin.message_user(request, f"Error ingesting {doc.title}: {e}", level=messages.ERROR)
-    
-    modeladmin.message_user(request, f"Successfully ingested {count} documents.", level=messages.SUCCESS)
+    # Runs in a `manage.py taskworker` process, not in this request
+    doc_ids = [str(pk) for pk in queryset.values_list('id', flat=True)]
+    task = enqueue('ingest_documents', {'doc_ids': doc_ids, 'force': False})
+    modeladmin.message_user(
+        request,
+        f"Queued ingestion of {len(doc_ids)} documents (task {task.id}). Progress is shown under Background tasks.",
+        level=messages.SUCCESS
+    )
+
+class DocumentAliasInline(admin.TabularInline):
+    model = DocumentAlias
+    extra = 0
+    readonly_fields = ('url', 'created_at')
 
 @admin.register(SourceDocument)
 class SourceDocumentAdmin(admin.ModelAdmin):
@@ -20,6 +28,7 @@ class SourceDocumentAdmin(admin.ModelAdmin):
     list_filter = ('authority', 'is_active')
     search_fields = ('title',)
     actions = [ingest_documents]
+    inlines = [DocumentAliasInline]
 
 @admin.register(EvidenceArtifact)
 class EvidenceArtifactAdmin(admin.ModelAdmin):
@@ -35,3 +44,51 @@ class ChatMessageInline(admin.TabularInline):
 class ChatSessionAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'started_at')
     inlines = [ChatMessageInline]
+
+class IngestionCheckpointInline(admin.TabularInline):
+    model = IngestionCheckpoint
+    extra = 0
+    readonly_fields = ('source_doc', 'status', 'batches_done', 'batches_total', 'chunks_written', 'error', 'updated_at')
+
+@admin.register(IngestionRun)
+class IngestionRunAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'status', 'finished_at')
+    list_filter = ('status',)
+    inlines = [IngestionCheckpointInline]
+
+@admin.action(description='Retry selected tasks now')
+def retry_tasks(modeladmin, request, queryset):
+    count = queryset.exclude(status=BackgroundTask.Status.RUNNING).update(
+        status=BackgroundTask.Status.QUEUED, attempts=0, run_after=timezone.now(), finished_at=None
+    )
+    modeladmin.message_user(request, f"Re-queued {count} tasks.", level=messages.SUCCESS)
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'progress', 'progress_message', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('locked_by', 'locked_until', 'result', 'error', 'created_at', 'updated_at', 'finished_at')
+    actions = [retry_tasks]
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        return f"{obj.progress_done}/{obj.progress_total}"
+
+@admin.action(description='Activate selected collection (caught up and validated first)')
+def activate_collection(modeladmin, request, queryset):
+    if queryset.count() != 1:
+        modeladmin.message_user(request, "Select exactly one collection.", level=messages.ERROR)
+        return
+    record = queryset.get()
+    task = enqueue('rebuild_vectors', {'activate': True, 'name': record.name}, unique=True)
+    modeladmin.message_user(
+        request, f"Queued activation of {record.name} (task {task.id}).", level=messages.SUCCESS
+    )
+
+@admin.register(VectorCollection)
+class VectorCollectionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'chunk_count', 'created_at', 'activated_at', 'retired_at')
+    list_filter = ('status',)
+    readonly_fields = ('name', 'status', 'chunk_count', 'synced_at', 'report', 'error',
+                       'created_at', 'activated_at', 'retired_at')
+    actions = [activate_collection]
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class EvidenceEngineConfig(AppConfig):
     name = 'evidence_engine'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,65 @@
+"""
+Detects running headers, footers, page numbers and disclaimers, i.e. lines that
+repeat near the top or bottom of most pages of a document, so they can be
+stripped before chunking. No Django here (runs in parse worker processes).
+"""
+import re
+from collections import Counter
+
+DIGITS = re.compile(r"\d+")
+# Lines counted as the top or bottom of a page
+EDGE_LINES = 4
+
+
+def normalize_line(line):
+    """Case- and whitespace-insensitive key; numbers are masked so 'Page 3 of 40' matches 'Page 4 of 40'."""
+    return DIGITS.sub("#", " ".join(line.split()).lower())
+
+
+def edge_indexes(lines, edge_lines=EDGE_LINES):
+    """Indexes of the first and last `edge_lines` non-empty lines."""
+    content = [i for i, line in enumerate(lines) if line.strip()]
+    return set(content[:edge_lines] + content[-edge_lines:])
+
+
+def detect_boilerplate(page_texts, edge_lines=EDGE_LINES, min_ratio=0.5, min_pages=3):
+    """
+    Returns the set of normalized lines that appear within `edge_lines` of the
+    top or bottom of at least `min_ratio` of the pages (and at least `min_pages`
+    pages). page_texts may be any iterable, so pages can be streamed.
+
+    A line that occurs twice on one page is treated as a content pattern (e.g.
+    numbered rows of a table that only differ by their numbers), never boilerplate.
+    """
+    counts = Counter()
+    in_body = set()
+    pages = 0
+    for text in page_texts:
+        pages += 1
+        lines = [normalize_line(line) for line in text.splitlines() if line.strip()]
+        page_counts = Counter(lines)
+        in_body.update(line for line, n in page_counts.items() if n > 1)
+        counts.update(set(lines[:edge_lines] + lines[-edge_lines:]))
+    if pages < min_pages:
+        return set()
+    threshold = max(min_pages, min_ratio * pages)
+    return {line for line, n in counts.items() if line and n >= threshold and line not in in_body}
+
+
+def strip_boilerplate(text, boilerplate, edge_lines=EDGE_LINES):
+    """
+    Removes boilerplate lines within `edge_lines` of the top or bottom of a
+    page's text; the same line in the body (e.g. a title quoted in the text)
+    is content and stays. Returns (text, lines_removed).
+    """
+    if not boilerplate:
+        return text, 0
+    lines = text.splitlines()
+    edges = edge_indexes(lines, edge_lines)
+    kept, removed = [], 0
+    for i, line in enumerate(lines):
+        if i in edges and normalize_line(line) in boilerplate:
+            removed += 1
+            continue
+        kept.append(line)
+    return "\n".join(kept).strip(), removed
@@ -0,0 +1,120 @@
+"""
+Incremental consistency check between SourceDocuments and ChromaDB.
+
+Each document records how many chunks it left in Chroma at its last ingestion
+(SourceDocument.chunk_count) and when its chunks were last found in order
+(checked_at). Only documents ingested, deactivated or never checked since the
+last pass get a per-document ID lookup. For all the others the recorded counts
+are summed and compared with the collection's total in one call; only if that
+aggregate is off are they looked up one by one as well. Chunks nobody accounts
+for are found with a metadata filter on the Chroma side, so only those (not
+every record of the collection) are loaded into Python.
+"""
+from django.utils import timezone
+from .models import SourceDocument
+
+
+def needs_check(doc):
+    """True if the document changed (or was never checked) since its last clean check."""
+    return doc.checked_at is None or (doc.ingested_at is not None and doc.ingested_at > doc.checked_at)
+
+
+def expected_chunks(doc):
+    return doc.chunk_count if doc.is_active and doc.is_ingested else 0
+
+
+def _check_documents(collection, docs, report):
+    """
+    Looks up the stored chunks of each document. Fills report['mismatched'] and
+    report['baselined'] and returns (chunks found, IDs of documents found in order).
+    """
+    found, clean = 0, []
+    for doc in docs:
+        expected = expected_chunks(doc)
+        actual = len(collection.get(where={"source_doc_id": str(doc.id)}, include=[])["ids"])
+        found += actual
+        if doc.is_active and doc.is_ingested and doc.chunk_count == 0 and actual:
+            SourceDocument.objects.filter(id=doc.id).update(chunk_count=actual)
+            report["baselined"].append(doc)
+            clean.append(doc.id)
+        elif actual != expected and (doc.is_ingested or not doc.is_active):
+            report["mismatched"].append((doc, expected, actual))
+        # A document still being ingested is not an inconsistency, but not checked either
+        elif doc.is_ingested or not doc.is_active:
+            clean.append(doc.id)
+    return found, clean
+
+
+def _unaccounted(collection, doc_ids):
+    """(ghost_ids, unattributed) for chunks whose source_doc_id is none of doc_ids."""
+    # $nin also matches chunks with no source_doc_id at all, which are not ghosts
+    where = {"source_doc_id": {"$nin": doc_ids}} if doc_ids else None
+    unaccounted = collection.get(where=where, include=["metadatas"])
+    ghost_ids = [
+        id_ for id_, metadata in zip(unaccounted["ids"], unaccounted["metadatas"])
+        if (metadata or {}).get("source_doc_id")
+    ]
+    return ghost_ids, len(unaccounted["ids"]) - len(ghost_ids)
+
+
+def check_consistency(vectorstore, full=False):
+    """
+    Returns a report dict:
+      mismatched: [(doc, expected, actual)] for documents whose stored chunks differ
+      ghost_ids: chunk IDs whose source_doc_id matches no SourceDocument
+      unattributed: chunks without a source_doc_id (bulk scripts such as ingest.py)
+      baselined: documents ingested before chunk counts were recorded; their
+                 current count is taken as the baseline
+      checked: documents looked up one by one (all of them with full=True)
+      total: chunks in the collection
+    """
+    collection = vectorstore._collection
+    started = timezone.now()
+    report = {"mismatched": [], "ghost_ids": [], "unattributed": 0, "baselined": [], "checked": 0}
+    docs = list(SourceDocument.objects.only(
+        'id', 'title', 'is_active', 'is_ingested', 'chunk_count', 'ingested_at', 'checked_at'
+    ))
+    doc_ids = [str(doc.id) for doc in docs]
+    changed = [doc for doc in docs if full or needs_check(doc)]
+    unchanged = [doc for doc in docs if not (full or needs_check(doc))]
+
+    accounted, clean = _check_documents(collection, changed, report)
+    accounted += sum(expected_chunks(doc) for doc in unchanged)
+    total = collection.count()
+    ghost_ids, unattributed = _unaccounted(collection, doc_ids) if total > accounted else ([], 0)
+    if unchanged and total != accounted + len(ghost_ids) + unattributed:
+        # Some unchanged document's chunks moved (e.g. shared chunks re-homed to it): find which
+        found, clean_unchanged = _check_documents(collection, unchanged, report)
+        accounted += found - sum(expected_chunks(doc) for doc in unchanged)
+        clean += clean_unchanged
+        changed += unchanged
+        ghost_ids, unattributed = _unaccounted(collection, doc_ids) if total > accounted else ([], 0)
+
+    for start in range(0, len(clean), 500):
+        SourceDocument.objects.filter(id__in=clean[start:start + 500]).update(checked_at=started)
+    report.update(ghost_ids=ghost_ids, unattributed=unattributed, checked=len(changed), total=total)
+    return report
+
+
+def repair(vectorstore, report):
+    """
+    Deletes ghost chunks, removes leftovers of inactive documents and queues
+    active documents whose chunks are off for re-ingestion. Returns the queued task, if any.
+    """
+    from .ingestion import remove_document_chunks
+    from .tasks import enqueue
+
+    if report["ghost_ids"]:
+        for start in range(0, len(report["ghost_ids"]), 500):
+            vectorstore.delete(ids=report["ghost_ids"][start:start + 500])
+
+    to_ingest = []
+    for doc, expected, actual in report["mismatched"]:
+        if not doc.is_active:
+            remove_document_chunks(vectorstore, doc.id)
+        else:
+            to_ingest.append(str(doc.id))
+    if to_ingest:
+        # force: the file hash is unchanged, but the stored chunks are not right
+        return enqueue('ingest_documents', {'doc_ids': to_ingest, 'force': True})
+    return None
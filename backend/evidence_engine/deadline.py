@@ -0,0 +1,48 @@
+import time
+from django.conf import settings
+
+
+class Deadline:
+    """
+    Wall-clock budget for a single RAG request.
+
+    Every stage of the pipeline asks the deadline how much time is left before
+    starting and degrades (fewer chunks, no reranking, fewer evidence images)
+    instead of running past it. Stages that were cut are recorded so the API
+    response can report them.
+    """
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds if seconds else None
+        self.stages_cut = []
+
+    @classmethod
+    def for_endpoint(cls, endpoint):
+        """
+        Builds a deadline from settings.RAG_DEADLINES, falling back to the 'default' budget.
+        """
+        budgets = getattr(settings, 'RAG_DEADLINES', {})
+        return cls(budgets.get(endpoint, budgets.get('default')))
+
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def remaining(self):
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def allows(self, stage):
+        """
+        True if there is still enough time left to run the given stage,
+        according to settings.RAG_STAGE_BUDGETS (seconds a stage needs).
+        """
+        needed = getattr(settings, 'RAG_STAGE_BUDGETS', {}).get(stage, 0)
+        return self.remaining() >= needed
+
+    def cut(self, stage, detail=""):
+        """Records that a stage was skipped or reduced to stay within the budget."""
+        print(f"DEBUG: Deadline cut '{stage}' after {self.elapsed():.2f}s {detail}".rstrip())
+        self.stages_cut.append({"stage": stage, "detail": detail})
@@ -0,0 +1,252 @@
+"""
+Cross-document near-duplicate elimination for chunks.
+
+BNM, AAOIFI and IFSB documents (and superseded versions of the same document)
+share long passages. Before embedding, every new chunk's MinHash signature is
+looked up in an LSH index of the chunks already stored. A chunk that is a
+near-duplicate of one of them is not embedded or stored; a ChunkOccurrence
+records where it appears instead, so evidence can still point to any (and the
+most authoritative) copy.
+"""
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from .models import SourceDocument, ChunkFingerprint, ChunkBand, ChunkOccurrence
+from . import minhash
+
+
+class NearDuplicateIndex:
+    """
+    LSH lookup over stored chunk fingerprints, plus chunks accepted earlier in
+    the same run that are not written yet (so duplicates across documents of one
+    batch are caught too).
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = settings.DEDUPE_THRESHOLD if threshold is None else threshold
+        self.pending = defaultdict(list)  # band key -> [(chunk_id, signature)]
+
+    def lookup(self, keys, batch_size=500):
+        """
+        Stored fingerprints sharing any of the band keys, as {key: [(chunk_id, signature)]}.
+        One query per batch_size keys, so a whole window of chunks is looked up at once.
+        """
+        keys = list(set(keys))
+        found, signatures = defaultdict(list), {}
+        for start in range(0, len(keys), batch_size):
+            rows = ChunkBand.objects.filter(key__in=keys[start:start + batch_size]).values_list(
+                'key', 'fingerprint__chunk_id', 'fingerprint__signature'
+            )
+            for key, chunk_id, blob in rows:
+                if chunk_id not in signatures:
+                    signatures[chunk_id] = minhash.from_bytes(blob)
+                found[key].append((chunk_id, signatures[chunk_id]))
+        return found
+
+    def find(self, sig, keys, exclude_ids=(), stored=None):
+        """
+        Returns (canonical_chunk_id, similarity) of the closest match above the threshold, or None.
+        stored: the result of lookup() for these keys (or more); queried here if not given.
+        """
+        if stored is None:
+            stored = self.lookup(keys)
+        candidates = {}
+        for key in keys:
+            for chunk_id, other in self.pending.get(key, ()):
+                candidates[chunk_id] = other
+        for key in keys:
+            for chunk_id, other in stored.get(key, ()):
+                candidates.setdefault(chunk_id, other)
+
+        best = None
+        for chunk_id, other in candidates.items():
+            if chunk_id in exclude_ids:
+                continue
+            score = minhash.similarity(sig, other)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (chunk_id, score)
+        return best
+
+    def register(self, chunk_id, sig, keys):
+        for key in keys:
+            self.pending[key].append((chunk_id, sig))
+
+
+def dedupe_chunks(index, splits, ids):
+    """
+    Splits new chunks into those to embed and store, and near-duplicates of
+    chunks already stored (or accepted earlier in this run).
+    Returns (keep_splits, keep_ids, signatures, duplicates); signatures align
+    with keep_ids and duplicates is a list of (split, chunk_id, canonical_id, similarity).
+    """
+    keep_splits, keep_ids, signatures, duplicates = [], [], [], []
+    sigs = [minhash.signature(split.page_content) for split in splits]
+    keys_per_chunk = [minhash.band_keys(sig) for sig in sigs]
+    # Candidates of the whole window in one lookup instead of one query per chunk
+    stored = index.lookup([key for keys in keys_per_chunk for key in keys])
+    for split, id_, sig, keys in zip(splits, ids, sigs, keys_per_chunk):
+        match = index.find(sig, keys, exclude_ids={id_}, stored=stored)
+        if match:
+            duplicates.append((split, id_, match[0], match[1]))
+            continue
+        index.register(id_, sig, keys)
+        keep_splits.append(split)
+        keep_ids.append(id_)
+        signatures.append(sig)
+    return keep_splits, keep_ids, signatures, duplicates
+
+
+def save_fingerprints(source_doc, splits, ids, signatures):
+    """Adds stored chunks to the persistent LSH index."""
+    existing = set(ChunkFingerprint.objects.filter(chunk_id__in=ids).values_list('chunk_id', flat=True))
+    fingerprints, bands = [], []
+    for split, id_, sig in zip(splits, ids, signatures):
+        if id_ in existing:
+            continue
+        fingerprint = ChunkFingerprint(
+            chunk_id=id_,
+            source_doc=source_doc,
+            page_number=split.metadata.get('page_number', 0),
+            signature=minhash.to_bytes(sig)
+        )
+        fingerprints.append(fingerprint)
+        bands.extend(ChunkBand(fingerprint=fingerprint, key=key) for key in minhash.band_keys(sig))
+    with transaction.atomic():
+        ChunkFingerprint.objects.bulk_create(fingerprints)
+        ChunkBand.objects.bulk_create(bands)
+
+
+def save_occurrences(source_doc, duplicates):
+    """
+    Records back-references for chunks that were not stored. Returns the number
+    whose canonical chunk is missing (its document failed to write); those
+    need the document to be ingested again.
+    """
+    canonical = dict(
+        ChunkFingerprint.objects.filter(chunk_id__in={d[2] for d in duplicates}).values_list('chunk_id', 'id')
+    )
+    missing = 0
+    for split, id_, canonical_id, score in duplicates:
+        if canonical_id not in canonical:
+            missing += 1
+            continue
+        ChunkOccurrence.objects.update_or_create(
+            source_doc=source_doc,
+            chunk_id=id_,
+            defaults={
+                'canonical_id': canonical[canonical_id],
+                'page_number': split.metadata.get('page_number', 0),
+                'start_index': split.metadata.get('start_index', 0),
+                'similarity': score,
+            }
+        )
+    return missing
+
+
+def prune_occurrences(source_doc, current_ids, keep_pages=(), pages=None):
+    """
+    Drops back-references of a document's chunks that no longer exist in its
+    current file. Those on keep_pages (unchanged pages that were not re-split)
+    stay; if pages is given, only those pages are pruned.
+    """
+    current_ids = set(current_ids)
+    occurrences = source_doc.chunk_occurrences.exclude(page_number__in=list(keep_pages))
+    if pages is not None:
+        occurrences = occurrences.filter(page_number__in=list(pages))
+    obsolete = [pk for pk, chunk_id in occurrences.values_list('id', 'chunk_id') if chunk_id not in current_ids]
+    for start in range(0, len(obsolete), 500):
+        ChunkOccurrence.objects.filter(id__in=obsolete[start:start + 500]).delete()
+
+
+def release_chunks(vectorstore, chunk_ids):
+    """
+    Call before deleting stored chunks. A chunk that other places still refer to
+    is re-homed: its vector is copied (not re-embedded) under the ID and metadata
+    of one of its occurrences, which becomes the new canonical copy. The caller
+    then deletes the old IDs as usual.
+    """
+    return store_rehomed(vectorstore, rehome_chunks(vectorstore, chunk_ids))
+
+
+def rehome_chunks(vectorstore, chunk_ids):
+    """
+    The database half of release_chunks: re-points each shared chunk's fingerprint
+    to its heir occurrence and reads the vector to copy. Chroma is only read, so
+    this can run inside a transaction that may still roll back. Returns the
+    copies for store_rehomed(): [(heir_chunk_id, embedding, metadata, document)].
+    """
+    fingerprints = ChunkFingerprint.objects.filter(
+        chunk_id__in=list(chunk_ids)
+    ).prefetch_related('occurrences__source_doc')
+    copies, dropped = [], []
+    for fingerprint in fingerprints:
+        occurrences = sorted(
+            fingerprint.occurrences.all(), key=lambda o: (authority_rank(o.source_doc), -o.similarity)
+        )
+        if not occurrences:
+            dropped.append(fingerprint.id)
+            continue
+        heir = occurrences[0]
+        stored = vectorstore._collection.get(
+            ids=[fingerprint.chunk_id], include=['embeddings', 'documents', 'metadatas']
+        )
+        if not stored['ids']:
+            dropped.append(fingerprint.id)
+            continue
+        heir_doc = heir.source_doc
+        metadata = dict(stored['metadatas'][0])
+        metadata.update(
+            source_doc_id=str(heir_doc.id),
+            authority=heir_doc.authority,
+            source_url=heir_doc.source_url or "",
+            page_number=heir.page_number,
+            page=heir.page_number - 1,
+            start_index=heir.start_index,
+        )
+        # Word offsets belong to the old page
+        metadata.pop('word_start', None)
+        metadata.pop('word_end', None)
+        copies.append((heir.chunk_id, stored['embeddings'][0], metadata, stored['documents'][0]))
+        with transaction.atomic():
+            # A new row rather than an update: when the owning document is being deleted,
+            # Django has already collected the old row for the cascade by primary key
+            heir_fingerprint = ChunkFingerprint.objects.create(
+                chunk_id=heir.chunk_id, source_doc=heir_doc,
+                page_number=heir.page_number, signature=fingerprint.signature,
+            )
+            ChunkBand.objects.filter(fingerprint=fingerprint).update(fingerprint=heir_fingerprint)
+            fingerprint.occurrences.exclude(id=heir.id).update(canonical=heir_fingerprint)
+            heir.delete()
+            fingerprint.delete()
+            SourceDocument.objects.filter(id=heir_doc.id).update(chunk_count=F('chunk_count') + 1)
+    ChunkFingerprint.objects.filter(id__in=dropped).delete()
+    return copies
+
+
+def store_rehomed(vectorstore, copies):
+    """The Chroma half of release_chunks: writes the re-homed copies. Returns how many."""
+    if copies:
+        heir_ids, embeddings, metadatas, documents = zip(*copies)
+        vectorstore._collection.upsert(
+            ids=list(heir_ids), embeddings=list(embeddings), metadatas=list(metadatas), documents=list(documents)
+        )
+        print(f"Re-homed {len(copies)} shared chunks to a remaining copy before deletion.")
+    return len(copies)
+
+
+def occurrences_for(chunk_ids):
+    """Maps stored chunk IDs to the ChunkOccurrences (with their documents) that share them."""
+    result = defaultdict(list)
+    occurrences = ChunkOccurrence.objects.filter(
+        canonical__chunk_id__in=list(chunk_ids)
+    ).select_related('source_doc', 'canonical')
+    for occurrence in occurrences:
+        result[occurrence.canonical.chunk_id].append(occurrence)
+    return result
+
+
+def authority_rank(source_doc):
+    """Sort key: active documents first, then the most recently published."""
+    published = source_doc.publication_date.toordinal() if source_doc.publication_date else 0
+    return (not source_doc.is_active, -published)
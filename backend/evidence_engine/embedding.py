@@ -0,0 +1,162 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def is_rate_limit_error(error):
+    """Gemini reports quota exhaustion as HTTP 429 / RESOURCE_EXHAUSTED."""
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message
+
+
+class AdaptiveTokenBucket:
+    """
+    Thread-safe token bucket (one token per text embedded) whose refill rate adapts
+    to the quota: it creeps up after every successful call and halves on each
+    429 / RESOURCE_EXHAUSTED, so throughput settles just under the real ceiling.
+    """
+
+    def __init__(self, rate_per_min, min_rate_per_min=None, max_rate_per_min=None, capacity=None):
+        self.rate = rate_per_min / 60.0
+        self.min_rate = (min_rate_per_min or rate_per_min / 16) / 60.0
+        self.max_rate = (max_rate_per_min or rate_per_min * 2) / 60.0
+        self.capacity = capacity or max(1.0, self.rate * 10)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, n=1):
+        """Blocks until n tokens are available, then takes them."""
+        n = min(n, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        # Additive increase: +1% of the ceiling per successful call
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.01)
+
+    def on_throttle(self):
+        # Multiplicative decrease, and drain the bucket so every worker backs off
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0
+            self.updated_at = time.monotonic()
+
+    def rate_per_min(self):
+        return self.rate * 60
+
+
+class EmbeddingSubmitter:
+    """
+    Shared embedding front-end for every ingestion path.
+
+    Packs texts into batches bounded by count and characters, embeds up to
+    `concurrency` batches at once, and paces them with an AdaptiveTokenBucket
+    so a corpus is ingested close to the Gemini quota ceiling. With an
+    EmbeddingCache, texts embedded before are served from disk and never sent.
+    """
+
+    def __init__(self, embeddings, batch_size=100, max_batch_chars=100000,
+                 concurrency=4, rate_per_min=1500, max_retries=8, cache=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = getattr(embeddings, "model", type(embeddings).__name__)
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.bucket = AdaptiveTokenBucket(rate_per_min)
+        self.calls = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_settings(cls, embeddings):
+        from django.conf import settings
+        from .embedding_cache import EmbeddingCache
+        cache_path = getattr(settings, 'EMBEDDING_CACHE_PATH', None)
+        return cls(
+            embeddings,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            max_batch_chars=settings.EMBEDDING_MAX_BATCH_CHARS,
+            concurrency=settings.EMBEDDING_CONCURRENCY,
+            rate_per_min=settings.EMBEDDING_RATE_PER_MIN,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+            cache=EmbeddingCache(cache_path) if cache_path else None,
+        )
+
+    def make_batches(self, texts):
+        """Greedily packs texts into (start, end) ranges within the count and size limits."""
+        batches = []
+        start, chars = 0, 0
+        for i, text in enumerate(texts):
+            if i > start and (i - start >= self.batch_size or chars + len(text) > self.max_batch_chars):
+                batches.append((start, i))
+                start, chars = i, 0
+            chars += len(text)
+        if start < len(texts):
+            batches.append((start, len(texts)))
+        return batches
+
+    def _embed_batch(self, texts):
+        for attempt in range(self.max_retries):
+            self.bucket.acquire(len(texts))
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                self.calls += 1
+                self.bucket.on_success()
+                return vectors
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self.throttled += 1
+                self.bucket.on_throttle()
+                delay = min(60.0, 2 ** attempt) * (0.5 + random.random())
+                print(f"⏳ Embedding quota hit, rate now {self.bucket.rate_per_min():.0f}/min. "
+                      f"Retrying batch in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+        raise RuntimeError(f"Embedding batch still rate limited after {self.max_retries} attempts")
+
+    def embed(self, texts):
+        """
+        Returns vectors in input order, serving cached texts from disk and
+        embedding only the rest.
+        """
+        texts = list(texts)
+        if not texts or self.cache is None:
+            return self._embed_uncached(texts)
+
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Identical texts (repeated boilerplate) are only sent once
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            fresh = dict(zip(missing_texts, self._embed_uncached(missing_texts)))
+            self.cache.put_many(self.model_name, missing_texts, [fresh[t] for t in missing_texts])
+            for i in missing:
+                vectors[i] = fresh[texts[i]]
+        return vectors
+
+    def _embed_uncached(self, texts):
+        """Embeds texts concurrently and returns the vectors in input order."""
+        if not texts:
+            return []
+        batches = self.make_batches(texts)
+        if len(batches) == 1 or self.concurrency <= 1:
+            results = [self._embed_batch(texts[s:e]) for s, e in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                results = list(pool.map(lambda b: self._embed_batch(texts[b[0]:b[1]]), batches))
+        return [vector for batch in results for vector in batch]
@@ -0,0 +1,77 @@
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of chunk embeddings keyed by (embedding model, SHA-256 of the text).
+
+    Vectors are stored as packed float32 blobs in a small SQLite file that lives
+    outside chroma_db, so wiping or rebuilding the vector store (reset_chroma.py,
+    fresh_ingest.py, chunking changes) re-embeds only text that was never seen before.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash BLOB NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash)"
+            ") WITHOUT ROWID"
+        )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    @staticmethod
+    def _pack(vector):
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _unpack(blob):
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def get_many(self, model, texts):
+        """Returns a list aligned with texts holding cached vectors or None."""
+        hashes = [self.text_hash(t) for t in texts]
+        found = {}
+        with self.lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                found.update(rows)
+        result = [self._unpack(found[h]) if h in found else None for h in hashes]
+        hit_count = sum(1 for v in result if v is not None)
+        self.hits += hit_count
+        self.misses += len(result) - hit_count
+        return result
+
+    def put_many(self, model, texts, vectors):
+        rows = [(model, self.text_hash(t), self._pack(v)) for t, v in zip(texts, vectors)]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,117 @@
+import re
+from django.conf import settings
+
+# Query shapes that ask for a definition or a simple lookup of a single term.
+LOOKUP_PATTERNS = [
+    re.compile(r"^(?:what\s+is|what's|what\s+are)\s+(?:the\s+)?(?:meaning|definition)\s+of\s+(?P<term>.+)$", re.I),
+    re.compile(r"^(?:define|definition\s+of|meaning\s+of)\s+(?P<term>.+)$", re.I),
+    re.compile(r"^(?:what\s+is|what\s+are|what's|who\s+is)\s+(?:a\s+|an\s+|the\s+)?(?P<term>[\w'\- ]{2,40})$", re.I),
+]
+
+# Phrases that mark a sentence as definitional, strongest first.
+DEFINITION_CUES = [
+    "is defined as", "shall mean", "means", "refers to", "is a", "is an", "is the", "are",
+]
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.;:])\s+|\n{2,}")
+
+# Terms too vague to look up: pronouns and filler ("what is it?", "what is this?")
+VAGUE_TERMS = {
+    "it", "its", "this", "that", "these", "those", "they", "them", "there", "here", "he", "she",
+    "one", "ones", "thing", "things", "something", "anything", "everything", "what", "which",
+    "ini", "itu", "tersebut", "ia", "mereka",
+}
+MIN_TERM_LENGTH = 3
+
+
+def usable_term(term):
+    """
+    True if the term is specific enough to find its definition in a chunk.
+    """
+    words = term.lower().split()
+    return len(term) >= MIN_TERM_LENGTH and not all(word in VAGUE_TERMS for word in words)
+
+
+def term_pattern(term):
+    """
+    Whole-word, case-insensitive pattern for the term ("riba" does not match "ribawi").
+    """
+    return re.compile(r"\b" + r"\s+".join(re.escape(word) for word in term.split()) + r"\b", re.I)
+
+
+def match_lookup(query):
+    """
+    Returns the looked-up term if the query is a definition/lookup question, else None.
+    """
+    cleaned = query.strip().rstrip("?!. ").strip()
+    for pattern in LOOKUP_PATTERNS:
+        m = pattern.match(cleaned)
+        if m:
+            term = m.group("term").strip()
+            # Comparisons and multi-part questions need the LLM
+            if re.search(r"\b(and|vs|versus|difference|compare|between)\b", term, re.I):
+                return None
+            return term if usable_term(term) else None
+    return None
+
+
+def best_sentence(term, text):
+    """
+    Picks the sentence in a chunk that best defines the term, or None if no
+    sentence mentions it.
+    """
+    if not usable_term(term):
+        return None
+    mention = term_pattern(term)
+    # "<term> <cue>" scores by cue strength; a generic cue elsewhere in the sentence scores 1
+    term_cues = [
+        (re.compile(mention.pattern + r"\s+" + re.escape(cue) + r"\b", re.I), len(DEFINITION_CUES) - rank + 1)
+        for rank, cue in enumerate(DEFINITION_CUES)
+    ]
+    generic_cue = re.compile(r"\b(?:" + "|".join(re.escape(cue) for cue in DEFINITION_CUES) + r")\b", re.I)
+    best, best_score = None, 0
+    for raw in SENTENCE_SPLIT.split(text):
+        sentence = " ".join(raw.split())
+        if len(sentence) < 20 or not mention.search(sentence):
+            continue
+        cue_score = max((weight for pattern, weight in term_cues if pattern.search(sentence)), default=0)
+        if not cue_score and generic_cue.search(sentence):
+            cue_score = 1
+        score = 1 + cue_score
+        if score > best_score:
+            best, best_score = sentence, score
+    return best
+
+
+def is_confident(hits, max_distance=None, min_margin=None):
+    """
+    True if the top hit is close enough (Chroma returns distances, lower is better)
+    and clearly ahead of the runner-up.
+    """
+    if not hits:
+        return False
+    max_distance = settings.EXTRACTIVE_MAX_DISTANCE if max_distance is None else max_distance
+    min_margin = settings.EXTRACTIVE_MIN_MARGIN if min_margin is None else min_margin
+    top_score = hits[0][1]
+    if top_score > max_distance:
+        return False
+    if len(hits) > 1 and hits[1][1] - top_score < min_margin:
+        return False
+    return True
+
+
+def extract_answer(query, hits, max_distance=None, min_margin=None):
+    """
+    Confidence-gated fast path: for lookups with a very close top hit, returns
+    (sentence, doc, score) built straight from the best chunk, else None.
+    """
+    if not settings.EXTRACTIVE_ENABLED:
+        return None
+    term = match_lookup(query)
+    if not term or not is_confident(hits, max_distance, min_margin):
+        return None
+    doc, score = hits[0]
+    sentence = best_sentence(term, doc.page_content)
+    if not sentence:
+        return None
+    return sentence, doc, score
@@ -1,69 +1,372 @@
 import os
-import shutil
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from django.conf import settings
-from .models import SourceDocument
+from django.db.models import Q
+from django.utils import timezone
+from .models import SourceDocument, DocumentPage, VectorCollection
+from .embedding import EmbeddingSubmitter
+from .parsing import file_sha256, iter_page_windows, describe_reduction, changed_pages
+from .layout import pack_layout
+from .normalize import normalize_pdf
+from .dedupe import (
+    NearDuplicateIndex, dedupe_chunks, save_fingerprints, save_occurrences, prune_occurrences, release_chunks,
+)
 
 # Persistence directory
 CHROMA_DB_DIR = os.path.join(settings.BASE_DIR, 'chroma_db')
+# Collection used until the first versioned rebuild is activated (see vector_collections.py)
+COLLECTION_NAME = "al_muwathiq_standards"
 
-def ingest_document(source_doc: SourceDocument):
+# One submitter per process so the adaptive rate it learns carries across documents
+_submitter = None
+# One HTTP client per process when a Chroma server is configured
+_chroma_client = None
+
+
+def active_collection_name():
+    """Name of the collection currently serving ingestion and retrieval."""
+    name = VectorCollection.objects.filter(
+        status=VectorCollection.Status.ACTIVE
+    ).values_list('name', flat=True).first()
+    return name or COLLECTION_NAME
+
+
+def get_vectorstore(embeddings=None, collection_name=None):
+    """
+    Opens the shared Chroma collection used by both ingestion and retrieval:
+    the active one unless collection_name is given (e.g. a rebuild in progress).
+    """
+    if embeddings is None:
+        # Initialize Embeddings (using Google GenAI to match ingestion pipeline)
+        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    if settings.CHROMA_SERVER_HOST:
+        return Chroma(
+            collection_name=collection_name or active_collection_name(),
+            embedding_function=embeddings,
+            client=chroma_client()
+        )
+    return Chroma(
+        collection_name=collection_name or active_collection_name(),
+        embedding_function=embeddings,
+        persist_directory=CHROMA_DB_DIR
+    )
+
+
+def chroma_client():
+    """HTTP client for settings.CHROMA_SERVER_HOST, shared by the process."""
+    global _chroma_client
+    if _chroma_client is None:
+        import chromadb
+        _chroma_client = chromadb.HttpClient(host=settings.CHROMA_SERVER_HOST, port=settings.CHROMA_SERVER_PORT)
+    return _chroma_client
+
+
+def get_embedding_submitter():
+    """Returns the process-wide EmbeddingSubmitter (batched, concurrent, rate limited)."""
+    global _submitter
+    if _submitter is None:
+        _submitter = EmbeddingSubmitter.from_settings(
+            GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        )
+    return _submitter
+
+
+def store_chunks(vectorstore, splits, ids, vectors=None):
+    """
+    Upserts chunks into Chroma. Vectors are computed through the shared
+    submitter unless they were already embedded (e.g. by the pipeline).
+    """
+    texts = [split.page_content for split in splits]
+    if vectors is None:
+        vectors = get_embedding_submitter().embed(texts)
+    vectorstore._collection.upsert(
+        ids=ids,
+        embeddings=vectors,
+        metadatas=[split.metadata for split in splits],
+        documents=texts
+    )
+
+
+def count_document_chunks(vectorstore, source_doc_id):
+    return len(vectorstore.get(where={"source_doc_id": str(source_doc_id)}, include=[])["ids"])
+
+
+def remove_document_chunks(vectorstore, source_doc_id):
+    """
+    Deletes every chunk belonging to a SourceDocument from the collection. Chunks
+    other documents share (see dedupe.py) are re-homed to one of them first.
+    Returns the number of chunks removed.
+    """
+    ids = vectorstore.get(where={"source_doc_id": str(source_doc_id)}, include=[])["ids"]
+    if ids:
+        release_chunks(vectorstore, ids)
+        vectorstore.delete(ids=ids)
+    return len(ids)
+
+
+def remove_stale_chunks(vectorstore, where, current_ids):
+    """
+    Deletes the chunks matching `where` that are not in current_ids. Chunks other
+    documents share (see dedupe.py) are re-homed to one of them first.
+    Returns the IDs removed.
+    """
+    stale = [id_ for id_ in vectorstore.get(where=where, include=[])["ids"] if id_ not in current_ids]
+    if stale:
+        release_chunks(vectorstore, stale)
+        vectorstore.delete(ids=stale)
+    return stale
+
+
+def write_windows(source_doc, vectorstore, windows, hashes, existing, index=None, reembed=False):
+    """
+    Writes the (splits, ids, layouts) windows of iter_page_windows: page layouts
+    are saved, and chunks not stored yet are embedded, or recorded as occurrences
+    of a stored near-duplicate when index is given (see dedupe.py). With
+    reembed=True, chunks in `existing` are embedded again under their IDs.
+    Returns (seen_ids, total, added, shared).
+    """
+    seen = set()
+    total = added = shared = 0
+    for splits, ids, layouts in windows:
+        save_page_layouts(source_doc, layouts, hashes)
+        fresh = [(split, id_) for split, id_ in zip(splits, ids) if id_ not in seen]
+        new_splits = [split for split, id_ in fresh if id_ not in existing]
+        new_ids = [id_ for _, id_ in fresh if id_ not in existing]
+        duplicates = []
+        if index:
+            new_splits, new_ids, signatures, duplicates = dedupe_chunks(index, new_splits, new_ids)
+        if new_splits:
+            store_chunks(vectorstore, new_splits, new_ids)
+            if index:
+                save_fingerprints(source_doc, new_splits, new_ids, signatures)
+        if reembed:
+            # Already stored (and canonical for any occurrences), so re-embedded as they are
+            stored = [(split, id_) for split, id_ in fresh if id_ in existing]
+            if stored:
+                store_chunks(vectorstore, [split for split, _ in stored], [id_ for _, id_ in stored])
+        if duplicates and save_occurrences(source_doc, duplicates):
+            raise RuntimeError(f"{source_doc.title}: shared chunks lost their stored copy, ingest again")
+        seen.update(ids)
+        total += len(ids)
+        added += len(new_ids)
+        shared += len(duplicates)
+    return seen, total, added, shared
+
+
+def save_page_layouts(source_doc, layouts, hashes=None):
+    """
+    Stores (or replaces) the word layout index of the given pages ({page_number: layout}),
+    with their content hashes from `hashes` ({page_number: hash}) if given.
+    """
+    if not layouts:
+        return
+    hashes = hashes or {}
+    DocumentPage.objects.filter(source_doc=source_doc, page_number__in=list(layouts)).delete()
+    DocumentPage.objects.bulk_create([
+        DocumentPage(
+            source_doc=source_doc,
+            page_number=page_number,
+            word_count=len(layout[0]),
+            layout=pack_layout(*layout),
+            content_hash=hashes.get(page_number, "")
+        )
+        for page_number, layout in layouts.items()
+    ])
+
+
+def prune_page_layouts(source_doc, page_count):
+    """Drops layouts of pages beyond the end of a (replaced, shorter) file."""
+    DocumentPage.objects.filter(source_doc=source_doc, page_number__gt=page_count).delete()
+
+
+def stored_page_hashes(source_doc):
+    """{page_number: content_hash} recorded at the last ingestion."""
+    return dict(source_doc.pages.exclude(content_hash="").values_list('page_number', 'content_hash'))
+
+
+def known_page_hashes(source_doc, force=False):
+    """
+    Page hashes that may be trusted to skip unchanged pages: only after a
+    completed ingestion (an interrupted one may have recorded pages whose chunks
+    were never written), and not when re-ingestion is forced.
+    """
+    if force or not source_doc.is_ingested:
+        return {}
+    return stored_page_hashes(source_doc)
+
+
+def changed_pages_where(source_doc_id, unchanged_pages):
+    """Chroma filter for a document's chunks, leaving out those on unchanged pages."""
+    where = {"source_doc_id": str(source_doc_id)}
+    if unchanged_pages:
+        where = {"$and": [where, {"page_number": {"$nin": sorted(unchanged_pages)}}]}
+    return where
+
+
+def invalidate_evidence(source_doc, pages, page_count=None):
+    """
+    Deletes cached evidence images of changed pages and, if page_count is given,
+    of pages beyond the end of the new file (the image files go with them, see signals.py).
+    """
+    stale_pages = Q(page_number__in=list(pages))
+    if page_count is not None:
+        stale_pages |= Q(page_number__gt=page_count)
+    stale = source_doc.evidence_artifacts.filter(stale_pages)
+    count = stale.count()
+    if count:
+        stale.delete()
+    return count
+
+
+def normalized_path(source_doc):
+    """Where the normalized copy of a document's file is written (absolute path)."""
+    return os.path.join(settings.MEDIA_ROOT, 'normalized_documents', f"{source_doc.id}.pdf")
+
+
+def set_normalized(source_doc, written):
+    """
+    Points normalized_file at the copy just written, or clears it (and removes any
+    older copy, which would no longer match the file) if normalization failed.
+    Saved with the document by mark_ingested.
+    """
+    path = normalized_path(source_doc)
+    if written:
+        source_doc.normalized_file.name = os.path.relpath(path, settings.MEDIA_ROOT)
+        return
+    source_doc.normalized_file.name = ""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def normalize_document(source_doc):
+    """
+    Writes the normalized copy used for evidence images (normalize.py). Optional:
+    if it fails, evidence is rendered from the original as before.
+    """
+    try:
+        before, after = normalize_pdf(source_doc.file_path.path, normalized_path(source_doc))
+    except Exception as e:
+        print(f"⚠️ {source_doc.title}: not normalized ({e})")
+        set_normalized(source_doc, False)
+        return False
+    set_normalized(source_doc, True)
+    print(f"Normalized {source_doc.title}: {before // 1024} KB -> {after // 1024} KB")
+    return True
+
+
+def needs_ingestion(source_doc, content_hash):
+    return not (source_doc.is_ingested and source_doc.content_hash == content_hash)
+
+
+def mark_ingesting(source_doc):
+    # The document stays marked as not ingested until all its chunks are in,
+    # so an interrupted run is simply completed next time.
+    if source_doc.is_ingested:
+        source_doc.is_ingested = False
+        source_doc.save(update_fields=['is_ingested'])
+
+
+def mark_ingested(source_doc, content_hash, chunk_count):
+    source_doc.chunk_count = chunk_count
+    source_doc.is_ingested = True
+    source_doc.ingested_at = timezone.now()
+    source_doc.content_hash = content_hash
+    source_doc.save()
+
+
+def ingest_document(source_doc: SourceDocument, force=False):
     """
     Ingests a SourceDocument into the Real ChromaDB.
+
+    Idempotent: files whose SHA-256 matches the last ingestion are skipped, and
+    chunks have deterministic IDs, so only new or changed chunks are embedded and
+    chunks that disappeared are deleted. Safe to run repeatedly (e.g. from the
+    scheduler or repair scripts).
+
+    Pages are streamed through the splitter and embedder INGEST_PAGE_WINDOW pages
+    at a time, so memory does not grow with the length of the document.
+    When a file is replaced, pages whose content hash is unchanged keep their
+    chunks untouched; only changed pages are re-chunked, and their old chunks
+    and evidence images are dropped.
+    Near-duplicates of chunks already stored (any document) are not embedded;
+    they are recorded as ChunkOccurrences of the stored copy (see dedupe.py).
+    Returns True if the document was (re-)ingested, False if it was skipped.
     """
     if not source_doc.file_path:
         print(f"Skipping {source_doc.title}: No file path.")
-        return
+        return False
 
     file_abs_path = source_doc.file_path.path
-    print(f"Ingesting: {file_abs_path}")
+    content_hash = file_sha256(file_abs_path)
+    if not force and not needs_ingestion(source_doc, content_hash):
+        print(f"Skipping {source_doc.title}: unchanged since last ingestion.")
+        return False
 
-    # 1. Load PDF
-    loader = PyMuPDFLoader(file_abs_path)
-    docs = loader.load()
-    print(f"Loaded {len(docs)} pages.")
+    print(f"Ingesting: {file_abs_path}")
+    print("Initializing Embeddings (Google GenAI)...")
+    vectorstore = get_vectorstore()
+    where = {"source_doc_id": str(source_doc.id)}
+    # Only IDs are held for the whole document; text and vectors live one window at a time
+    existing = set(vectorstore.get(where=where, include=[])["ids"])
+    index = NearDuplicateIndex() if settings.DEDUPE_ENABLED else None
+    stored_hashes = stored_page_hashes(source_doc)
+    known_hashes = known_page_hashes(source_doc, force)
 
-    # 2. Split Text
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        separators=["\n\n", "\n", " ", ""]
+    mark_ingesting(source_doc)
+    if settings.INGEST_NORMALIZE_PDF:
+        normalize_document(source_doc)
+    stats, hashes = {}, {}
+    windows = iter_page_windows(
+        file_abs_path, source_doc.id, source_doc.authority, source_doc.source_url,
+        window_pages=settings.INGEST_PAGE_WINDOW,
+        strip=settings.INGEST_STRIP_BOILERPLATE,
+        stats=stats,
+        known_hashes=known_hashes,
+        hashes=hashes
     )
-    splits = text_splitter.split_documents(docs)
-    print(f"Created {len(splits)} chunks.")
-
-    # 3. Store in ChromaDB
-    # Enrich metadata
-    for split in splits:
-        split.metadata['source_doc_id'] = str(source_doc.id)
-        split.metadata['authority'] = source_doc.authority
-        split.metadata['source_url'] = source_doc.source_url or ""
-        # Ensure page_number is 1-indexed (PyMuPDF is 0-indexed)
-        page_idx = split.metadata.get('page', 0)
-        split.metadata['page_number'] = page_idx + 1
-
-    # Initialize Embeddings (using a lightweight local model)
-    # Initialize Embeddings (using Google GenAI to match ingestion pipeline)
-    print("Initializing Embeddings (Google GenAI)...")
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    
-    # Initialize Vector Store
-    vectorstore = Chroma(
-        collection_name="al_muwathiq_standards",
-        embedding_function=embeddings,
-        persist_directory=CHROMA_DB_DIR
+    seen, total, added, shared = write_windows(source_doc, vectorstore, windows, hashes, existing, index)
+
+    page_count = len(hashes)
+    unchanged = [number for number, page_hash in hashes.items() if known_hashes.get(number) == page_hash]
+    if index:
+        prune_occurrences(source_doc, seen, keep_pages=unchanged)
+    # Chunks on unchanged pages were not re-split, so they are not in `seen` but still current
+    stale = remove_stale_chunks(vectorstore, changed_pages_where(source_doc.id, unchanged), seen)
+    prune_page_layouts(source_doc, page_count)
+    invalidated = invalidate_evidence(source_doc, changed_pages(hashes, stored_hashes), page_count)
+
+    mark_ingested(source_doc, content_hash, count_document_chunks(vectorstore, source_doc.id))
+
+    print(f"Upserted {total} chunks to ChromaDB at {CHROMA_DB_DIR} "
+          f"({added} new, {shared} shared with stored near-duplicates, {len(stale)} removed; "
+          f"{page_count - len(unchanged)} of {page_count} pages re-split, {invalidated} evidence images dropped)")
+    print(describe_reduction(stats, settings.EMBEDDING_BATCH_SIZE))
+    return True
+
+
+def reembed_page(source_doc: SourceDocument, page_number):
+    """
+    Re-embeds a single page in place, with the same dedupe and clean-up as
+    ingest_document: its chunks are embedded again under the same IDs, chunks
+    that no longer exist on the page are released and removed, and its
+    evidence images are dropped.
+    """
+    vectorstore = get_vectorstore()
+    where = {"$and": [{"source_doc_id": str(source_doc.id)}, {"page_number": page_number}]}
+    existing = set(vectorstore.get(where=where, include=[])["ids"])
+    index = NearDuplicateIndex() if settings.DEDUPE_ENABLED else None
+    hashes = {}
+    windows = iter_page_windows(
+        source_doc.file_path.path, source_doc.id, source_doc.authority, source_doc.source_url,
+        page_number=page_number, strip=settings.INGEST_STRIP_BOILERPLATE, hashes=hashes
     )
-    
-    # Add documents
-    vectorstore.add_documents(documents=splits)
-    
-    # 4. Mark as Ingested
-    source_doc.is_ingested = True
-    from django.utils import timezone
-    source_doc.ingested_at = timezone.now()
-    source_doc.save()
-    
-    print(f"Saved {len(splits)} chunks to ChromaDB at {CHROMA_DB_DIR}")
+    seen, total, added, shared = write_windows(source_doc, vectorstore, windows, hashes, existing, index, reembed=True)
+    if index:
+        prune_occurrences(source_doc, seen, pages=[page_number])
+    stale = remove_stale_chunks(vectorstore, where, seen)
+    invalidate_evidence(source_doc, [page_number])
+    source_doc.chunk_count = count_document_chunks(vectorstore, source_doc.id)
+    source_doc.save(update_fields=['chunk_count'])
+    print(f"Re-embedded page {page_number} of {source_doc.title}: {total} chunks "
+          f"({added} new, {shared} shared with stored near-duplicates), {len(stale)} removed")
@@ -0,0 +1,98 @@
+"""
+Word-level layout index, built once per page at ingestion (see parsing.py) so
+evidence highlighting is a lookup instead of a `page.search_for` at answer time.
+
+For every word on a page we keep its character span in the page text that was
+chunked and its bounding box. A chunk's `start_index` plus an offset inside the
+chunk therefore maps straight to the rectangles to highlight. No Django here,
+so it can run in parse worker processes.
+"""
+import zlib
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from .boilerplate import EDGE_LINES, normalize_line, edge_indexes
+
+# How far ahead of the previous word a word may be found in the page text before
+# it is treated as missing (ligatures, dehyphenation) rather than matched elsewhere.
+MAX_WORD_GAP = 200
+
+
+def build_page_layout(fitz_page, page_text, boilerplate=None, edge_lines=EDGE_LINES):
+    """
+    Aligns the page's words (page.get_text("words")) with page_text.
+    Words on lines in `boilerplate` within `edge_lines` of the top or bottom
+    were stripped from page_text (see boilerplate.strip_boilerplate) and are left out.
+    Returns (starts, ends, rects): character offsets into page_text and a flat
+    float list of x0, y0, x1, y1 per word.
+    """
+    words = fitz_page.get_text("words")
+    if boilerplate:
+        lines = {}
+        for w in words:
+            lines.setdefault((w[5], w[6]), []).append(w[4])
+        keys = list(lines)
+        texts = [" ".join(lines[key]) for key in keys]
+        dropped = {keys[i] for i in edge_indexes(texts, edge_lines) if normalize_line(texts[i]) in boilerplate}
+        words = [w for w in words if (w[5], w[6]) not in dropped]
+
+    starts, ends, rects = array("I"), array("I"), array("f")
+    cursor = 0
+    for x0, y0, x1, y1, word, *_ in words:
+        pos = page_text.find(word, cursor, cursor + MAX_WORD_GAP + len(word))
+        if pos < 0:
+            # Keep offsets monotonic; the word gets an empty span at the cursor
+            start = end = cursor
+        else:
+            start, end = pos, pos + len(word)
+            cursor = end
+        starts.append(start)
+        ends.append(end)
+        rects.extend((x0, y0, x1, y1))
+    return starts, ends, rects
+
+
+def pack_layout(starts, ends, rects):
+    """Serialises a page layout to a compact zlib-compressed blob."""
+    header = struct.pack("<I", len(starts))
+    return zlib.compress(header + starts.tobytes() + ends.tobytes() + rects.tobytes())
+
+
+def unpack_layout(blob):
+    data = zlib.decompress(bytes(blob))
+    (n,) = struct.unpack_from("<I", data)
+    starts, ends, rects = array("I"), array("I"), array("f")
+    offset = 4
+    starts.frombytes(data[offset:offset + 4 * n])
+    offset += 4 * n
+    ends.frombytes(data[offset:offset + 4 * n])
+    offset += 4 * n
+    rects.frombytes(data[offset:offset + 16 * n])
+    return starts, ends, rects
+
+
+def word_range(layout, start, end):
+    """Indices [first, last) of the words overlapping characters [start, end) of the page text."""
+    starts, ends, _ = layout
+    return bisect_right(ends, start), bisect_left(starts, end)
+
+
+def span_rects(layout, start, end):
+    """
+    Highlight rectangles (x0, y0, x1, y1) for characters [start, end) of the page
+    text. Words on the same line are merged into one rectangle.
+    """
+    _, _, rects = layout
+    first, last = word_range(layout, start, end)
+    lines = []
+    for i in range(first, last):
+        x0, y0, x1, y1 = rects[4 * i:4 * i + 4]
+        if lines:
+            lx0, ly0, lx1, ly1 = lines[-1]
+            # Same line if the boxes overlap vertically by more than half their height
+            overlap = min(ly1, y1) - max(ly0, y0)
+            if overlap > 0.5 * min(ly1 - ly0, y1 - y0) and x0 >= lx0:
+                lines[-1] = (lx0, min(ly0, y0), max(lx1, x1), max(ly1, y1))
+                continue
+        lines.append((x0, y0, x1, y1))
+    return lines
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from langchain_core.documents import Document
+from evidence_engine.ingestion import get_vectorstore
+from evidence_engine.models import SourceDocument, ChunkFingerprint
+from evidence_engine.dedupe import save_fingerprints
+from evidence_engine import minhash
+
+
+class Command(BaseCommand):
+    help = (
+        "Adds chunks stored before near-duplicate detection existed to the MinHash index, "
+        "so later ingestions are deduplicated against them. Makes no embedding calls."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=1000, help="Chunks read from Chroma at a time.")
+
+    def handle(self, *args, **opts):
+        collection = get_vectorstore()._collection
+        docs = {str(pk): doc for pk, doc in SourceDocument.objects.in_bulk().items()}
+        offset = added = 0
+        while True:
+            page = collection.get(limit=opts['page_size'], offset=offset, include=['documents', 'metadatas'])
+            if not page['ids']:
+                break
+            offset += len(page['ids'])
+            known = set(ChunkFingerprint.objects.filter(chunk_id__in=page['ids']).values_list('chunk_id', flat=True))
+
+            by_doc = {}
+            for id_, text, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                doc = docs.get((metadata or {}).get('source_doc_id'))
+                if id_ in known or doc is None or not text:
+                    continue
+                entry = by_doc.setdefault(doc.id, (doc, [], [], []))
+                entry[1].append(Document(page_content=text, metadata=metadata))
+                entry[2].append(id_)
+                entry[3].append(minhash.signature(text))
+
+            for doc, splits, ids, signatures in by_doc.values():
+                save_fingerprints(doc, splits, ids, signatures)
+                added += len(ids)
+            self.stdout.write(f"Scanned {offset} chunks, fingerprinted {added}...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {added} chunks added to the near-duplicate index."))
+
@@ -0,0 +1,115 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from evidence_engine.models import SourceDocument, IngestionRun, IngestionCheckpoint
+from evidence_engine.pipeline import run_ingestion_pipeline
+from evidence_engine.tasks import VectorWriterLock
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingests SourceDocuments into ChromaDB through the parallel pipeline, recording "
+        "per-document and per-batch checkpoints. An interrupted run is resumed automatically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only-changed', action='store_true',
+            help="Skip documents whose file hash is unchanged since their last ingestion."
+        )
+        parser.add_argument(
+            '--authority', choices=SourceDocument.Authority.values,
+            help="Only ingest documents from this authority."
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Parse/split worker processes (default: settings.INGEST_WORKERS or all cores)."
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignore any unfinished run and start a new one."
+        )
+
+    def handle(self, *args, **opts):
+        # Held until the command exits: task workers leave vector-writing tasks alone meanwhile
+        self.writer_lock = VectorWriterLock()
+        if not self.writer_lock.acquire():
+            raise CommandError(
+                "A task worker is writing to ChromaDB. Run this when it is done, "
+                "or serve Chroma with a server (settings.CHROMA_SERVER_HOST)."
+            )
+        run_options = {'only_changed': opts['only_changed'], 'authority': opts['authority']}
+
+        docs = SourceDocument.objects.filter(is_active=True)
+        if opts['authority']:
+            docs = docs.filter(authority=opts['authority'])
+
+        run = None
+        if not opts['restart']:
+            for candidate in IngestionRun.objects.filter(status=IngestionRun.Status.RUNNING).order_by('-started_at'):
+                if candidate.options == run_options:
+                    run = candidate
+                    break
+
+        if run:
+            finished = run.checkpoints.filter(
+                status__in=[IngestionCheckpoint.Status.DONE, IngestionCheckpoint.Status.SKIPPED]
+            ).values_list('source_doc_id', flat=True)
+            # Documents added since the run started are picked up too
+            known = set(run.checkpoints.values_list('source_doc_id', flat=True))
+            IngestionCheckpoint.objects.bulk_create([
+                IngestionCheckpoint(run=run, source_doc=doc) for doc in docs if doc.id not in known
+            ])
+            docs = docs.exclude(id__in=list(finished))
+            self.stdout.write(f"Resuming run from {run.started_at:%Y-%m-%d %H:%M} "
+                              f"({len(finished)} documents already finished).")
+        else:
+            run = IngestionRun.objects.create(options=run_options)
+            IngestionCheckpoint.objects.bulk_create([
+                IngestionCheckpoint(run=run, source_doc=doc) for doc in docs
+            ])
+            self.stdout.write(f"Started new ingestion run with {docs.count()} documents.")
+
+        checkpoints = {str(c.source_doc_id): c for c in run.checkpoints.all()}
+
+        def on_progress(event, doc_id, **info):
+            checkpoint = checkpoints[doc_id]
+            if event == 'start':
+                checkpoint.status = IngestionCheckpoint.Status.RUNNING
+                checkpoint.content_hash = info['content_hash']
+                checkpoint.batches_total = info['batches_total']
+                checkpoint.batches_done = 0
+                checkpoint.chunks_written = 0
+                checkpoint.error = ""
+            elif event == 'batch':
+                checkpoint.batches_done = info['batches_done']
+                checkpoint.chunks_written = info['chunks_written']
+            elif event == 'done':
+                checkpoint.status = IngestionCheckpoint.Status.DONE
+                checkpoint.batches_done = checkpoint.batches_total
+            elif event == 'skipped':
+                checkpoint.status = IngestionCheckpoint.Status.SKIPPED
+                checkpoint.content_hash = info['content_hash']
+            elif event == 'failed':
+                checkpoint.status = IngestionCheckpoint.Status.FAILED
+                checkpoint.error = info['error']
+            checkpoint.save()
+
+        # Without --only-changed every document is re-checked chunk by chunk; deterministic
+        # chunk IDs mean chunks already stored by an interrupted attempt are not re-embedded.
+        result = run_ingestion_pipeline(
+            list(docs),
+            workers=opts['workers'],
+            force=not opts['only_changed'],
+            on_progress=on_progress
+        )
+
+        if result['errors']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(result['errors'])} documents failed. Run the command again to retry them "
+                f"(or pass --restart to start over)."
+            ))
+        else:
+            run.status = IngestionRun.Status.COMPLETED
+            run.finished_at = timezone.now()
+            run.save()
+            self.stdout.write(self.style.SUCCESS("Ingestion run completed."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from evidence_engine.ingestion import normalize_document
+from evidence_engine.parsing import file_sha256
+from evidence_engine.models import SourceDocument
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the normalized copy (see evidence_engine/normalize.py) of documents ingested "
+        "without one, so their evidence images are rendered faster. Originals are not modified."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rewrite existing copies too.")
+
+    def handle(self, *args, **opts):
+        docs = SourceDocument.objects.filter(is_active=True, is_ingested=True).exclude(file_path="")
+        if not opts['all']:
+            docs = docs.filter(normalized_file="")
+        written = 0
+        for doc in docs:
+            if file_sha256(doc.file_path.path) != doc.content_hash:
+                # Evidence must match the pages that were ingested; the next ingestion normalizes it
+                self.stdout.write(f"Skipping {doc.title}: file changed since it was ingested.")
+                continue
+            if normalize_document(doc):
+                written += 1
+            doc.save(update_fields=['normalized_file'])
+        self.stdout.write(self.style.SUCCESS(f"Done: {written} of {len(docs)} documents normalized."))
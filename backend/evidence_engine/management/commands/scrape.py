@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from scrapers.base import load_scrapers
+from scrapers.engine import ScrapeEngine
+from evidence_engine.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Collects new documents with the registered scrapers (SCRAPER_MODULES, one per authority). "
+        "New documents are saved and queued for ingestion by `manage.py taskworker`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authority', action='append', help="Only this authority (repeatable). Default: all.")
+        parser.add_argument('--recheck', action='store_true',
+                            help="Also re-fetch stored documents (conditional GET) and replace republished files.")
+        parser.add_argument('--browser', action='store_true', help="Skip the plain-HTTP discovery.")
+        parser.add_argument('--queue', action='store_true', help="Queue the scrape as a background task instead.")
+        parser.add_argument('--list', action='store_true', help="List the registered scrapers.")
+
+    def handle(self, *args, **opts):
+        scrapers = load_scrapers()
+        if opts['list']:
+            for authority, scraper in sorted(scrapers.items()):
+                self.stdout.write(f"{authority:<8} {scraper.__name__:<20} {scraper.start_url}")
+            return
+
+        authorities = opts['authority']
+        unknown = set(authorities or []) - set(scrapers)
+        if unknown:
+            raise CommandError(f"No scraper for {', '.join(sorted(unknown))}. Registered: {', '.join(sorted(scrapers))}")
+
+        if opts['queue']:
+            task = enqueue('scrape', {'authorities': authorities, 'recheck': opts['recheck']}, unique=True)
+            self.stdout.write(self.style.SUCCESS(f"Queued scrape (task {task.id})."))
+            return
+
+        engine = ScrapeEngine(recheck=opts['recheck'], browser=opts['browser'])
+        self.stdout.write(f"{len(engine.known)} document URLs already stored.")
+        try:
+            totals = engine.run(authorities)
+        finally:
+            engine.close()
+        summary = ", ".join(f"{authority}: {count}" for authority, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"Done. New documents saved and queued for ingestion: {summary}"))
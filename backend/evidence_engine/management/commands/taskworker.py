@@ -0,0 +1,60 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from evidence_engine.tasks import (
+    HANDLERS, VECTOR_WRITER_KINDS, VectorWriterLock, claim_next, run_task, release, worker_name,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs background tasks (ingestion, scraping) from the durable task queue. "
+        "Start several of these processes to work on several tasks at once; without a Chroma "
+        "server (settings.CHROMA_SERVER_HOST), tasks that write vectors still run one at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', action='append', choices=sorted(HANDLERS),
+            help="Only run tasks of this kind (repeatable). Default: all kinds."
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit when the queue is empty instead of polling."
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help="Seconds to wait when the queue is empty (default: settings.TASK_POLL_INTERVAL)."
+        )
+
+    def handle(self, *args, **opts):
+        worker_id = worker_name()
+        poll_interval = opts['poll_interval'] or settings.TASK_POLL_INTERVAL
+        self.stdout.write(f"Task worker {worker_id} started.")
+
+        writer_lock = VectorWriterLock()
+        while True:
+            # While another worker writes vectors, only take tasks that do not
+            can_write = writer_lock.acquire()
+            task = claim_next(worker_id, kinds=opts['kind'], exclude_kinds=None if can_write else VECTOR_WRITER_KINDS)
+            if task is None or task.kind not in VECTOR_WRITER_KINDS:
+                writer_lock.release()
+            if task is None:
+                if opts['once']:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.stdout.write(f"▶ {task.kind} {task.id} (attempt {task.attempts}/{task.max_attempts})")
+            try:
+                ok = run_task(task, worker_id)
+            except KeyboardInterrupt:
+                release(task)
+                self.stdout.write(self.style.WARNING(f"Interrupted; task {task.id} returned to the queue."))
+                return
+            finally:
+                writer_lock.release()
+            if ok:
+                self.stdout.write(self.style.SUCCESS(f"✓ {task.kind} {task.id}"))
+
+        self.stdout.write("Queue empty, exiting.")
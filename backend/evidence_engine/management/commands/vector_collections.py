@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from evidence_engine import vector_collections
+from evidence_engine.models import VectorCollection
+from evidence_engine.tasks import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Blue/green rebuilds of the Chroma collection: build a new version while the "
+        "active one keeps serving, switch to it, roll back, or drop old versions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action', nargs='?', default='list', choices=['list', 'build', 'activate', 'rollback', 'cleanup'],
+        )
+        parser.add_argument('name', nargs='?', help="Collection to activate.")
+        parser.add_argument(
+            '--now', action='store_true',
+            help="Build in this process instead of queueing a task for `manage.py taskworker`."
+        )
+        parser.add_argument(
+            '--no-activate', action='store_true',
+            help="Only build and validate; activate later with `activate NAME`."
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Activate even if validation fails or an ingestion is running."
+        )
+        parser.add_argument('--keep', type=int, default=None, help="Retired versions to keep on cleanup.")
+
+    def handle(self, *args, **opts):
+        action = opts['action']
+        try:
+            if action == 'list':
+                vector_collections.current_collection()
+                for record in VectorCollection.objects.order_by('-created_at'):
+                    self.stdout.write(
+                        f"{record.status:9} {record.name:45} {record.chunk_count:>8} chunks  "
+                        f"created {record.created_at:%Y-%m-%d %H:%M}  {record.error[:80]}"
+                    )
+            elif action == 'build' and not opts['now']:
+                task = enqueue('rebuild_vectors', {'activate': not opts['no_activate']}, unique=True)
+                self.stdout.write(self.style.SUCCESS(f"Queued rebuild (task {task.id}); run `manage.py taskworker`."))
+            elif action == 'build':
+                record = vector_collections.build_collection()
+                if record.status == VectorCollection.Status.FAILED:
+                    raise CommandError(record.error)
+                if not opts['no_activate']:
+                    vector_collections.activate(record, force=opts['force'])
+                    vector_collections.cleanup(opts['keep'])
+            elif action == 'activate':
+                if not opts['name']:
+                    raise CommandError("Give the name of the collection to activate (see `vector_collections list`).")
+                record = VectorCollection.objects.filter(name=opts['name']).first()
+                if record is None:
+                    raise CommandError(f"Unknown collection: {opts['name']}")
+                vector_collections.activate(record, force=opts['force'])
+            elif action == 'rollback':
+                vector_collections.rollback(force=opts['force'])
+            elif action == 'cleanup':
+                dropped = vector_collections.cleanup(opts['keep'])
+                self.stdout.write(f"Dropped {len(dropped)} collections.")
+        except RuntimeError as e:
+            raise CommandError(str(e))
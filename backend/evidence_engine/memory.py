@@ -0,0 +1,163 @@
+import re
+from django.conf import settings
+from google.genai import types
+from .models import ChatMessage
+
+# Words that point back at an earlier turn ("is it allowed?", "what do they require?")
+FOLLOWUP_PRONOUNS = {
+    "it", "its", "this", "that", "these", "those", "they", "them", "their", "there",
+    "ini", "itu", "tersebut", "ia", "mereka",
+}
+# Openers that continue the previous question ("and in Malaysia?", "what about ijarah?")
+FOLLOWUP_OPENERS = ("and ", "what about ", "how about ")
+# Question and filler words; a question made only of these has no topic of its own ("why?", "explain more")
+NON_CONTENT_WORDS = {
+    "what", "which", "who", "whom", "whose", "how", "why", "when", "where", "is", "are", "was", "were",
+    "be", "do", "does", "did", "can", "could", "should", "would", "will", "may", "must", "the", "a", "an",
+    "of", "for", "in", "on", "to", "about", "and", "or", "so", "then", "also", "else", "more", "again",
+    "please", "tell", "me", "us", "explain", "elaborate", "detail", "details", "example", "examples",
+    "give", "show", "mean", "means", "yes", "no", "ok", "okay", "really", "sure", "any", "other", "same",
+} | FOLLOWUP_PRONOUNS
+
+
+def is_follow_up(query):
+    """
+    True if a question leans on the previous one: it refers back with a pronoun,
+    opens with "and" / "what about" / "how about", or has no content terms of its own.
+    """
+    text = query.strip().lower()
+    words = re.findall(r"[a-z]+", text)
+    if not words:
+        return False
+    if text.startswith(FOLLOWUP_OPENERS) or FOLLOWUP_PRONOUNS.intersection(words):
+        return True
+    return all(word in NON_CONTENT_WORDS for word in words)
+
+
+class ConversationMemory:
+    """
+    Bounded view of a ChatSession's history for follow-up questions.
+
+    Keeps the last N turns verbatim and folds everything older into a rolling
+    summary cached on the session. The summary is only extended with the
+    messages that left the window since the last update, so the prompt size
+    stays constant however long the session gets.
+    """
+
+    def __init__(self, session, exclude_message=None):
+        self.session = session
+        self.exclude_message = exclude_message
+        self.summary = session.summary
+        self.recent = []
+
+    def _messages(self):
+        qs = self.session.messages.order_by('timestamp', 'id')
+        if self.exclude_message is not None:
+            qs = qs.exclude(id=self.exclude_message.id)
+        return qs
+
+    def load(self, client=None, deadline=None):
+        """
+        Loads the recent window and brings the rolling summary up to date.
+        Only constant-size slices are fetched from the database.
+        """
+        window = settings.CHAT_MEMORY_TURNS * 2  # a turn is a USER + AI pair
+        qs = self._messages()
+        total = qs.count()
+        older_count = max(0, total - window)
+        self.recent = list(qs[older_count:total])
+
+        if older_count > self.session.summarized_message_count:
+            if deadline and not deadline.allows('summary'):
+                # The summary is incremental, so it simply catches up on the next request
+                deadline.cut('summary', "rolling summary not updated")
+                return self
+            new_messages = list(qs[self.session.summarized_message_count:older_count])
+            self.summary = self._summarize(self.session.summary, new_messages, client, deadline)
+            self.session.summary = self.summary
+            self.session.summarized_message_count = older_count
+            self.session.save(update_fields=['summary', 'summarized_message_count'])
+
+        return self
+
+    def _summarize(self, previous_summary, new_messages, client, deadline=None):
+        """
+        Extends the summary with the messages that just left the window.
+        Uses Gemini when available, otherwise keeps the user questions verbatim.
+        The Gemini call is cut off in time to leave the answer its generation budget.
+        """
+        max_chars = settings.CHAT_SUMMARY_MAX_CHARS
+        transcript = self._format_messages(new_messages)
+
+        if client:
+            prompt = (
+                "You maintain a running summary of a conversation with a Shariah compliance assistant.\n"
+                f"Update the summary with the new messages. Keep it under {max_chars} characters and "
+                "keep the topics, contracts, jurisdictions and rulings discussed.\n\n"
+                f"Current summary:\n{previous_summary or '(empty)'}\n\n"
+                f"New messages:\n{transcript}\n\n"
+                "Updated summary:"
+            )
+            try:
+                config = None
+                if deadline and deadline.remaining() != float('inf'):
+                    timeout = deadline.remaining() - settings.RAG_STAGE_BUDGETS.get('generation', 0)
+                    config = types.GenerateContentConfig(
+                        http_options=types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+                    )
+                response = client.models.generate_content(
+                    model=settings.CHAT_SUMMARY_MODEL,
+                    contents=prompt,
+                    config=config
+                )
+                if response.text and response.text.strip():
+                    return response.text.strip()[:max_chars]
+            except Exception as e:
+                print(f"Summary Error: {e}")
+
+        questions = [
+            f"User asked: {m.text_content.strip()}"
+            for m in new_messages if m.sender == ChatMessage.Sender.USER
+        ]
+        merged = "\n".join(filter(None, [previous_summary] + questions))
+        # Drop the oldest material first when over budget
+        return merged[-max_chars:]
+
+    def _format_messages(self, messages):
+        max_chars = settings.CHAT_MEMORY_MESSAGE_CHARS
+        lines = []
+        for m in messages:
+            speaker = "User" if m.sender == ChatMessage.Sender.USER else "Assistant"
+            text = m.text_content.strip()
+            if len(text) > max_chars:
+                text = text[:max_chars] + "..."
+            lines.append(f"{speaker}: {text}")
+        return "\n".join(lines)
+
+    def has_history(self):
+        return bool(self.summary or self.recent)
+
+    def prompt_block(self):
+        """Conversation section for the answer prompt (empty when there is no history)."""
+        if not self.has_history():
+            return ""
+        block = "Conversation so far (use it to resolve follow-up questions):\n"
+        if self.summary:
+            block += f"Summary of earlier discussion: {self.summary}\n"
+        if self.recent:
+            block += self._format_messages(self.recent) + "\n"
+        return block + "\n"
+
+    def retrieval_query(self, query):
+        """
+        Short follow-ups ("and what about Malaysia?", "is it allowed?") carry no
+        topic of their own, so the previous user question is prepended for the
+        vector search. Short questions that stand alone ("What is tawarruq?")
+        are searched as they are.
+        """
+        if len(query.split()) > settings.CHAT_FOLLOWUP_MAX_WORDS or not is_follow_up(query):
+            return query
+        for m in reversed(self.recent):
+            if m.sender == ChatMessage.Sender.USER:
+                return f"{m.text_content.strip()} {query}"
+        return query
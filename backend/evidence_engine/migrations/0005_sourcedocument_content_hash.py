@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0004_chatsession_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcedocument',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
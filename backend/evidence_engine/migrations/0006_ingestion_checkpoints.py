@@ -0,0 +1,43 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:24
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0005_sourcedocument_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('options', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('RUNNING', 'Running'), ('COMPLETED', 'Completed')], default='RUNNING', max_length=20)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='IngestionCheckpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('SKIPPED', 'Skipped (unchanged)'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('content_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('batches_total', models.IntegerField(default=0)),
+                ('batches_done', models.IntegerField(default=0)),
+                ('chunks_written', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source_doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_checkpoints', to='evidence_engine.sourcedocument')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='evidence_engine.ingestionrun')),
+            ],
+            options={
+                'unique_together': {('run', 'source_doc')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:30
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0007_background_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPage',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('page_number', models.IntegerField()),
+                ('word_count', models.IntegerField(default=0)),
+                ('layout', models.BinaryField()),
+                ('source_doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='evidence_engine.sourcedocument')),
+            ],
+            options={
+                'unique_together': {('source_doc', 'page_number')},
+            },
+        ),
+    ]
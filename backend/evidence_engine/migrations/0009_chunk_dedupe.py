@@ -0,0 +1,48 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:34
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0008_document_page_layout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkFingerprint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('chunk_id', models.CharField(max_length=64, unique=True)),
+                ('page_number', models.IntegerField()),
+                ('signature', models.BinaryField()),
+                ('source_doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunk_fingerprints', to='evidence_engine.sourcedocument')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChunkBand',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('key', models.CharField(db_index=True, max_length=20)),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='evidence_engine.chunkfingerprint')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChunkOccurrence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('chunk_id', models.CharField(max_length=64)),
+                ('page_number', models.IntegerField()),
+                ('start_index', models.IntegerField(default=0)),
+                ('similarity', models.FloatField()),
+                ('canonical', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='evidence_engine.chunkfingerprint')),
+                ('source_doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunk_occurrences', to='evidence_engine.sourcedocument')),
+            ],
+            options={
+                'unique_together': {('source_doc', 'chunk_id')},
+            },
+        ),
+    ]
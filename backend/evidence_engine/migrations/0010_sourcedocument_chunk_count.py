@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0009_chunk_dedupe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcedocument',
+            name='chunk_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:41
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0010_sourcedocument_chunk_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VectorCollection',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=63, unique=True)),
+                ('status', models.CharField(choices=[('BUILDING', 'Building'), ('READY', 'Ready (validated)'), ('ACTIVE', 'Active'), ('RETIRED', 'Retired'), ('FAILED', 'Failed')], default='BUILDING', max_length=20)),
+                ('chunk_count', models.IntegerField(default=0)),
+                ('synced_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('report', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('activated_at', models.DateTimeField(blank=True, null=True)),
+                ('retired_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0011_vector_collection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentpage',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0012_documentpage_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcedocument',
+            name='normalized_file',
+            field=models.FileField(blank=True, default='', upload_to='normalized_documents/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0013_sourcedocument_normalized_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcedocument',
+            name='http_etag',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='sourcedocument',
+            name='http_last_modified',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:56
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0014_sourcedocument_http_validators'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentAlias',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('url', models.URLField(max_length=500, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('source_doc', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='evidence_engine.sourcedocument')),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.10 on 2026-10-19 16:58
+
+from django.db import migrations, models
+
+
+def clear_blank_and_duplicate_urls(apps, schema_editor):
+    """Empty URLs become NULL; of documents sharing a URL, the ingested one (else any) keeps it."""
+    SourceDocument = apps.get_model('evidence_engine', 'SourceDocument')
+    SourceDocument.objects.filter(source_url="").update(source_url=None)
+    seen = set()
+    for doc_id, url in SourceDocument.objects.exclude(source_url=None).order_by('-is_ingested', 'id').values_list('id', 'source_url'):
+        if url in seen:
+            SourceDocument.objects.filter(pk=doc_id).update(source_url=None)
+        seen.add(url)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0015_documentalias'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_blank_and_duplicate_urls, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sourcedocument',
+            name='source_url',
+            field=models.URLField(blank=True, help_text='Original URL of the document', max_length=500, null=True, unique=True),
+        ),
+    ]
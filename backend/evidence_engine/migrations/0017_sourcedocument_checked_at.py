@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0016_sourcedocument_unique_source_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcedocument',
+            name='checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
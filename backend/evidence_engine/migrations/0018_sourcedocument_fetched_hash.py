@@ -0,0 +1,26 @@
+# Generated by Django 5.2.10 on 2026-10-19 17:33
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_scraped_hashes(apps, schema_editor):
+    """Until now the scrapers kept the downloaded file's hash in content_hash."""
+    SourceDocument = apps.get_model('evidence_engine', 'SourceDocument')
+    SourceDocument.objects.exclude(source_url=None).exclude(content_hash="").update(fetched_hash=F('content_hash'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evidence_engine', '0017_sourcedocument_checked_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sourcedocument',
+            name='fetched_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.RunPython(copy_scraped_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+"""
+MinHash signatures and LSH band keys for near-duplicate chunk detection.
+No Django here; the persistent index lives in dedupe.py.
+"""
+import re
+import zlib
+import hashlib
+import numpy as np
+
+NUM_PERM = 128
+# 16 bands x 8 rows: chunks with Jaccard similarity around 0.7 or more share a band
+# with high probability; candidates are then checked against the real threshold.
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Fixed seed: signatures are persisted, so the permutations must never change
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+WORD = re.compile(r"\w+")
+
+
+def shingles(text):
+    """Overlapping SHINGLE_WORDS-word sequences of the lowercased text."""
+    words = WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM uint32 values) of a chunk's text."""
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles(text)], dtype=np.uint64)
+    # Overflow in a * h wraps around, which is fine for hashing
+    with np.errstate(over="ignore"):
+        permuted = (np.outer(hashes, _A) + _B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(sig):
+    """One LSH bucket key per band; two signatures sharing any key are candidates."""
+    return [
+        f"{band:02d}" + hashlib.blake2b(sig[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).hexdigest()
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two chunks' shingle sets."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def to_bytes(sig):
+    return sig.tobytes()
+
+
+def from_bytes(blob):
+    return np.frombuffer(bytes(blob), dtype=np.uint32)
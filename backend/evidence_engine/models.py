@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class SourceDocument(models.Model):
     class Authority(models.TextChoices):
@@ -15,20 +16,118 @@ class SourceDocument(models.Model):
     title = models.CharField(max_length=255)
     authority = models.CharField(max_length=20, choices=Authority.choices)
     file_path = models.FileField(upload_to='source_documents/')
-    source_url = models.URLField(max_length=500, blank=True, null=True, help_text="Original URL of the document")
+    # Unique, so the scrapers can bulk-insert without a lookup per link; empty is stored as NULL
+    source_url = models.URLField(max_length=500, blank=True, null=True, unique=True, help_text="Original URL of the document")
     publication_date = models.DateField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_ingested = models.BooleanField(default=False)
     ingested_at = models.DateTimeField(null=True, blank=True)
+    # SHA-256 of the file that was last ingested; unchanged files are skipped on re-ingestion
+    content_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # SHA-256 of the file as last downloaded by the scrapers, whether or not it was ingested yet;
+    # re-fetches are compared with it and identical downloads are not stored twice
+    fetched_hash = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # Chunks stored in Chroma under this document after its last ingestion (consistency.py)
+    chunk_count = models.IntegerField(default=0)
+    # Last time consistency.py found its chunks in order; re-checked once re-ingested after that
+    checked_at = models.DateTimeField(null=True, blank=True)
+    # HTTP validators of the last download, for conditional re-fetching (scrapers/fetch.py)
+    http_etag = models.CharField(max_length=255, blank=True, default="")
+    http_last_modified = models.CharField(max_length=64, blank=True, default="")
+    # Compacted copy of file_path written at ingestion (normalize.py); the original is kept as published
+    normalized_file = models.FileField(upload_to='normalized_documents/', blank=True, default="")
 
     def __str__(self):
         
         return f"{self.authority} - {self.title}"
 
+    @property
+    def render_path(self):
+        """PDF to open for evidence images: the normalized copy if there is one."""
+        if self.normalized_file:
+            return self.normalized_file.path
+        return self.file_path.path
+
+class DocumentAlias(models.Model):
+    """
+    Another URL that a scraper found the same file under (same content hash).
+    Kept so the URL counts as known on the next crawl instead of being downloaded again.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    source_doc = models.ForeignKey(SourceDocument, on_delete=models.CASCADE, related_name='aliases')
+    url = models.URLField(max_length=500, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
+class DocumentPage(models.Model):
+    """
+    Per-page data recorded at ingestion: the word layout index (character spans and
+    bounding boxes, see layout.py) used to highlight evidence without searching the PDF,
+    and the page's content hash for page-level change detection.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    source_doc = models.ForeignKey(SourceDocument, on_delete=models.CASCADE, related_name='pages')
+    page_number = models.IntegerField()
+    word_count = models.IntegerField(default=0)
+    layout = models.BinaryField()
+    # Hash of the page's chunked text and word boxes (parsing.page_sha256); when a file
+    # is replaced, only pages whose hash changed are re-chunked and re-embedded
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+
+    class Meta:
+        unique_together = ('source_doc', 'page_number')
+
+    def __str__(self):
+        return f"{self.source_doc.title} - Page {self.page_number}"
+
+class ChunkFingerprint(models.Model):
+    """
+    MinHash signature of a chunk stored in Chroma, for near-duplicate lookup at
+    ingestion (see dedupe.py). Its LSH band keys are in ChunkBand.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    chunk_id = models.CharField(max_length=64, unique=True)
+    source_doc = models.ForeignKey(SourceDocument, on_delete=models.CASCADE, related_name='chunk_fingerprints')
+    page_number = models.IntegerField()
+    signature = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.chunk_id[:12]} ({self.source_doc_id}, page {self.page_number})"
+
+class ChunkBand(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fingerprint = models.ForeignKey(ChunkFingerprint, on_delete=models.CASCADE, related_name='bands')
+    key = models.CharField(max_length=20, db_index=True)
+
+class ChunkOccurrence(models.Model):
+    """
+    A chunk that was not stored because a near-duplicate (`canonical`) already is.
+    Back-reference from the stored vector to every other place its text appears.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    canonical = models.ForeignKey(ChunkFingerprint, on_delete=models.CASCADE, related_name='occurrences')
+    # The chunk's own deterministic ID, as it would have been stored
+    chunk_id = models.CharField(max_length=64)
+    source_doc = models.ForeignKey(SourceDocument, on_delete=models.CASCADE, related_name='chunk_occurrences')
+    page_number = models.IntegerField()
+    start_index = models.IntegerField(default=0)
+    similarity = models.FloatField()
+
+    class Meta:
+        unique_together = ('source_doc', 'chunk_id')
+
+    def __str__(self):
+        return f"{self.source_doc.title} - Page {self.page_number} ~ {self.canonical.chunk_id[:12]}"
+
 class ChatSession(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_sessions', null=True, blank=True)
     started_at = models.DateTimeField(auto_now_add=True)
+    # Rolling summary of the messages that have fallen out of the recent-turns window
+    summary = models.TextField(blank=True, default="")
+    summarized_message_count = models.IntegerField(default=0)
 
     def __str__(self):
         return f"Session {self.id} by {self.user}"
@@ -57,3 +156,110 @@ class ChatMessage(models.Model):
 
     def __str__(self):
         return f"{self.sender}: {self.text_content[:50]}..."
+
+class IngestionRun(models.Model):
+    """One invocation of `manage.py ingest`; an unfinished run is resumed by the next invocation."""
+    class Status(models.TextChoices):
+        RUNNING = 'RUNNING', 'Running'
+        COMPLETED = 'COMPLETED', 'Completed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    options = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RUNNING)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Ingestion run {self.started_at:%Y-%m-%d %H:%M} ({self.status})"
+
+class IngestionCheckpoint(models.Model):
+    """Per-document (and per-batch) progress of an IngestionRun."""
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        SKIPPED = 'SKIPPED', 'Skipped (unchanged)'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    run = models.ForeignKey(IngestionRun, on_delete=models.CASCADE, related_name='checkpoints')
+    source_doc = models.ForeignKey(SourceDocument, on_delete=models.CASCADE, related_name='ingestion_checkpoints')
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    batches_total = models.IntegerField(default=0)
+    batches_done = models.IntegerField(default=0)
+    chunks_written = models.IntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('run', 'source_doc')
+
+    def __str__(self):
+        return f"{self.source_doc.title}: {self.status} ({self.batches_done}/{self.batches_total} batches)"
+
+class BackgroundTask(models.Model):
+    """
+    A job in the durable task queue (see evidence_engine/tasks.py), run by
+    `manage.py taskworker` processes instead of inside a web request.
+    """
+    class Status(models.TextChoices):
+        QUEUED = 'QUEUED', 'Queued'
+        RUNNING = 'RUNNING', 'Running'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    # Not picked up before this time (used for retry backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+    # Visibility timeout: a RUNNING task whose lease expired is handed to another worker
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    progress_done = models.IntegerField(default=0)
+    progress_total = models.IntegerField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True, default="")
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.kind} ({self.status}, {self.progress_done}/{self.progress_total})"
+
+class VectorCollection(models.Model):
+    """
+    A versioned Chroma collection (see evidence_engine/vector_collections.py).
+    New versions are built next to the ACTIVE one, which keeps serving until
+    the new one passes validation and is activated; the previous version is
+    kept as RETIRED for rollback.
+    """
+    class Status(models.TextChoices):
+        BUILDING = 'BUILDING', 'Building'
+        READY = 'READY', 'Ready (validated)'
+        ACTIVE = 'ACTIVE', 'Active'
+        RETIRED = 'RETIRED', 'Retired'
+        FAILED = 'FAILED', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=63, unique=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.BUILDING)
+    chunk_count = models.IntegerField(default=0)
+    # Documents ingested after this time may be missing (caught up before activation)
+    synced_at = models.DateTimeField(default=timezone.now)
+    report = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    activated_at = models.DateTimeField(null=True, blank=True)
+    retired_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, {self.chunk_count} chunks)"
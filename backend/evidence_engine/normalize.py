@@ -0,0 +1,32 @@
+"""
+Rewrites a published PDF into a compact, cleanly structured copy: unused and
+duplicate objects removed, streams compressed, objects packed into object
+streams, one fresh cross-reference table instead of a chain of incremental
+updates. Opening and rendering the copy is faster every time evidence is made.
+The original file is never modified. No Django here (runs in parse worker processes).
+"""
+import os
+import fitz
+
+SAVE_OPTIONS = {
+    'garbage': 4,  # drop unused objects, merge duplicates
+    'deflate': True,
+    'use_objstms': 1,
+    'clean': True,  # sanitize content streams
+}
+
+
+def normalize_pdf(src_path, dst_path):
+    """
+    Writes the normalized copy of src_path to dst_path. It is written to a
+    temporary file first, so a reader never sees a half-written copy.
+    Returns (bytes_before, bytes_after).
+    """
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    tmp_path = dst_path + ".tmp"
+    with fitz.open(src_path) as pdf:
+        if pdf.needs_pass:
+            raise ValueError("encrypted PDF, left as published")
+        pdf.save(tmp_path, **SAVE_OPTIONS)
+    os.replace(tmp_path, dst_path)
+    return os.path.getsize(src_path), os.path.getsize(dst_path)
@@ -0,0 +1,256 @@
+"""
+PDF parsing and chunking with no Django dependencies, so it can run inside
+worker processes (see pipeline.py) as well as inline in ingest_document.
+"""
+import math
+import time
+import hashlib
+import fitz
+from langchain_community.document_loaders import PyMuPDFLoader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from .layout import build_page_layout, word_range
+from .boilerplate import detect_boilerplate, strip_boilerplate
+from .normalize import normalize_pdf
+
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Streams a file through SHA-256 without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source_doc_id, page_number, start_index, text):
+    """
+    Stable chunk ID derived from (source_doc_id, page_number, chunk offset, text hash),
+    so re-ingesting identical content maps onto the same vectors.
+    """
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = f"{source_doc_id}:{page_number}:{start_index}:{text_hash}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", " ", ""],
+        add_start_index=True
+    )
+
+
+def split_pages(source_doc_id, authority, source_url, pages, layouts=None):
+    """
+    Splits loaded PDF pages into chunks with our metadata and deterministic IDs.
+    With layouts ({page_number: layout}, see layout.py) each chunk also records the
+    range of page words it covers as word_start / word_end.
+    Returns (splits, ids).
+    """
+    splits = _splitter().split_documents(pages)
+
+    ids = []
+    for split in splits:
+        split.metadata['source_doc_id'] = str(source_doc_id)
+        split.metadata['authority'] = authority
+        split.metadata['source_url'] = source_url or ""
+        # Ensure page_number is 1-indexed (PyMuPDF is 0-indexed)
+        page_idx = split.metadata.get('page', 0)
+        split.metadata['page_number'] = page_idx + 1
+        start_index = split.metadata.get('start_index', 0)
+        if layouts and page_idx + 1 in layouts:
+            first, last = word_range(layouts[page_idx + 1], start_index, start_index + len(split.page_content))
+            split.metadata['word_start'] = first
+            split.metadata['word_end'] = last
+        ids.append(chunk_id(source_doc_id, page_idx + 1, start_index, split.page_content))
+    return splits, ids
+
+
+def page_sha256(text, layout):
+    """
+    Hash of a page as ingested: the text that is chunked plus its word boxes,
+    so a page whose chunks or highlight positions would differ gets a new hash.
+    """
+    digest = hashlib.sha256(text.encode("utf-8"))
+    digest.update(layout[2].tobytes())
+    return digest.hexdigest()
+
+
+def _iter_pages(path, page_number=None, strip=True, stats=None):
+    """
+    Yields (page_document, layout, original_text, lines_removed) for each page,
+    reading text and word boxes one page at a time. With strip=True, running
+    headers/footers detected across the whole document (boilerplate.py) are
+    removed from the text first.
+    """
+    with fitz.open(path) as pdf:
+        boilerplate = set()
+        if strip:
+            # Cheap first pass over the text only; always the whole document, so
+            # a single page re-parsed later is stripped exactly like a full ingest
+            boilerplate = detect_boilerplate(p.get_text() for p in pdf)
+        if stats is not None:
+            stats.update(boilerplate_lines=len(boilerplate), lines_removed=0, chunks=0, chars=0, chars_unstripped=0)
+
+        for page in PyMuPDFLoader(path).lazy_load():
+            number = page.metadata.get('page', 0) + 1
+            if page_number is not None and number != page_number:
+                continue
+            original = page.page_content
+            page.page_content, removed = strip_boilerplate(original, boilerplate)
+            yield page, build_page_layout(pdf[number - 1], page.page_content, boilerplate), original, removed
+
+
+def iter_page_windows(path, source_doc_id, authority, source_url, window_pages=20, page_number=None,
+                      strip=True, stats=None, known_hashes=None, hashes=None):
+    """
+    Streams a PDF through the splitter `window_pages` pages at a time, yielding
+    (splits, ids, layouts) per window, so memory stays flat however long the
+    document is. layouts maps page_number to the page's word layout.
+    Chunks never span pages, so the result is identical to splitting the whole file.
+    If page_number is given, only that page is yielded.
+
+    hashes, if given, is filled with {page_number: page_sha256} for every page.
+    Pages whose hash equals the one in known_hashes ({page_number: hash} from the
+    last ingestion) are unchanged: they are not split and not in the layouts.
+
+    stats, if given, is filled with the boilerplate reduction of the pages split:
+    {'boilerplate_lines', 'lines_removed', 'chunks', 'chars', 'chars_unstripped'}.
+    """
+    known_hashes = known_hashes or {}
+    window, layouts = [], {}
+    for page, layout, original, removed in _iter_pages(path, page_number, strip, stats):
+        number = page.metadata.get('page', 0) + 1
+        page_hash = page_sha256(page.page_content, layout)
+        if hashes is not None:
+            hashes[number] = page_hash
+        if known_hashes.get(number) == page_hash:
+            continue
+        if stats is not None:
+            stats['lines_removed'] += removed
+            stats['chars'] += len(page.page_content)
+            stats['chars_unstripped'] += len(original)
+        window.append(page)
+        layouts[number] = layout
+        if len(window) >= window_pages:
+            splits, ids = split_pages(source_doc_id, authority, source_url, window, layouts)
+            if stats is not None:
+                stats['chunks'] += len(splits)
+            yield splits, ids, layouts
+            window, layouts = [], {}
+    if window:
+        splits, ids = split_pages(source_doc_id, authority, source_url, window, layouts)
+        if stats is not None:
+            stats['chunks'] += len(splits)
+        yield splits, ids, layouts
+
+
+def parse_and_split(path, source_doc_id, authority, source_url, page_number=None, strip=True, stats=None,
+                    known_hashes=None, hashes=None):
+    """
+    Loads a PDF and splits it into chunks. If page_number is given, only that page is kept.
+    known_hashes / hashes: see iter_page_windows.
+    Returns (page_count, splits, ids, layouts).
+    """
+    splits, ids, layouts = [], [], {}
+    for window_splits, window_ids, window_layouts in iter_page_windows(
+            path, source_doc_id, authority, source_url, page_number=page_number, strip=strip, stats=stats,
+            known_hashes=known_hashes, hashes=hashes):
+        splits.extend(window_splits)
+        ids.extend(window_ids)
+        layouts.update(window_layouts)
+    with fitz.open(path) as pdf:
+        page_count = len(pdf)
+    return page_count, splits, ids, layouts
+
+
+def changed_pages(hashes, known_hashes):
+    """Pages of the new file whose hash differs from the last ingestion (or that are new)."""
+    return sorted(number for number, page_hash in hashes.items() if known_hashes.get(number) != page_hash)
+
+
+def unstripped_chunks(stats):
+    """
+    Chunks the pages would have made without stripping, estimated from the text
+    length before and after (chunk size is fixed), so nothing is split twice.
+    """
+    if not stats['chars']:
+        return stats['chunks']
+    return round(stats['chunks'] * stats['chars_unstripped'] / stats['chars'])
+
+
+def describe_reduction(stats, batch_size):
+    """One-line summary of what boilerplate stripping saved for a document."""
+    before, after = unstripped_chunks(stats), stats['chunks']
+    percent = 100.0 * (before - after) / before if before else 0.0
+    calls_before, calls_after = -(-before // batch_size), -(-after // batch_size)
+    return (f"boilerplate: {stats['boilerplate_lines']} repeated lines ({stats['lines_removed']} removed), "
+            f"text {stats['chars_unstripped']} -> {stats['chars']} chars, "
+            f"chunks ~{before} -> {after} (-{percent:.0f}%), embedding calls ~{calls_before} -> {calls_after}")
+
+
+# Set in each parse worker process of the ingestion pipeline by init_parse_worker
+_windows = None
+
+
+def init_parse_worker(windows):
+    """Process pool initializer: the queue parse_job sends its messages to."""
+    global _windows
+    _windows = windows
+
+
+def parse_job(path, source_doc_id, authority, source_url, known_hash, strip, known_page_hashes, normalize_to,
+              window_pages):
+    """
+    Runs in a parse worker process of pipeline.py: hashes the file and, if it changed, streams the
+    pages whose hash is not in known_page_hashes into the bounded windows queue,
+    window_pages at a time, as (kind, doc_id, info) messages:
+
+      'start'      content_hash, normalized (None if not attempted), batches_total
+      'window'     splits, ids, layouts and page_hashes of one page window
+      'done'       hashes of every page, boilerplate stats, chunks, seconds
+      'unchanged'  content_hash, seconds (file hash equals known_hash)
+      'failed'     error
+
+    Every document ends with 'done', 'unchanged' or 'failed'. A worker blocks
+    while the queue is full, so it is never more than a few windows ahead of
+    the embedder.
+    """
+    started = time.monotonic()
+    try:
+        content_hash = file_sha256(path)
+        if content_hash == known_hash:
+            _windows.put(('unchanged', source_doc_id, {
+                'content_hash': content_hash, 'seconds': time.monotonic() - started
+            }))
+            return
+        normalized = None
+        if normalize_to:
+            try:
+                normalize_pdf(path, normalize_to)
+                normalized = True
+            except Exception as e:
+                print(f"⚠️ {path}: not normalized ({e})")
+                normalized = False
+        with fitz.open(path) as pdf:
+            batches_total = math.ceil(len(pdf) / window_pages)
+        _windows.put(('start', source_doc_id, {
+            'content_hash': content_hash, 'normalized': normalized, 'batches_total': batches_total
+        }))
+        stats, hashes, chunks = {}, {}, 0
+        windows = iter_page_windows(
+            path, source_doc_id, authority, source_url, window_pages=window_pages, strip=strip, stats=stats,
+            known_hashes=known_page_hashes, hashes=hashes
+        )
+        for splits, ids, layouts in windows:
+            chunks += len(ids)
+            _windows.put(('window', source_doc_id, {
+                'splits': splits, 'ids': ids, 'layouts': layouts,
+                'page_hashes': {number: hashes[number] for number in layouts},
+            }))
+        _windows.put(('done', source_doc_id, {
+            'hashes': hashes, 'stats': stats, 'chunks': chunks, 'seconds': time.monotonic() - started
+        }))
+    except Exception as e:
+        _windows.put(('failed', source_doc_id, {'error': f"parse: {e}"}))
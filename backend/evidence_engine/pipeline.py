@@ -0,0 +1,295 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.conf import settings
+from django.db import connection
+from .ingestion import (
+    get_vectorstore, get_embedding_submitter, store_chunks,
+    mark_ingesting, mark_ingested, save_page_layouts, prune_page_layouts, count_document_chunks,
+    stored_page_hashes, known_page_hashes, changed_pages_where, invalidate_evidence, remove_stale_chunks,
+    normalized_path, set_normalized,
+)
+from .parsing import describe_reduction, unstripped_chunks, changed_pages, init_parse_worker, parse_job
+from .dedupe import (
+    NearDuplicateIndex, dedupe_chunks, save_fingerprints, save_occurrences, prune_occurrences,
+)
+
+_DONE = object()
+
+
+class StageCounter:
+    """Throughput counter for one pipeline stage (documents, chunks, busy seconds)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.docs = 0
+        self.chunks = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, chunks, seconds, docs=1):
+        with self.lock:
+            self.docs += docs
+            self.chunks += chunks
+            self.busy += seconds
+
+    def summary(self, wall):
+        rate = self.chunks / wall if wall else 0.0
+        return f"{self.name:<6} {self.docs:>5} docs {self.chunks:>7} chunks {self.busy:>8.1f}s busy {rate:>8.1f} chunks/s"
+
+
+def run_ingestion_pipeline(source_docs, workers=None, force=False, queue_size=None, on_progress=None):
+    """
+    Ingests many SourceDocuments at once.
+
+    Parsing and splitting run in a process pool across all cores; each worker
+    streams its document INGEST_PAGE_WINDOW pages at a time through bounded
+    queues into an embedding stage (near-duplicate lookup, then the shared
+    EmbeddingSubmitter) and a single Chroma writer, which is also the only
+    thread writing to the database. Returns a dict of per-stage counters and errors.
+
+    No stage holds a whole document: page windows, and then vectors one
+    INGEST_WRITE_BATCH_SIZE batch at a time, are all that is buffered, so memory
+    stays bounded by the queue sizes rather than by the longest document. Only
+    chunk IDs and page hashes are kept per document, as in ingest_document.
+
+    on_progress(event, doc_id, **info) is called from the writer thread with
+    'start', 'batch', 'done', 'skipped' and 'failed' events (used for checkpointing);
+    a batch is one page window.
+    """
+    workers = workers or settings.INGEST_WORKERS or os.cpu_count() or 1
+    queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+    docs = {str(d.id): d for d in source_docs if d.file_path}
+
+    counters = {name: StageCounter(name) for name in ("parse", "embed", "write")}
+    errors = {}
+    skipped = []
+    reductions = {}
+    mp_context = multiprocessing.get_context()
+    windows = mp_context.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    vectorstore = get_vectorstore()
+    submitter = get_embedding_submitter()
+    started = time.monotonic()
+
+    # Paths and known hashes are read here, before any worker thread starts
+    known_pages = {doc_id: known_page_hashes(doc, force) for doc_id, doc in docs.items()}
+    jobs = [
+        (
+            doc.file_path.path, doc_id, doc.authority, doc.source_url,
+            None if force or not doc.is_ingested else doc.content_hash,
+            settings.INGEST_STRIP_BOILERPLATE,
+            known_pages[doc_id],
+            normalized_path(doc) if settings.INGEST_NORMALIZE_PDF else None,
+            settings.INGEST_PAGE_WINDOW,
+        )
+        for doc_id, doc in docs.items()
+    ]
+
+    def parse_stage():
+        # Documents whose last message is certain to come (from a worker or from here)
+        accounted = set()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context,
+                                     initializer=init_parse_worker, initargs=(windows,)) as pool:
+                futures = {pool.submit(parse_job, *job): job[1] for job in jobs}
+                for future in as_completed(futures):
+                    doc_id = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # The worker died before it could report
+                        windows.put(('failed', doc_id, {'error': f"parse: {e}"}))
+                    accounted.add(doc_id)
+        finally:
+            for job in jobs:
+                if job[1] not in accounted:
+                    windows.put(('failed', job[1], {'error': "parse: not run"}))
+
+    batch_size = settings.INGEST_WRITE_BATCH_SIZE
+
+    index = NearDuplicateIndex() if settings.DEDUPE_ENABLED else None
+
+    def embed_stage():
+        # Per document being received: IDs stored before this run and IDs seen so far
+        state = {}
+        finished = set()
+        try:
+            while len(finished) < len(jobs):
+                kind, doc_id, info = windows.get()
+                if kind in ('done', 'unchanged', 'failed'):
+                    finished.add(doc_id)
+                if kind == 'failed':
+                    errors.setdefault(doc_id, info['error'])
+                    state.pop(doc_id, None)
+                    continue
+                if doc_id in errors:
+                    # An earlier window of this document failed; drop the rest of it
+                    state.pop(doc_id, None)
+                    continue
+                try:
+                    if kind == 'unchanged':
+                        counters["parse"].record(0, info['seconds'])
+                        write_queue.put({'kind': kind, 'doc_id': doc_id, 'content_hash': info['content_hash']})
+                    elif kind == 'start':
+                        where = {"source_doc_id": doc_id}
+                        state[doc_id] = {
+                            'existing': set(vectorstore.get(where=where, include=[])["ids"]),
+                            'seen': set(),
+                            'window': 0,
+                        }
+                        write_queue.put({'kind': kind, 'doc_id': doc_id, **info})
+                    elif kind == 'window':
+                        t = time.monotonic()
+                        doc = state[doc_id]
+                        doc['window'] += 1
+                        splits, ids = info['splits'], info['ids']
+                        new = [
+                            (split, id_) for split, id_ in zip(splits, ids)
+                            if id_ not in doc['existing'] and id_ not in doc['seen']
+                        ]
+                        new_splits, new_ids = [split for split, _ in new], [id_ for _, id_ in new]
+                        signatures, duplicates = [None] * len(new_ids), []
+                        if index:
+                            # Read-only lookups; the writer persists the fingerprints
+                            new_splits, new_ids, signatures, duplicates = dedupe_chunks(index, new_splits, new_ids)
+                        doc['seen'].update(ids)
+                        # Embed and hand over one write batch at a time
+                        starts = list(range(0, len(new_ids), batch_size)) or [0]
+                        for n, start in enumerate(starts, 1):
+                            end = start + batch_size
+                            first, last = n == 1, n == len(starts)
+                            write_queue.put({
+                                'kind': 'batch',
+                                'doc_id': doc_id,
+                                'splits': new_splits[start:end],
+                                'ids': new_ids[start:end],
+                                'vectors': submitter.embed([s.page_content for s in new_splits[start:end]]),
+                                'signatures': signatures[start:end],
+                                'layouts': info['layouts'] if first else None,
+                                'page_hashes': info['page_hashes'] if first else None,
+                                'duplicates': duplicates if last else [],
+                                'window': doc['window'],
+                            })
+                        counters["embed"].record(len(new_ids), time.monotonic() - t, docs=0)
+                    elif kind == 'done':
+                        doc = state.pop(doc_id)
+                        counters["parse"].record(info['chunks'], info['seconds'])
+                        counters["embed"].record(0, 0.0)
+                        if info['stats']:
+                            reductions[doc_id] = info['stats']
+                        write_queue.put({'kind': kind, 'doc_id': doc_id, 'hashes': info['hashes'], 'seen': doc['seen']})
+                except Exception as e:
+                    errors[doc_id] = f"embed: {e}"
+                    state.pop(doc_id, None)
+        finally:
+            write_queue.put(_DONE)
+            connection.close()
+
+    threads = [
+        threading.Thread(target=parse_stage, name="ingest-parse", daemon=True),
+        threading.Thread(target=embed_stage, name="ingest-embed", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    def notify(event, doc_id, **info):
+        if on_progress:
+            on_progress(event, doc_id, **info)
+
+    # Single writer (this thread): Chroma upserts/deletes and SourceDocument updates
+    in_progress = {}
+    while True:
+        item = write_queue.get()
+        if item is _DONE:
+            break
+        doc_id, kind = item['doc_id'], item['kind']
+        source_doc = docs[doc_id]
+        if kind == 'unchanged':
+            skipped.append(doc_id)
+            notify('skipped', doc_id, content_hash=item['content_hash'])
+            continue
+        if doc_id in errors:
+            # An earlier batch of this document failed; drop the rest of it
+            in_progress.pop(doc_id, None)
+            continue
+        try:
+            if kind == 'start':
+                in_progress[doc_id] = {
+                    'started': time.monotonic(),
+                    'content_hash': item['content_hash'],
+                    # Compared with the new hashes once all pages are in
+                    'stored_hashes': stored_page_hashes(source_doc),
+                    'written': 0,
+                    'shared': 0,
+                }
+                notify('start', doc_id, content_hash=item['content_hash'], batches_total=item['batches_total'])
+                mark_ingesting(source_doc)
+                if item['normalized'] is not None:
+                    set_normalized(source_doc, item['normalized'])
+            elif kind == 'batch':
+                progress = in_progress[doc_id]
+                if item['layouts']:
+                    save_page_layouts(source_doc, item['layouts'], item['page_hashes'])
+                ids = item['ids']
+                if ids:
+                    store_chunks(vectorstore, item['splits'], ids, vectors=item['vectors'])
+                    if index:
+                        save_fingerprints(source_doc, item['splits'], ids, item['signatures'])
+                # Their stored copies (this or earlier documents) went through this writer already
+                if item['duplicates'] and save_occurrences(source_doc, item['duplicates']):
+                    raise RuntimeError("shared chunks lost their stored copy, ingest again")
+                progress['written'] += len(ids)
+                progress['shared'] += len(item['duplicates'])
+                notify('batch', doc_id, batches_done=item['window'], chunks_written=progress['written'])
+            elif kind == 'done':
+                progress = in_progress.pop(doc_id)
+                hashes, seen = item['hashes'], item['seen']
+                page_count = len(hashes)
+                unchanged = [n for n, h in hashes.items() if known_pages[doc_id].get(n) == h]
+                if index:
+                    prune_occurrences(source_doc, seen, keep_pages=unchanged)
+                # Chunks on unchanged pages were not re-split, so they are not in `seen` but still current
+                removed = remove_stale_chunks(vectorstore, changed_pages_where(doc_id, unchanged), seen)
+                prune_page_layouts(source_doc, page_count)
+                invalidate_evidence(source_doc, changed_pages(hashes, progress['stored_hashes']), page_count)
+                mark_ingested(source_doc, progress['content_hash'], count_document_chunks(vectorstore, doc_id))
+                counters["write"].record(progress['written'], time.monotonic() - progress['started'])
+                notify('done', doc_id, content_hash=progress['content_hash'])
+                print(f"✓ {source_doc.title}: {progress['written']} new chunks, {progress['shared']} shared, "
+                      f"{len(removed)} removed")
+                if doc_id in reductions:
+                    print(f"    {describe_reduction(reductions[doc_id], settings.EMBEDDING_BATCH_SIZE)}")
+        except Exception as e:
+            errors[doc_id] = f"write: {e}"
+            in_progress.pop(doc_id, None)
+
+    for thread in threads:
+        thread.join()
+    windows.close()
+    windows.join_thread()
+    for doc_id, error in errors.items():
+        notify('failed', doc_id, error=error)
+
+    wall = time.monotonic() - started
+    print(f"\nPipeline finished in {wall:.1f}s with {workers} parse workers "
+          f"({len(skipped)} unchanged, {len(errors)} failed)")
+    for counter in counters.values():
+        print("  " + counter.summary(wall))
+    if reductions:
+        before = sum(unstripped_chunks(r) for r in reductions.values())
+        after = sum(r['chunks'] for r in reductions.values())
+        print(f"  boilerplate stripping: ~{before} -> {after} chunks across {len(reductions)} documents")
+    for doc_id, error in errors.items():
+        print(f"  ✗ {docs[doc_id].title}: {error}")
+
+    return {
+        "seconds": wall,
+        "stages": {name: {"docs": c.docs, "chunks": c.chunks, "busy_s": c.busy} for name, c in counters.items()},
+        "skipped": skipped,
+        "errors": errors,
+        "boilerplate": reductions,
+    }
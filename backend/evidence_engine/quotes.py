@@ -0,0 +1,68 @@
+import re
+from django.conf import settings
+from rapidfuzz import fuzz
+
+SOURCE_TAG = re.compile(r"\[Source \d+\]\s*(\(Page \d+\):?)?", re.I)
+
+
+def _normalize(text):
+    """
+    Lowercases and collapses whitespace, returning the normalized string and a map
+    from each normalized character back to its index in the original text.
+    """
+    chars, index_map = [], []
+    pending_space = False
+    for i, ch in enumerate(text):
+        if ch.isspace():
+            pending_space = bool(chars)
+            continue
+        if pending_space:
+            chars.append(" ")
+            index_map.append(i - 1)
+            pending_space = False
+        chars.append(ch.lower())
+        index_map.append(i)
+    return "".join(chars), index_map
+
+
+def clean_quote(quote):
+    """Strips the wrapping quotes and [Source n] tags the LLM tends to echo back."""
+    quote = SOURCE_TAG.sub("", quote or "")
+    return quote.strip().strip('"“”\'‘’').strip()
+
+
+def locate_quote(quote, hits):
+    """
+    Maps the LLM-selected QUOTE back to the retrieved chunk it came from.
+
+    Returns (doc, score, span_text, (start, end)) where span_text is the exact
+    text of the chunk (not the LLM's paraphrase) and start/end are character
+    offsets into doc.page_content, or None if nothing matches well enough.
+    """
+    quote = clean_quote(quote)
+    if len(quote) < 10 or not hits:
+        return None
+    needle, _ = _normalize(quote)
+
+    best = None
+    for doc, score in hits:
+        haystack, index_map = _normalize(doc.page_content)
+        if not haystack:
+            continue
+        pos = haystack.find(needle)
+        if pos >= 0:
+            match_score, start, end = 100.0, pos, pos + len(needle)
+        else:
+            alignment = fuzz.partial_ratio_alignment(needle, haystack)
+            match_score, start, end = alignment.score, alignment.dest_start, alignment.dest_end
+        if end <= start:
+            continue
+        if best is None or match_score > best[0]:
+            best = (match_score, doc, score, index_map[start], index_map[end - 1] + 1)
+        if match_score == 100.0:
+            break
+
+    if best is None or best[0] < settings.QUOTE_MATCH_MIN_SCORE:
+        return None
+    _, doc, score, start, end = best
+    return doc, score, doc.page_content[start:end], (start, end)
@@ -1,16 +1,23 @@
 import os
+import time
 import dotenv
-from langchain_chroma import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 # from langchain_google_genai import ChatGoogleGenerativeAI # Removed
 from langchain_core.prompts import ChatPromptTemplate
 # from langchain_core.runnables import RunnablePassthrough # Removed 
 # from langchain_core.output_parsers import StrOutputParser # Removed
 from django.conf import settings
-from .models import SourceDocument, EvidenceArtifact
+from .models import SourceDocument, EvidenceArtifact, DocumentPage
 from .services import EvidenceGenerator
-from .ingestion import CHROMA_DB_DIR
+from .ingestion import get_vectorstore, active_collection_name
+from .deadline import Deadline
+from .extractive import extract_answer
+from .routing import ModelRouter, log_route
+from .quotes import locate_quote
+from .layout import unpack_layout, span_rects
+from .dedupe import occurrences_for, authority_rank
 from google import genai 
+from google.genai import types
 
 # Load environment variables
 dotenv.load_dotenv()
@@ -25,11 +32,8 @@ class RAGService:
         
         # 1. Initialize Embeddings & Vector Store
         self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        self.vectorstore = Chroma(
-            collection_name="al_muwathiq_standards",
-            embedding_function=self.embeddings,
-            persist_directory=CHROMA_DB_DIR
-        )
+        self.collection_name = active_collection_name()
+        self.vectorstore = get_vectorstore(self.embeddings, self.collection_name)
         # Increase initial retrieval for reranking (The "Intern" grabs 50)
         self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 50})
         
@@ -37,6 +41,9 @@ class RAGService:
         # specific model can be passed, default is ms-marco-TinyBERT-L-2-v2
         self.ranker = Ranker()
 
+        # Picks model tier and context size per query (rules in settings.RAG_ROUTES)
+        self.router = ModelRouter()
+
         # 4. Initialize Gemini LLM (Google GenAI Client v2)
         api_key = os.getenv("GOOGLE_API_KEY")
         if not api_key:
@@ -68,7 +75,7 @@ Context: "The common inherent nature of Murabahah is a sale with markup."
 Question: "What is the definition of Murabahah?"
 Answer: "Murabahah is defined as a sale contract where the seller discloses the cost and markup to the buyer."
 
-Context:
+{history}Context:
 {context}
 
 Question: {question}
@@ -76,21 +83,39 @@ Question: {question}
 Answer:
 """
 
-    def search_db(self, query):
+    def search_db(self, query, deadline=None):
         """
-        Retrieves top 50 documents, then reranks to Top 5.
+        Retrieves the top-k chunks, optionally reranked with FlashRank.
+        Retrieves fewer chunks and skips reranking when the deadline is tight.
         """
+        # A rebuilt collection may have been activated since (vector_collections.py); switch without a restart
+        active = active_collection_name()
+        if active != self.collection_name:
+            self.collection_name = active
+            self.vectorstore = get_vectorstore(self.embeddings, active)
+            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 50})
+
+        k = settings.RAG_RETRIEVAL_K
+        if deadline and not deadline.allows('retrieval'):
+            k = settings.RAG_RETRIEVAL_K_DEGRADED
+            deadline.cut('retrieval', f"k reduced to {k}")
+
         # 1. Broad Sweep (The Intern) -> Now acting as the only retriever
         # We manually call similarity search to get documents
         # Increased to 15 to ensure we get enough context for comparisons without reranking
-        results = self.vectorstore.similarity_search_with_score(query, k=15)
+        results = self.vectorstore.similarity_search_with_score(query, k=k)
         print(f"DEBUG: 'Intern' found {len(results)} chunks for query '{query}'")
         
-        # 2. Reranking (The Manager) - DISABLED
+        # 2. Reranking (The Manager) - off by default (settings.RAG_RERANK_ENABLED)
         # FlashRank was aggressively downranking relevant English/Malay hybrid documents.
         # For now, we trust the Vector Search (Google Embeddings) more.
-        
-        # pass
+        if settings.RAG_RERANK_ENABLED and results:
+            if deadline and not deadline.allows('rerank'):
+                deadline.cut('rerank', "skipped")
+            else:
+                passages = [{"id": i, "text": doc.page_content} for i, (doc, _) in enumerate(results)]
+                ranked = self.ranker.rerank(RerankRequest(query=query, passages=passages))
+                results = [results[r["id"]] for r in ranked]
         
         # Convert to list
         final_hits = []
@@ -99,45 +124,131 @@ Answer:
              
         return final_hits
 
-    def answer_question(self, query):
+    def answer_question(self, query, deadline=None, memory=None):
         """
         End-to-end RAG flow: Retrieval -> Evidence Gen -> LLM Response.
+        Every stage checks the request deadline and degrades instead of overrunning it.
+        If a ConversationMemory is given, follow-up questions are answered in context.
         """
         print(f"RAG Query: {query}")
+        if deadline is None:
+            deadline = Deadline.for_endpoint('default')
+
+        history_block = ""
+        retrieval_query = query
+        if memory is not None:
+            memory.load(client=self.client, deadline=deadline)
+            history_block = memory.prompt_block()
+            retrieval_query = memory.retrieval_query(query)
         
         # 1. Retrieval
-        hits = self.search_db(query)
+        hits = self.search_db(retrieval_query, deadline=deadline)
         if not hits:
             return {
                 "answer": "I cannot find a specific ruling on this in the provided documents.",
                 "evidence_url": None,
-                "metadata": None
+                "metadata": None,
+                "stages_cut": deadline.stages_cut
             }
 
+        # 2. Answer: extractive fast path for confident lookups, otherwise the routed LLM
+        # Routed on the query the hits were retrieved for. A rewritten follow-up
+        # ("what is it?") has no lookup term of its own, so it always goes to the LLM.
+        route = self.router.route(retrieval_query, hits)
+        generation_started = time.monotonic()
+        extracted = extract_answer(query, hits) if retrieval_query == query else None
+        if extracted:
+            sentence, top_doc, top_score = extracted
+            print(f"DEBUG: Extractive fast path (distance {top_score:.3f}), skipping LLM.")
+            answer = sentence
+            quote_part = sentence
+            answer_mode = "extractive"
+            located = locate_quote(sentence, [(top_doc, top_score)])
+            evidence_candidates = [(top_doc, top_score, sentence, located[3] if located else None)]
+        else:
+            print(f"DEBUG: Route '{route.name}' -> {route.model} with {route.context_k} chunks {route.features}")
+            answer, quote_part = self._generate(
+                query, hits[:route.context_k], history_block, deadline, model=route.model
+            )
+            answer_mode = "generative"
+
+            # Highlighting Strategy:
+            # Map the LLM's QUOTE back to the exact chunk and span it came from and render
+            # only that page. The quote is what proves the answer, so highlighting it beats
+            # highlighting the start of each top hit (which often caught headers/footers).
+            located = locate_quote(quote_part, hits[:route.context_k])
+            if located:
+                quote_doc, quote_score, span_text, span = located
+                print(f"DEBUG: Quote matched on page {quote_doc.metadata.get('page_number')}")
+                evidence_candidates = [(quote_doc, quote_score, span_text, span)]
+            else:
+                # Fallback: first 300 characters of each of the TOP 3 hits, for broad
+                # coverage and comparison questions.
+                evidence_candidates = [(doc, score, doc.page_content[:300], (0, 300)) for doc, score in hits[:3]]
+
+        generation_s = time.monotonic() - generation_started
+
+        # 3. Multi-Evidence Generation
+        evidence_list = self._render_evidence(evidence_candidates, deadline)
+        log_route(route, query, answer_mode, generation_s, deadline.elapsed(), deadline.stages_cut)
+        
+        # Final cleanup of answer/format
+        if not answer or not answer.strip() or len(answer.strip()) < 20:
+             answer = "Based on the retrieved Shariah standards, please refer to the visual evidence below for the relevant ruling."
+
+        return {
+            "answer": answer,
+            "answer_mode": answer_mode,
+            "route": route.name,
+            "evidence_list": evidence_list,
+            # Legacy field for backward compat/simple checks
+            "evidence_url": evidence_list[0]['url'] if evidence_list else None,
+            "metadata": hits[0][0].metadata if hits else None,
+            "stages_cut": deadline.stages_cut
+        }
+
+    def _generate(self, query, hits, history_block, deadline, model="gemini-2.0-flash"):
+        """
+        Calls Gemini with the retrieved context. Returns (answer, quote).
+        """
         # Format context with IDs so LLM can cite specific chunks if needed (simplified for now)
         context_text = ""
         for i, (doc, _) in enumerate(hits):
             context_text += f"[Source {i}] (Page {doc.metadata.get('page_number')}): {doc.page_content}\n\n"
         
-        # 2. LLM Generation (Gemini 2.0 Flash via Google GenAI SDK)
+        # LLM Generation (routed Gemini model via Google GenAI SDK)
         if not self.client:
              print("ERROR: GenAI Client not initialized.")
              answer = f"**System Error: AI Service Unavailable.**\n\nBased on the retrieved documents:\n\n{hits[0][0].page_content[:1200]}..."
              quote_part = ""
+        elif not deadline.allows('generation'):
+             deadline.cut('generation', "LLM skipped, returning raw context")
+             answer = f"**Note: Response time limit reached. Showing raw context.**\n\nBased on the retrieved documents:\n\n{hits[0][0].page_content[:1200]}..."
+             quote_part = ""
         else:
             # Prepare Prompt
-            structured_prompt = self.prompt_template.format(context=context_text, question=query)
+            structured_prompt = self.prompt_template.format(
+                context=context_text, question=query, history=history_block
+            )
             structured_prompt += "\n\nAlso, pick the SINGLE best short quote (approx 10-20 words) from the Context that proves your answer.\nReturn your response in this exact format:\nANSWER: [Your answer]\nQUOTE: [The quote]"
 
             try:
                 # Direct SDK Call
-                print(f"DEBUG: Calling Gemini 2.0 Flash with prompt length {len(structured_prompt)}")
+                print(f"DEBUG: Calling {model} with prompt length {len(structured_prompt)}")
+                # Leave room for at least one evidence image after the LLM returns
+                llm_timeout = deadline.remaining() - settings.RAG_STAGE_BUDGETS.get('evidence', 0)
+                config = None
+                if llm_timeout != float('inf'):
+                    config = types.GenerateContentConfig(
+                        http_options=types.HttpOptions(timeout=int(llm_timeout * 1000))
+                    )
                 response = self.client.models.generate_content(
-                    model="gemini-2.0-flash", 
-                    contents=structured_prompt
+                    model=model, 
+                    contents=structured_prompt,
+                    config=config
                 )
                 response_text = response.text
-                print("DEBUG: Gemini 2.0 Response received.")
+                print(f"DEBUG: {model} response received.")
                 
                 # Robust Parsing using Regex (Same as before)
                 import re
@@ -168,7 +279,7 @@ Answer:
                 answer = answer_part
                 
             except Exception as e:
-                print(f"LLM Error (Gemini 2.0): {e}")
+                print(f"LLM Error ({model}): {e}")
                 import traceback
                 traceback.print_exc()
                 # Fallback if LLM fails
@@ -176,43 +287,62 @@ Answer:
                 answer = f"**Note: AI Generation Failed. Showing raw context.**\n\nBased on the retrieved documents:\n\n{content_snippet}..."
                 quote_part = ""
 
-        # 3. Multi-Evidence Generation
+        return answer, quote_part
+
+    def _render_evidence(self, candidates, deadline):
+        """
+        Renders highlighted page images for (doc, score, snippet, span) candidates,
+        one per page, until the deadline runs out. span is the (start, end) of the
+        snippet inside the chunk, used to look up its word boxes in the layout index.
+
+        A chunk shared by several documents (stored once, see dedupe.py) is shown
+        from its most authoritative copy; the other copies are listed in "also_in".
+        """
         evidence_list = []
         seen_pages = set()
-        
-        # We will try to generate evidence for the TOP 3 hits to ensure broad coverage
-        # and support comparison questions.
-        for doc, score in hits[:3]:
+        shared = occurrences_for([doc.id for doc, *_ in candidates if doc.id])
+
+        for doc, score, snippet, span in candidates:
+            if not deadline.allows('evidence'):
+                deadline.cut('evidence', f"rendered {len(evidence_list)} of {len(candidates)} candidates")
+                break
+
             metadata = doc.metadata
             source_doc_id = metadata.get('source_doc_id')
             page_number = metadata.get('page_number')
-            
-            # Avoid duplicates (same page multiple times)
-            combo_key = f"{source_doc_id}_{page_number}"
-            if combo_key in seen_pages:
-                continue
-            seen_pages.add(combo_key)
+            start_index = metadata.get('start_index', 0)
             
             try:
                 source_doc = SourceDocument.objects.get(id=source_doc_id)
-                
-                # Highlighting Strategy:
-                # The user complained about "random highlights" (headers/footers).
-                # This was because we used 'top_hit.page_content[:100]' which often captures the header.
-                # Since 'doc.page_content' IS the text that the AI read, we should highlight THAT.
-                # However, doc.page_content might be 1000 chars (too long for yellow highlight?).
-                # Let's take the first 300 characters of the ACTUAL matched content.
-                # This guarantees the highlight finds the relevant paragraph.
-                
-                snippet_to_highlight = doc.page_content[:300] 
+                copies = [(source_doc, page_number, start_index, True)] + [
+                    (o.source_doc, o.page_number, o.start_index, o.similarity == 1.0)
+                    for o in shared.get(doc.id, [])
+                ]
+                copies.sort(key=lambda c: authority_rank(c[0]))
+                source_doc, page_number, start_index, exact = copies[0]
+                source_doc_id = str(source_doc.id)
+
+                # Avoid duplicates (same page multiple times)
+                combo_key = f"{source_doc_id}_{page_number}"
+                if combo_key in seen_pages:
+                    continue
+                seen_pages.add(combo_key)
                 
                 # Clean up snippet (remove newlines for better regex matching in PDF)
-                snippet_to_highlight = snippet_to_highlight.replace('\n', ' ')
+                snippet_to_highlight = snippet.replace('\n', ' ')
+
+                # A near (not exact) copy has slightly different offsets; search that page instead
+                rects = None
+                if exact and span is not None:
+                    end = min(span[1], len(doc.page_content))
+                    rects = self._highlight_rects(source_doc_id, page_number, start_index + span[0], start_index + end)
                 
+                # Normalized copy when ingestion wrote one (faster to open and render)
                 image_rel_path = self.evidence_gen.generate_evidence(
-                    source_doc.file_path.path,
+                    source_doc.render_path,
                     page_number,
-                    snippet_to_highlight
+                    snippet_to_highlight,
+                    rects=rects
                 )
                 
                 if image_rel_path:
@@ -228,20 +358,23 @@ Answer:
                         "url": settings.MEDIA_URL + image_rel_path,
                         "title": source_doc.title,
                         "page": page_number,
-                        "score": score
+                        "score": score,
+                        "also_in": [{"title": c[0].title, "page": c[1]} for c in copies[1:]]
                     })
 
             except Exception as e:
                 print(f"Evidence Error for {source_doc_id}: {e}")
-        
-        # Final cleanup of answer/format
-        if not answer or not answer.strip() or len(answer.strip()) < 20:
-             answer = "Based on the retrieved Shariah standards, please refer to the visual evidence below for the relevant ruling."
 
-        return {
-            "answer": answer,
-            "evidence_list": evidence_list,
-            # Legacy field for backward compat/simple checks
-            "evidence_url": evidence_list[0]['url'] if evidence_list else None,
-            "metadata": hits[0][0].metadata if hits else None
-        }
+        return evidence_list
+
+    def _highlight_rects(self, source_doc_id, page_number, start, end):
+        """
+        Word boxes for characters [start, end) of a page's text, from its layout index.
+        Returns None (search the page instead) for pages ingested before the index existed.
+        """
+        page = DocumentPage.objects.filter(
+            source_doc_id=source_doc_id, page_number=page_number
+        ).only('layout').first()
+        if page is None:
+            return None
+        return span_rects(unpack_layout(page.layout), start, end) or None
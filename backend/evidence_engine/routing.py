@@ -0,0 +1,108 @@
+import re
+import json
+import time
+import hashlib
+from django.conf import settings
+from .extractive import match_lookup
+
+COMPARISON_PATTERN = re.compile(r"\b(difference|differ|compare|comparison|versus|vs\.?|between)\b", re.I)
+
+
+class Route:
+    """
+    A routing decision: which model to call and how many chunks of context to send.
+    """
+
+    def __init__(self, name, model, context_k, features):
+        self.name = name
+        self.model = model
+        self.context_k = context_k
+        self.features = features
+
+    def as_dict(self):
+        return {
+            "route": self.name,
+            "model": self.model,
+            "context_k": self.context_k,
+            "features": self.features,
+        }
+
+
+class ModelRouter:
+    """
+    Chooses the model tier and context size for generation from query features
+    and the spread of retrieval scores, using the ordered rules in settings.RAG_ROUTES.
+    The first rule whose conditions all hold wins.
+    """
+
+    def __init__(self, routes=None):
+        self.routes = routes if routes is not None else settings.RAG_ROUTES
+
+    def features(self, query, hits):
+        scores = [score for _, score in hits]
+        if COMPARISON_PATTERN.search(query):
+            query_type = "comparison"
+        elif match_lookup(query):
+            query_type = "lookup"
+        else:
+            query_type = "general"
+        return {
+            "query_type": query_type,
+            "words": len(query.split()),
+            "top_distance": round(scores[0], 4) if scores else None,
+            # Distance gap between the best and the worst retrieved chunk. A small spread
+            # means many chunks are about equally relevant, so more context helps.
+            "spread": round(scores[-1] - scores[0], 4) if len(scores) > 1 else 0.0,
+        }
+
+    def _matches(self, when, features):
+        if "query_type" in when and features["query_type"] not in when["query_type"]:
+            return False
+        if "min_words" in when and features["words"] < when["min_words"]:
+            return False
+        if "max_words" in when and features["words"] > when["max_words"]:
+            return False
+        top = features["top_distance"]
+        if "max_top_distance" in when and (top is None or top > when["max_top_distance"]):
+            return False
+        if "min_spread" in when and features["spread"] < when["min_spread"]:
+            return False
+        if "max_spread" in when and features["spread"] > when["max_spread"]:
+            return False
+        return True
+
+    def route(self, query, hits):
+        features = self.features(query, hits)
+        for rule in self.routes:
+            if self._matches(rule.get("when", {}), features):
+                model = getattr(settings, 'RAG_MODEL_OVERRIDE', None) or rule["model"]
+                return Route(rule["name"], model, rule["context_k"], features)
+        # No catch-all rule configured: behave like the original pipeline
+        return Route("fallback", "gemini-2.0-flash", 15, features)
+
+
+def log_route(route, query, answer_mode, generation_s, total_s, stages_cut):
+    """
+    Appends one JSON line per routed request to settings.RAG_ROUTING_LOG (if
+    RAG_ROUTING_LOG_ENABLED) so latency and quality can be compared per route
+    (see routing_report.py). The question itself is not written, only a hash
+    (to group repeats) and its length.
+    """
+    path = getattr(settings, 'RAG_ROUTING_LOG', None)
+    if not getattr(settings, 'RAG_ROUTING_LOG_ENABLED', False) or not path:
+        return
+    entry = route.as_dict()
+    entry.update({
+        "ts": time.time(),
+        "query_sha256": hashlib.sha256(query.encode("utf-8")).hexdigest()[:16],
+        "query_chars": len(query),
+        "answer_mode": answer_mode,
+        "generation_s": round(generation_s, 3),
+        "total_s": round(total_s, 3),
+        "stages_cut": [cut["stage"] for cut in stages_cut],
+    })
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"Routing log error: {e}")
@@ -9,7 +9,7 @@ class EvidenceGenerator:
     Handles PDF opening, text searching, highlighting, and image generation.
     """
     
-    def generate_evidence(self, pdf_path, page_number, text_snippet):
+    def generate_evidence(self, pdf_path, page_number, text_snippet, rects=None):
         """
         Generates a highlighted image for the given text on the specific PDF page.
         
@@ -17,6 +17,8 @@ class EvidenceGenerator:
             pdf_path (str): Absolute file path to the PDF.
             page_number (int): 1-indexed page number.
             text_snippet (str): The text to search for and highlight.
+            rects (list): Optional (x0, y0, x1, y1) boxes from the layout index. When
+                given they are highlighted directly and the page is not searched.
             
         Returns:
             str: The relative path to the generated image in MEDIA_ROOT, or None if failed.
@@ -36,11 +38,14 @@ class EvidenceGenerator:
         page_idx = page_number - 1
         page = doc[page_idx]
 
-        # 1. Search for the text
+        # 1. Find the text (precomputed word boxes from the layout index when available)
         # quad_lists is a list of list of genearted quads (rects) for each match
         # We might want to be flexible with whitespace (TEXT_PRESERVE_WHITESPACE not used here, using search_for default)
         # Note: 'text_snippet' should be cleaned/normalized before passed here ideally.
-        text_instances = page.search_for(text_snippet)
+        if rects:
+            text_instances = [fitz.Rect(r) for r in rects]
+        else:
+            text_instances = page.search_for(text_snippet)
 
         # Fallback: If exact match fails, try a smaller chunk or just return the page?
         # Requirement: "If pymupdf cannot find the text coordinates, return the full page image without highlighting."
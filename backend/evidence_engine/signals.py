@@ -0,0 +1,107 @@
+"""
+Keeps Chroma and the evidence images in step with SourceDocument changes:
+deleting or deactivating a document removes its vectors and evidence images
+as soon as the change commits, instead of leaving ghost chunks for
+verify_ghost_data.py to find.
+Reactivating a document queues it for ingestion again (its embeddings are
+normally still in the embedding cache, so this costs no API calls), and so does
+replacing its file (only the pages that changed are re-embedded).
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import SourceDocument, EvidenceArtifact
+
+
+def _remove_vectors(source_doc_id):
+    """
+    Removes the document's chunks from Chroma once the current transaction commits.
+    Shared chunks are re-homed in the database straight away, so that part rolls
+    back together with the delete or deactivation if it fails.
+    """
+    from .ingestion import get_vectorstore
+    from .dedupe import rehome_chunks, store_rehomed
+    try:
+        vectorstore = get_vectorstore()
+        ids = vectorstore.get(where={"source_doc_id": str(source_doc_id)}, include=[])["ids"]
+        copies = rehome_chunks(vectorstore, ids) if ids else []
+    except Exception as e:
+        # verify_ghost_data.py --fix cleans up anything left behind
+        print(f"Could not remove chunks of document {source_doc_id}: {e}")
+        return
+
+    def remove():
+        try:
+            store_rehomed(vectorstore, copies)
+            if ids:
+                vectorstore.delete(ids=ids)
+            print(f"Removed {len(ids)} chunks of document {source_doc_id} from ChromaDB.")
+        except Exception as e:
+            print(f"Could not remove chunks of document {source_doc_id}: {e}")
+
+    transaction.on_commit(remove)
+
+
+@receiver(pre_delete, sender=SourceDocument)
+def remove_deleted_document_vectors(sender, instance, **kwargs):
+    # Runs before the cascade, while fingerprints and occurrences still exist, so
+    # chunks that other documents share are re-homed rather than lost. Chroma itself
+    # is only changed if the delete commits.
+    instance.chunk_occurrences.all().delete()
+    _remove_vectors(instance.id)
+
+
+def _queue_ingestion(source_doc):
+    from .tasks import enqueue
+    doc_id = str(source_doc.id)
+    transaction.on_commit(lambda: enqueue('ingest_documents', {'doc_ids': [doc_id], 'force': False}, unique=True))
+
+
+@receiver(pre_save, sender=SourceDocument)
+def remember_previous_state(sender, instance, update_fields=None, **kwargs):
+    instance._previous = None
+    if instance._state.adding or (update_fields is not None and not {'is_active', 'file_path'} & set(update_fields)):
+        return
+    instance._previous = SourceDocument.objects.filter(pk=instance.pk).values('is_active', 'file_path').first()
+
+
+@receiver(post_save, sender=SourceDocument)
+def handle_activation_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    if previous is None or previous['is_active'] == instance.is_active:
+        return
+
+    if not instance.is_active:
+        instance.chunk_occurrences.all().delete()
+        _remove_vectors(instance.id)
+        instance.evidence_artifacts.all().delete()
+        # checked_at cleared: the next consistency pass confirms the vectors are gone
+        SourceDocument.objects.filter(pk=instance.pk).update(is_ingested=False, chunk_count=0, checked_at=None)
+        instance.is_ingested, instance.chunk_count = False, 0
+    else:
+        _queue_ingestion(instance)
+
+
+@receiver(post_save, sender=SourceDocument)
+def handle_file_replaced(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    if previous is None or not instance.is_active or previous['file_path'] == instance.file_path.name:
+        return
+    # Pages are compared by content hash, so an unchanged republication costs nothing
+    _queue_ingestion(instance)
+
+
+@receiver(post_delete, sender=SourceDocument)
+def delete_normalized_copy(sender, instance, **kwargs):
+    # Derived from the original file (normalize.py); nothing else refers to it
+    if instance.normalized_file:
+        storage, name = instance.normalized_file.storage, instance.normalized_file.name
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+@receiver(post_delete, sender=EvidenceArtifact)
+def delete_evidence_image(sender, instance, **kwargs):
+    # Only once the row is really gone (the transaction may still roll back)
+    if instance.image_path:
+        storage, name = instance.image_path.storage, instance.image_path.name
+        transaction.on_commit(lambda: storage.delete(name))
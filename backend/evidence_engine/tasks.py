@@ -0,0 +1,343 @@
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import BackgroundTask, SourceDocument
+
+# kind -> handler(ctx, **payload); filled in by the @task decorator below
+HANDLERS = {}
+# Kinds that write to Chroma; without a Chroma server they run one at a time (VectorWriterLock)
+VECTOR_WRITER_KINDS = {'ingest_documents', 'rebuild_vectors'}
+
+
+def task(kind):
+    """Registers a function as the handler for tasks of this kind."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, payload=None, unique=False, max_attempts=None):
+    """
+    Adds a task to the queue and returns it. With unique=True an identical task
+    that is still queued or running is returned instead of adding another one.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown task kind: {kind}")
+    payload = payload or {}
+    if unique:
+        pending = BackgroundTask.objects.filter(
+            kind=kind, status__in=[BackgroundTask.Status.QUEUED, BackgroundTask.Status.RUNNING]
+        )
+        for existing in pending:
+            if existing.payload == payload:
+                return existing
+    return BackgroundTask.objects.create(
+        kind=kind,
+        payload=payload,
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class VectorWriterLock:
+    """
+    Cross-process lock on the local Chroma directory, which supports only one
+    writing process at a time. A worker holds it while it runs a vector-writing
+    task; the OS drops it if the process dies. With settings.CHROMA_SERVER_HOST
+    set, writes go through the server and the lock is always granted.
+    """
+
+    def __init__(self, path=None):
+        from .ingestion import CHROMA_DB_DIR
+        self.path = path or f"{CHROMA_DB_DIR}.lock"
+        self.file = None
+
+    def acquire(self):
+        """Takes the lock if it is free, without waiting. Returns True if this process holds it."""
+        if settings.CHROMA_SERVER_HOST or self.file is not None:
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.file = lock_file
+        return True
+
+    def release(self):
+        if self.file is None:
+            return
+        if os.name == "nt":
+            import msvcrt
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
+
+
+def claim_next(worker_id, kinds=None, exclude_kinds=None):
+    """
+    Atomically takes the oldest runnable task: a queued one that is due, or a
+    running one whose lease expired (its worker died). Returns None if idle.
+    Tasks of exclude_kinds are left for other workers.
+
+    The claim is a conditional UPDATE on the row's previous state, so two
+    workers racing for the same task cannot both win, on SQLite or Postgres.
+    """
+    now = timezone.now()
+    candidates = BackgroundTask.objects.filter(
+        Q(status=BackgroundTask.Status.QUEUED, run_after__lte=now)
+        | Q(status=BackgroundTask.Status.RUNNING, locked_until__lt=now)
+    )
+    if kinds:
+        candidates = candidates.filter(kind__in=kinds)
+    if exclude_kinds:
+        candidates = candidates.exclude(kind__in=exclude_kinds)
+
+    for candidate in candidates.order_by('created_at')[:10]:
+        claimed = BackgroundTask.objects.filter(
+            id=candidate.id,
+            status=candidate.status,
+            locked_until=candidate.locked_until,
+            attempts=candidate.attempts,
+        ).update(
+            status=BackgroundTask.Status.RUNNING,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT),
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+        if claimed:
+            candidate.refresh_from_db()
+            return candidate
+    return None
+
+
+def renew_lease(task, worker_id, **fields):
+    """
+    Extends the lease of a running task and writes `fields` with it. Only the
+    worker holding the lease may write; after a lost lease the task belongs to
+    someone else. Returns False in that case.
+    """
+    now = timezone.now()
+    return bool(BackgroundTask.objects.filter(
+        id=task.id, locked_by=worker_id, status=BackgroundTask.Status.RUNNING
+    ).update(
+        locked_until=now + timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT),
+        updated_at=now,
+        **fields
+    ))
+
+
+class LeaseHeartbeat:
+    """
+    Renews a task's lease every TASK_HEARTBEAT_INTERVAL seconds from a background
+    thread while its handler runs, so a long step without progress reports (one
+    large document, a slow API call) does not let the lease expire under a live
+    worker. Use as a context manager around the handler.
+    """
+
+    def __init__(self, task, worker_id, interval=None):
+        self.task = task
+        self.worker_id = worker_id
+        self.interval = settings.TASK_HEARTBEAT_INTERVAL if interval is None else interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=f"lease-{task.id}", daemon=True)
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                if not renew_lease(self.task, self.worker_id):
+                    print(f"⚠️ Task {self.task.id} lease lost; another worker has taken it over.")
+                    break
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+
+
+class TaskContext:
+    """Handed to task handlers for progress reporting; every report also renews the lease."""
+
+    def __init__(self, task, worker_id):
+        self.task = task
+        self.worker_id = worker_id
+
+    def progress(self, done, total=None, message=""):
+        fields = {'progress_done': done, 'progress_message': message[:255]}
+        if total is not None:
+            fields['progress_total'] = total
+        # After a lost lease this run's reports are dropped
+        if not renew_lease(self.task, self.worker_id, **fields):
+            print(f"⚠️ Task {self.task.id} lease lost; another worker has taken it over.")
+
+
+def finish(task, worker_id, **fields):
+    """
+    Writes a task's outcome if this worker still holds its lease. Returns False
+    (and writes nothing) if another worker has taken the task over meanwhile:
+    the outcome is theirs to record.
+    """
+    finished = BackgroundTask.objects.filter(id=task.id, locked_by=worker_id).update(
+        locked_by="", locked_until=None, updated_at=timezone.now(), **fields
+    )
+    if not finished:
+        print(f"⚠️ Task {task.id} lease lost; its outcome is left to the worker that took it over.")
+    return bool(finished)
+
+
+def run_task(task, worker_id):
+    """Runs a claimed task and records the outcome, scheduling a retry on failure."""
+    handler = HANDLERS.get(task.kind)
+    ctx = TaskContext(task, worker_id)
+    try:
+        if handler is None:
+            raise ValueError(f"Unknown task kind: {task.kind}")
+        if task.attempts > task.max_attempts:
+            raise RuntimeError(f"Gave up after {task.max_attempts} attempts (lease expired repeatedly)")
+        with LeaseHeartbeat(task, worker_id):
+            result = handler(ctx, **task.payload)
+    except Exception as e:
+        error = f"{e}\n\n{traceback.format_exc()}"
+        if handler is not None and task.attempts < task.max_attempts:
+            delay = settings.TASK_RETRY_BACKOFF * 2 ** (task.attempts - 1)
+            if finish(task, worker_id, status=BackgroundTask.Status.QUEUED, error=error,
+                      run_after=timezone.now() + timedelta(seconds=delay)):
+                print(f"⚠️ Task {task.kind} failed (attempt {task.attempts}/{task.max_attempts}), retrying in {delay}s: {e}")
+        elif finish(task, worker_id, status=BackgroundTask.Status.FAILED, error=error, finished_at=timezone.now()):
+            print(f"❌ Task {task.kind} failed permanently: {e}")
+        task.refresh_from_db()
+        return False
+
+    ok = finish(task, worker_id, status=BackgroundTask.Status.DONE, result=result, error="",
+                finished_at=timezone.now())
+    task.refresh_from_db()
+    return ok
+
+
+def release(task):
+    """Puts a task this worker is abandoning (e.g. on shutdown) straight back in the queue."""
+    BackgroundTask.objects.filter(id=task.id, locked_by=task.locked_by, status=BackgroundTask.Status.RUNNING).update(
+        status=BackgroundTask.Status.QUEUED,
+        attempts=F('attempts') - 1,
+        locked_by="",
+        locked_until=None,
+    )
+
+
+# --- Task handlers ---
+
+@task('ingest_documents')
+def ingest_documents_task(ctx, doc_ids=None, force=False):
+    """Ingests the given documents (all active ones if doc_ids is None) through the pipeline."""
+    from .pipeline import run_ingestion_pipeline
+
+    docs = SourceDocument.objects.filter(is_active=True)
+    if doc_ids is not None:
+        docs = docs.filter(id__in=doc_ids)
+    docs = list(docs)
+    finished = []
+    ctx.progress(0, len(docs), "Parsing")
+
+    def on_progress(event, doc_id, **info):
+        if event in ('done', 'skipped', 'failed'):
+            finished.append(doc_id)
+            ctx.progress(len(finished), message=f"{event}: {doc_id}")
+        elif event == 'batch':
+            ctx.progress(len(finished), message=f"{doc_id}: {info['chunks_written']} chunks written")
+
+    result = run_ingestion_pipeline(docs, force=force, on_progress=on_progress)
+    if result['errors']:
+        # The retry only needs to cover the documents that failed
+        ctx.task.payload = {'doc_ids': list(result['errors']), 'force': force}
+        BackgroundTask.objects.filter(id=ctx.task.id).update(payload=ctx.task.payload)
+        raise RuntimeError(f"{len(result['errors'])} of {len(docs)} documents failed: {result['errors']}")
+    return {
+        'documents': len(docs),
+        'skipped': len(result['skipped']),
+        'seconds': round(result['seconds'], 1),
+    }
+
+
+@task('scrape')
+def scrape_task(ctx, authorities=None, recheck=False):
+    """
+    Runs the scrapers (all registered ones if authorities is None). New documents
+    are saved and queued for ingestion as separate tasks.
+    """
+    from scrapers.base import load_scrapers
+    from scrapers.engine import ScrapeEngine
+
+    authorities = authorities or sorted(load_scrapers())
+    engine = ScrapeEngine(recheck=recheck)
+    totals = {}
+    try:
+        for n, authority in enumerate(authorities):
+            ctx.progress(n, len(authorities), f"Scraping {authority}")
+            totals.update(engine.run([authority]))
+    finally:
+        engine.close()
+    ctx.progress(len(authorities), len(authorities), "Done")
+    return {'saved': totals}
+
+
+@task('scrape_bnm')
+def scrape_bnm_task(ctx):
+    """Kept for tasks queued before 'scrape' existed."""
+    return scrape_task(ctx, authorities=[SourceDocument.Authority.BNM])
+
+
+@task('rebuild_vectors')
+def rebuild_vectors_task(ctx, activate=True, name=None):
+    """
+    Builds a new vector collection version while the active one keeps serving,
+    and switches to it if it passes validation (see vector_collections.py).
+    With `name`, an already built version is only caught up and activated.
+    """
+    from . import vector_collections
+    from .models import VectorCollection
+
+    if name is None:
+        record = vector_collections.build_collection(
+            progress=lambda done, total, title: ctx.progress(done, total, f"Built: {title}")
+        )
+        # A retry (e.g. activation blocked by a running ingestion) reuses this build
+        ctx.task.payload = {'activate': activate, 'name': record.name}
+        BackgroundTask.objects.filter(id=ctx.task.id).update(payload=ctx.task.payload)
+    else:
+        record = VectorCollection.objects.get(name=name)
+
+    if activate:
+        ctx.progress(0, 1, f"Catching up and activating {record.name}")
+        vector_collections.activate(record)
+        vector_collections.cleanup()
+        ctx.progress(1, 1, f"{record.name} active")
+    elif record.status == VectorCollection.Status.FAILED:
+        raise RuntimeError(record.error)
+    return {'collection': record.name, 'status': record.status, 'chunks': record.chunk_count}
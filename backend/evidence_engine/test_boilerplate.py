@@ -0,0 +1,67 @@
+"""
+Checks running header/footer detection and stripping (boilerplate.py), and that
+the word layout of a stripped page still lines up with its text.
+
+    python evidence_engine/test_boilerplate.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import fitz
+from evidence_engine.boilerplate import detect_boilerplate, strip_boilerplate, normalize_line
+from evidence_engine.layout import build_page_layout
+
+HEADER = "BANK NEGARA MALAYSIA Policy Document on Tawarruq"
+
+
+def page_text(number, total, body):
+    return "\n".join([HEADER, "Issued on: 1 January 2024", *body, f"Page {number} of {total}"])
+
+
+def run_test():
+    print("=== BOILERPLATE TEST ===")
+    body = [f"Clause {i}: the commodity must be owned before it is sold to the customer." for i in range(12)]
+    pages = [page_text(n, 6, body[n:n + 8]) for n in range(1, 7)]
+
+    # 1. Repeated edge lines are detected, numbers masked; body lines are not
+    boilerplate = detect_boilerplate(pages)
+    assert normalize_line(HEADER) in boilerplate
+    assert normalize_line("Page 3 of 6") in boilerplate
+    assert not any(line.startswith("clause") for line in boilerplate), boilerplate
+    assert detect_boilerplate(pages[:2]) == set(), "too few pages to tell"
+    print(f"Detected {len(boilerplate)} boilerplate lines")
+
+    # 2. A line repeated twice on one page is a content pattern, not boilerplate
+    table = ["Row 1 amount 100", "Row 2 amount 200"]
+    assert normalize_line("Row 1 amount 100") not in detect_boilerplate(
+        ["\n".join(table + body[:6] + table) for _ in range(5)]
+    )
+
+    # 3. Only the top and bottom lines are stripped; the title quoted in the body stays
+    quoted = body[:4] + [HEADER] + body[4:8]
+    text, removed = strip_boilerplate(page_text(2, 6, quoted), boilerplate)
+    assert removed == 3, removed
+    assert text.splitlines() == quoted
+    print(f"Stripped {removed} edge lines, kept the title quoted in the body")
+
+    # 4. The word layout skips exactly the stripped lines, so offsets stay aligned
+    doc = fitz.open()
+    page = doc.new_page()
+    for i, line in enumerate(page_text(2, 6, quoted).splitlines()):
+        page.insert_text((40, 50 + i * 20), line)
+    original = page.get_text()
+    text, removed = strip_boilerplate(original, boilerplate)
+    starts, ends, rects = build_page_layout(page, text, boilerplate)
+    words = [w[4] for w in page.get_text("words")]
+    kept = text.split()
+    assert len(starts) == len(kept) == len(words) - len(" ".join([HEADER, "Issued on: 1 January 2024", "Page 2 of 6"]).split())
+    assert [text[s:e] for s, e in zip(starts, ends)] == kept
+    print(f"Layout of {len(starts)} words matches the stripped text")
+
+    print("✅ All boilerplate checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,119 @@
+"""
+Checks the incremental consistency check (consistency.py) in a throwaway
+database and Chroma directory with a local fake embedding model: documents
+unchanged since their last clean check are compared by total count only, and
+ghost chunks or chunks missing behind an unchanged document's back are still found.
+
+    python evidence_engine/test_consistency.py
+"""
+import os
+import sys
+import uuid
+import tempfile
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings
+from evidence_engine import ingestion
+from evidence_engine.consistency import check_consistency
+from evidence_engine.models import SourceDocument
+from evidence_engine.test_reingest import CountingEmbedding, write_pdf, use_scratch_environment
+
+
+class CountingCollection:
+    """Wraps the Chroma collection to count per-document lookups."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.gets = 0
+
+    def get(self, **kwargs):
+        self.gets += 1
+        return self.collection.get(**kwargs)
+
+    def count(self):
+        return self.collection.count()
+
+
+class Store:
+    def __init__(self, collection):
+        self._collection = collection
+
+
+def add_document(name, topics):
+    path = os.path.join(settings.MEDIA_ROOT, "source_documents", f"{name}.pdf")
+    write_pdf(path, topics)
+    doc = SourceDocument.objects.create(title=name, authority="BNM", source_url=f"http://x/{name}.pdf")
+    doc.file_path.name = f"source_documents/{name}.pdf"
+    doc.save()
+    assert ingestion.ingest_document(doc)
+    return doc, path
+
+
+def check(vectorstore, **kwargs):
+    store = Store(CountingCollection(vectorstore._collection))
+    report = check_consistency(store, **kwargs)
+    return report, store._collection.gets
+
+
+def run_test():
+    print("=== CONSISTENCY CHECK TEST ===")
+    use_scratch_environment(tempfile.mkdtemp(), CountingEmbedding(size=8))
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, "source_documents"))
+    docs = [add_document(name, topics) for name, topics in [
+        ("tawarruq", ["Tawarruq", "Commodity"]), ("ijarah", ["Ijarah"]), ("wakalah", ["Wakalah", "Agency"]),
+    ]]
+    vectorstore = ingestion.get_vectorstore()
+
+    # 1. First pass looks up every document; the next one none of them
+    report, gets = check(vectorstore)
+    assert report["checked"] == 3 and not report["mismatched"] and not report["ghost_ids"]
+    report, gets = check(vectorstore)
+    assert report["checked"] == 0 and gets == 0, (report["checked"], gets)
+    print(f"Second pass: 0 of 3 documents looked up, {report['total']} chunks compared by count")
+
+    # 2. Only the re-ingested document is looked up again
+    doc, path = docs[1]
+    write_pdf(path, ["Ijarah", "Lease"])
+    assert ingestion.ingest_document(SourceDocument.objects.get(id=doc.id))
+    report, gets = check(vectorstore)
+    assert report["checked"] == 1 and gets == 1 and not report["mismatched"]
+
+    # 3. A ghost chunk shows up in the aggregate and is found by filter
+    ghost = {"source_doc_id": str(uuid.uuid4()), "page_number": 1}
+    vectorstore._collection.upsert(ids=["ghost"], embeddings=[[0.0] * 8], metadatas=[ghost], documents=["x"])
+    report, gets = check(vectorstore)
+    assert report["ghost_ids"] == ["ghost"] and report["checked"] == 0 and not report["mismatched"]
+    vectorstore._collection.delete(ids=["ghost"])
+
+    # 4. A chunk lost behind an unchanged document's back: the aggregate is off, so all are looked up
+    doc, _ = docs[2]
+    lost = vectorstore.get(where={"source_doc_id": str(doc.id)}, include=[])["ids"][0]
+    vectorstore._collection.delete(ids=[lost])
+    report, gets = check(vectorstore)
+    assert [(d.id, expected - actual) for d, expected, actual in report["mismatched"]] == [(doc.id, 1)]
+    assert report["checked"] == 3
+    print(f"Lost chunk of {doc.title} found after the aggregate disagreed")
+
+    # 5. It stays flagged until repaired, and a deactivated document is looked up again
+    report, _ = check(vectorstore)
+    assert len(report["mismatched"]) == 1
+    doc, _ = docs[0]
+    doc.is_active = False
+    doc.save()
+    report, _ = check(vectorstore)
+    assert doc.id in [d.id for d in SourceDocument.objects.filter(checked_at__isnull=False)]
+    assert not [d for d, _, _ in report["mismatched"] if d.id == doc.id]
+    assert report["checked"] >= 2
+
+    report, gets = check(vectorstore, full=True)
+    assert report["checked"] == 3
+
+    print("✅ All consistency checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,61 @@
+"""
+Checks the per-request Deadline (deadline.py): budgets per endpoint, time left,
+which stages may still run, and the record of stages that were cut.
+
+    python evidence_engine/test_deadline.py
+"""
+import os
+import sys
+import time
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings
+from evidence_engine.deadline import Deadline
+
+
+def run_test():
+    print("=== DEADLINE TEST ===")
+    budgets = settings.RAG_STAGE_BUDGETS
+
+    # 1. Budgets come from RAG_DEADLINES, unknown endpoints get the default
+    assert Deadline.for_endpoint('chat_message').seconds == settings.RAG_DEADLINES['chat_message']
+    assert Deadline.for_endpoint('no_such_endpoint').seconds == settings.RAG_DEADLINES['default']
+
+    # 2. Without a budget every stage runs
+    unlimited = Deadline(None)
+    assert unlimited.remaining() == float('inf')
+    assert all(unlimited.allows(stage) for stage in budgets)
+
+    # 3. Time left shrinks; a stage runs only while its budget still fits
+    deadline = Deadline(budgets['rerank'] + 0.2)
+    assert deadline.allows('rerank') and deadline.allows('generation')
+    time.sleep(0.3)
+    assert deadline.remaining() < budgets['rerank']
+    assert not deadline.allows('rerank'), "rerank must be skipped once its budget no longer fits"
+    assert deadline.allows('generation')
+    assert deadline.allows('no_budget_stage')
+    print(f"After {deadline.elapsed():.1f}s: {deadline.remaining():.1f}s left, rerank skipped, generation allowed")
+
+    # 4. An expired deadline allows nothing with a budget and never goes negative
+    expired = Deadline(0.05)
+    time.sleep(0.1)
+    assert expired.remaining() == 0.0
+    assert not any(expired.allows(stage) for stage, needed in budgets.items() if needed > 0)
+
+    # 5. Cut stages are recorded for the API response, in order
+    deadline.cut('rerank', "skipped")
+    deadline.cut('evidence', "1 of 3 images")
+    assert deadline.stages_cut == [
+        {"stage": "rerank", "detail": "skipped"},
+        {"stage": "evidence", "detail": "1 of 3 images"},
+    ]
+
+    print("✅ All deadline checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
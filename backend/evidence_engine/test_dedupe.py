@@ -0,0 +1,94 @@
+"""
+Checks MinHash near-duplicate detection (minhash.py) and dedupe_chunks against
+the persistent LSH index (dedupe.py), in a throwaway database: matches across
+documents and within one window, and one candidate query per 500 band keys.
+
+    python evidence_engine/test_dedupe.py
+"""
+import os
+import sys
+import math
+import tempfile
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from langchain_core.documents import Document
+from evidence_engine import minhash
+from evidence_engine.dedupe import NearDuplicateIndex, dedupe_chunks, save_fingerprints
+from evidence_engine.models import SourceDocument
+
+
+def clause(n, variant=""):
+    return (f"Clause {n}: the Islamic financial institution shall ensure that the commodity{variant} "
+            f"is owned and in its possession before it is sold to the customer under contract {n}, "
+            f"and that the sale price and the deferred payment terms of contract {n} are disclosed in writing.")
+
+
+def chunks(texts, prefix):
+    splits = [Document(page_content=text, metadata={'page_number': 1, 'start_index': i}) for i, text in enumerate(texts)]
+    return splits, [f"{prefix}-{i}" for i in range(len(texts))]
+
+
+def run_minhash_test():
+    print("=== MINHASH TEST ===")
+    sig = minhash.signature(clause(1))
+    assert (sig == minhash.signature(clause(1))).all(), "signatures must be deterministic"
+    assert (minhash.from_bytes(minhash.to_bytes(sig)) == sig).all()
+
+    near = minhash.signature(clause(1, " (goods)"))
+    other = minhash.signature("Wakalah fees must be agreed upfront and stated as a fixed amount or a percentage.")
+    print(f"near-duplicate {minhash.similarity(sig, near):.2f}, unrelated {minhash.similarity(sig, other):.2f}")
+    assert minhash.similarity(sig, near) >= 0.7
+    assert minhash.similarity(sig, other) < 0.2
+    assert set(minhash.band_keys(sig)) & set(minhash.band_keys(near)), "near-duplicates should share a band"
+    assert not set(minhash.band_keys(sig)) & set(minhash.band_keys(other))
+    print("✅ All minhash checks passed.")
+
+
+def run_dedupe_test():
+    print("\n=== DEDUPE TEST ===")
+    settings.DATABASES['default']['NAME'] = os.path.join(tempfile.mkdtemp(), "test_dedupe.sqlite3")
+    call_command('migrate', verbosity=0)
+    doc_a = SourceDocument.objects.create(title="A", authority="BNM", source_url="http://a")
+    doc_b = SourceDocument.objects.create(title="B", authority="AAOIFI", source_url="http://b")
+
+    # 1. Document A is stored and fingerprinted
+    index = NearDuplicateIndex(threshold=0.9)
+    splits, ids = chunks([clause(n) for n in range(20)], "a")
+    keep_splits, keep_ids, signatures, duplicates = dedupe_chunks(index, splits, ids)
+    assert len(keep_ids) == 20 and not duplicates
+    save_fingerprints(doc_a, keep_splits, keep_ids, signatures)
+
+    # 2. Document B: 20 copies of A's clauses, 19 new ones and one repeated within the window
+    texts = [clause(n) for n in range(20)] + [clause(n, " of the bank") for n in range(100, 119)] + [clause(100, " of the bank")]
+    splits, ids = chunks(texts, "b")
+    index = NearDuplicateIndex(threshold=0.9)
+    with CaptureQueriesContext(connection) as queries:
+        keep_splits, keep_ids, signatures, duplicates = dedupe_chunks(index, splits, ids)
+    keys = {key for text in texts for key in minhash.band_keys(minhash.signature(text))}
+    print(f"{len(texts)} chunks, {len(keys)} band keys, {len(queries)} queries: "
+          f"{len(keep_ids)} kept, {len(duplicates)} duplicates")
+    assert len(queries) == math.ceil(len(keys) / 500), "candidates must be fetched per window"
+    assert keep_ids == [f"b-{i}" for i in range(20, 39)]
+    matched = {chunk_id: canonical for _, chunk_id, canonical, _ in duplicates}
+    assert all(matched[f"b-{n}"] == f"a-{n}" for n in range(20)), "matched to A's stored copy"
+    assert matched["b-39"] == "b-20", "duplicate within the window matched to its first copy"
+    assert all(score >= 0.9 for *_, score in duplicates)
+    save_fingerprints(doc_b, keep_splits, keep_ids, signatures)
+
+    # 3. A chunk never matches itself (re-ingesting the same document)
+    sig = minhash.signature(clause(0))
+    assert NearDuplicateIndex(threshold=0.9).find(sig, minhash.band_keys(sig), exclude_ids={"a-0"}) is None
+    print("✅ All dedupe checks passed.")
+
+
+if __name__ == "__main__":
+    run_minhash_test()
+    run_dedupe_test()
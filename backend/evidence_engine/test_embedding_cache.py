@@ -0,0 +1,66 @@
+"""
+Checks the on-disk embedding cache (embedding_cache.py) and how the
+EmbeddingSubmitter uses it: vectors survive a reopen, entries are per model,
+and only texts never seen before are sent to the embedding model.
+
+    python evidence_engine/test_embedding_cache.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from evidence_engine.embedding import EmbeddingSubmitter
+from evidence_engine.embedding_cache import EmbeddingCache
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Local fake model that counts the texts it is asked to embed."""
+    calls: list = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def run_test():
+    print("=== EMBEDDING CACHE TEST ===")
+    path = os.path.join(tempfile.mkdtemp(), "embedding_cache.sqlite3")
+
+    # 1. Round trip through float32 blobs, keyed by model and text
+    cache = EmbeddingCache(path)
+    cache.put_many("model-a", ["tawarruq", "ijarah"], [[0.5, -1.25, 3.0], [1.0, 2.0, 4.0]])
+    assert cache.get_many("model-a", ["ijarah", "wakalah", "tawarruq"]) == [[1.0, 2.0, 4.0], None, [0.5, -1.25, 3.0]]
+    assert cache.get_many("model-b", ["tawarruq"]) == [None], "entries belong to one model"
+    assert (cache.hits, cache.misses) == (2, 2)
+    cache.close()
+
+    # 2. Survives a reopen; more than 500 texts are looked up in batches
+    cache = EmbeddingCache(path)
+    assert cache.get_many("model-a", ["tawarruq"]) == [[0.5, -1.25, 3.0]]
+    texts = [f"clause {i}" for i in range(1200)]
+    cache.put_many("model-a", texts, [[float(i)] for i in range(1200)])
+    assert cache.get_many("model-a", texts)[1150] == [1150.0]
+    print("Vectors round-trip, per model, across reopen and in batches")
+
+    # 3. The submitter embeds only texts not cached yet, and each of them once
+    model = CountingEmbedding(size=8)
+    submitter = EmbeddingSubmitter(model, concurrency=1, rate_per_min=10 ** 9, cache=cache)
+    cache.put_many(submitter.model_name, ["clause 3"], [[3.0]])
+    first = submitter.embed(["new clause one", "new clause two", "new clause one", "clause 3"])
+    assert model.calls == [["new clause one", "new clause two"]], model.calls
+    assert first[0] == first[2] and first[3] == [3.0]
+    second = submitter.embed(["new clause two", "new clause one"])
+    assert len(model.calls) == 1, "second run must be served from the cache"
+    # Cached vectors are float32
+    assert all(abs(a - b) < 1e-6 for got, want in zip(second, [first[1], first[0]]) for a, b in zip(got, want))
+    print(f"Model called once for 2 new texts; cache hits {cache.hits}, misses {cache.misses}")
+    cache.close()
+
+    print("✅ All embedding cache checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,83 @@
+"""
+Checks the extractive fast path (extractive.py): which questions count as
+lookups, the confidence gate on retrieval distances, and the sentence picked
+as the answer.
+
+    python evidence_engine/test_extractive.py
+"""
+import os
+import sys
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings
+from langchain_core.documents import Document
+from evidence_engine.extractive import match_lookup, best_sentence, is_confident, extract_answer
+
+TAWARRUQ = Document(
+    page_content=(
+        "1. Introduction. This policy document applies to all Islamic banks.\n\n"
+        "Tawarruq is a sale of an asset to a purchaser on a deferred basis, after which the purchaser "
+        "sells it to a third party for cash. Tawarruq arrangements must involve real commodities."
+    ),
+    metadata={"page_number": 4},
+)
+OTHER = Document(page_content="Wakalah fees shall be agreed upfront.", metadata={"page_number": 9})
+
+
+def run_test():
+    print("=== EXTRACTIVE TEST ===")
+
+    # 1. Lookup questions and their term; everything else goes to the LLM
+    assert match_lookup("What is tawarruq?") == "tawarruq"
+    assert match_lookup("Define murabahah.") == "murabahah"
+    assert match_lookup("What is the meaning of bai inah?") == "bai inah"
+    for query in ["What is the difference between tawarruq and murabahah?",
+                  "What is tawarruq vs bai inah",
+                  "How should a bank structure a tawarruq facility for SMEs?"]:
+        assert match_lookup(query) is None, query
+    for query in ["What is it?", "What is this?", "What is ar?"]:
+        assert match_lookup(query) is None, "too vague to look up: " + query
+    print("Lookups recognised, comparisons, vague and open questions left to the LLM")
+
+    # 2. The gate: a close top hit, clearly ahead of the runner-up
+    assert is_confident([(TAWARRUQ, 0.10), (OTHER, 0.40)])
+    assert is_confident([(TAWARRUQ, 0.10)])
+    assert not is_confident([])
+    assert not is_confident([(TAWARRUQ, settings.EXTRACTIVE_MAX_DISTANCE + 0.01)]), "too far"
+    assert not is_confident([(TAWARRUQ, 0.10), (OTHER, 0.11)]), "runner-up too close"
+    assert is_confident([(TAWARRUQ, 0.10), (OTHER, 0.11)], min_margin=0.005)
+
+    # 3. Terms match whole words only; a "<term> means" sentence beats a generic "is"
+    text = "Ribawi items are listed in the schedule. Riba is prohibited in all contracts here."
+    assert best_sentence("riba", text) == "Riba is prohibited in all contracts here."
+    assert best_sentence("riba", "Ribawi items are listed in the schedule.") is None
+    text = "Ijarah is the subject of this part. Ijarah refers to a lease, which means renting the usufruct."
+    assert best_sentence("ijarah", text) == "Ijarah refers to a lease, which means renting the usufruct."
+    assert best_sentence("it", "It is a sale of an asset on a deferred basis.") is None
+
+    # 4. The answer is the defining sentence of the top chunk
+    settings.EXTRACTIVE_ENABLED = True
+    result = extract_answer("What is tawarruq?", [(TAWARRUQ, 0.10), (OTHER, 0.40)])
+    assert result is not None
+    sentence, doc, score = result
+    assert sentence.startswith("Tawarruq is a sale of an asset"), sentence
+    assert doc is TAWARRUQ and score == 0.10
+    print(f"Answer: {sentence[:60]}...")
+
+    # 5. No fast path when unsure, off topic or disabled
+    assert extract_answer("What is tawarruq?", [(TAWARRUQ, 0.10), (OTHER, 0.105)]) is None
+    assert extract_answer("What is ijarah?", [(TAWARRUQ, 0.10)]) is None, "no sentence mentions the term"
+    assert extract_answer("Compare tawarruq and ijarah", [(TAWARRUQ, 0.10)]) is None
+    settings.EXTRACTIVE_ENABLED = False
+    assert extract_answer("What is tawarruq?", [(TAWARRUQ, 0.10)]) is None
+    settings.EXTRACTIVE_ENABLED = True
+
+    print("✅ All extractive checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,69 @@
+"""
+Checks the word layout index used for highlighting (layout.py): alignment of a
+PDF page's words with its text, the packed blob round trip, and highlight
+rectangles compared with a text search on the page.
+
+    python evidence_engine/test_layout.py
+"""
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import fitz
+from evidence_engine.layout import build_page_layout, pack_layout, unpack_layout, word_range, span_rects
+
+LINES = [
+    "Tawarruq arrangements must involve real commodities.",
+    "The Islamic bank shall ensure that it owns the",
+    "commodity before selling it to the customer.",
+]
+
+
+def make_page():
+    doc = fitz.open()
+    page = doc.new_page()
+    for i, line in enumerate(LINES):
+        page.insert_text((50, 80 + i * 20), line)
+    return doc, page
+
+
+def run_test():
+    print("=== LAYOUT TEST ===")
+    doc, page = make_page()
+    text = page.get_text()
+
+    # 1. Every word gets the character span it has in the page text
+    layout = build_page_layout(page, text)
+    starts, ends, rects = layout
+    words = [w[4] for w in page.get_text("words")]
+    assert [text[s:e] for s, e in zip(starts, ends)] == words
+    assert len(rects) == 4 * len(words)
+
+    # 2. The packed blob round-trips exactly and is small
+    blob = pack_layout(*layout)
+    assert unpack_layout(blob) == layout
+    print(f"{len(words)} words packed into {len(blob)} bytes")
+
+    # 3. Characters map to the words they overlap, partial words included
+    start = text.index("owns")
+    assert word_range(layout, start + 1, start + 3) == (words.index("owns"), words.index("owns") + 1)
+    assert word_range(layout, 0, 0) == (0, 0)
+
+    # 4. A quote spanning two lines gives one rectangle per line, where the text is on the page
+    quote = "it owns the\ncommodity before selling"
+    start = text.index(quote)
+    highlight = span_rects(layout, start, start + len(quote))
+    searched = page.search_for("it owns the commodity before selling")
+    assert len(highlight) == 2 == len(searched), (highlight, searched)
+    for (x0, y0, x1, y1), rect in zip(highlight, searched):
+        assert abs(x0 - rect.x0) < 1 and abs(x1 - rect.x1) < 1
+        assert y0 < (rect.y0 + rect.y1) / 2 < y1
+    print(f"Two-line quote -> {[tuple(round(v) for v in r) for r in highlight]}")
+    doc.close()
+
+    print("✅ All layout checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
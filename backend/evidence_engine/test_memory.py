@@ -0,0 +1,82 @@
+"""
+Checks ConversationMemory without a database or API key: which questions are
+searched together with the previous one, and the time limit of the summary call.
+
+    python evidence_engine/test_memory.py
+"""
+import os
+import sys
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings
+from evidence_engine.deadline import Deadline
+from evidence_engine.memory import ConversationMemory, is_follow_up
+from evidence_engine.models import ChatSession, ChatMessage
+
+
+class RecordingClient:
+    """Stands in for the GenAI client and remembers the config of each call."""
+
+    def __init__(self):
+        self.models = self
+        self.configs = []
+
+    def generate_content(self, model, contents, config=None):
+        self.configs.append(config)
+        return type("Response", (), {"text": "Discussed tawarruq under BNM."})()
+
+
+def memory_with(previous_question):
+    memory = ConversationMemory(ChatSession())
+    memory.recent = [
+        ChatMessage(sender=ChatMessage.Sender.USER, text_content=previous_question),
+        ChatMessage(sender=ChatMessage.Sender.AI, text_content="Tawarruq is permitted subject to ..."),
+    ]
+    return memory
+
+
+def run_test():
+    print("=== CONVERSATION MEMORY TEST ===")
+    previous = "What are the requirements for tawarruq in BNM?"
+    memory = memory_with(previous)
+
+    # 1. Follow-ups get the previous question prepended
+    for query in ["And in Malaysia?", "What about AAOIFI?", "how about ijarah", "Is it allowed?",
+                  "What do they require?", "Why?", "Explain more please", "Ini dibenarkan?"]:
+        assert is_follow_up(query), query
+        assert memory.retrieval_query(query) == f"{previous} {query}", query
+    print("Follow-ups are searched with the previous question")
+
+    # 2. Short questions with a topic of their own are left alone
+    for query in ["What is tawarruq?", "Define murabahah", "Wakalah fee rules", "Is bai inah permissible?"]:
+        assert not is_follow_up(query), query
+        assert memory.retrieval_query(query) == query, query
+    print("Standalone short questions are searched as they are")
+
+    # 3. Long questions and a first question are never rewritten
+    long_query = "And what about the ownership requirement before the sale of the commodity in Malaysia?"
+    assert len(long_query.split()) > settings.CHAT_FOLLOWUP_MAX_WORDS
+    assert memory.retrieval_query(long_query) == long_query
+    assert ConversationMemory(ChatSession()).retrieval_query("And in Malaysia?") == "And in Malaysia?"
+
+    # 4. The summary call gets the time left minus the answer's generation budget
+    client = RecordingClient()
+    deadline = Deadline(20)
+    summary = memory._summarize("", memory.recent, client, deadline)
+    timeout = client.configs[-1].http_options.timeout
+    expected = (20 - settings.RAG_STAGE_BUDGETS['generation']) * 1000
+    assert summary == "Discussed tawarruq under BNM."
+    assert expected - 1000 < timeout <= expected, timeout
+    memory._summarize("", memory.recent, client, Deadline(None))
+    assert client.configs[-1] is None
+    print(f"Summary call limited to {timeout} ms of a 20 s budget")
+
+    print("✅ All memory checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
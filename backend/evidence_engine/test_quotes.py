@@ -0,0 +1,62 @@
+"""
+Checks how the LLM's QUOTE is mapped back to a retrieved chunk (quotes.py):
+exact matches despite case, whitespace and echoed [Source n] tags, fuzzy
+matches of paraphrased quotes, and quotes that match nothing.
+
+    python evidence_engine/test_quotes.py
+"""
+import os
+import sys
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from langchain_core.documents import Document
+from evidence_engine.quotes import clean_quote, locate_quote
+
+FIRST = Document(
+    page_content="Wakalah fees shall be agreed upfront.\nThe agent shall not charge\nany other fee.",
+    metadata={"page_number": 3},
+)
+SECOND = Document(
+    page_content=(
+        "Tawarruq  arrangements must involve real commodities. The Islamic bank shall ensure\n"
+        "that it owns the commodity before selling it to the customer."
+    ),
+    metadata={"page_number": 7},
+)
+HITS = [(FIRST, 0.21), (SECOND, 0.25)]
+
+
+def run_test():
+    print("=== QUOTE LOCATION TEST ===")
+    assert clean_quote('[Source 1] (Page 7): "real commodities"') == "real commodities"
+
+    # 1. Exact match in the second hit: case, line breaks and double spaces do not matter
+    quote = '[Source 1] "The Islamic bank shall ensure that it OWNS the commodity"'
+    doc, score, span, (start, end) = locate_quote(quote, HITS)
+    assert doc is SECOND and score == 0.25
+    assert span == SECOND.page_content[start:end]
+    assert span == "The Islamic bank shall ensure\nthat it owns the commodity", repr(span)
+    print(f"Exact: page {doc.metadata['page_number']} chars {start}-{end}")
+
+    # 2. A slightly paraphrased quote is found by fuzzy alignment; the span is the chunk's own text
+    quote = "Tawarruq arrangement must involve real commodity"
+    doc, score, span, (start, end) = locate_quote(quote, HITS)
+    assert doc is SECOND
+    assert span == SECOND.page_content[start:end]
+    assert "real commodit" in span and span.startswith("Tawarruq"), repr(span)
+    print(f"Fuzzy: {span!r}")
+
+    # 3. Nothing close enough, too short, or no hits
+    assert locate_quote("Sukuk holders are entitled to periodic distributions.", HITS) is None
+    assert locate_quote("fees", HITS) is None
+    assert locate_quote("Wakalah fees shall be agreed upfront.", []) is None
+
+    print("✅ All quote location checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,155 @@
+"""
+Checks re-ingestion of a replaced file (ingest_document, the bulk pipeline and
+reembed_page) in a throwaway database, media folder and Chroma directory, with a local fake
+embedding model: only changed pages are re-chunked and embedded, chunks of
+unchanged pages keep their IDs, and chunks, layouts and evidence images of
+changed or removed pages are dropped, re-homing chunks other documents share.
+
+    python evidence_engine/test_reingest.py
+"""
+import os
+import sys
+import tempfile
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import fitz
+from django.conf import settings
+from django.core.management import call_command
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from evidence_engine import ingestion, pipeline
+from evidence_engine.embedding import EmbeddingSubmitter
+from evidence_engine.models import SourceDocument, EvidenceArtifact, ChunkOccurrence
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Local fake model that counts the texts it is asked to embed."""
+    texts: list = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+
+def write_pdf(path, pages):
+    doc = fitz.open()
+    for topic in pages:
+        page = doc.new_page()
+        for line in range(30):
+            page.insert_text((40, 50 + line * 22), f"{topic} clause {line}: the terms of {topic} apply to line {line}.")
+    doc.save(path)
+
+
+def use_scratch_environment(workdir, model):
+    settings.DATABASES['default']['NAME'] = os.path.join(workdir, "db.sqlite3")
+    settings.MEDIA_ROOT = os.path.join(workdir, "media")
+    call_command('migrate', verbosity=0)
+    ingestion.CHROMA_DB_DIR = os.path.join(workdir, "chroma")
+    ingestion._submitter = EmbeddingSubmitter(model, concurrency=1, rate_per_min=10 ** 9)
+    get_vectorstore = ingestion.get_vectorstore
+    pipeline.get_vectorstore = ingestion.get_vectorstore = (
+        lambda embeddings=None, collection_name=None: get_vectorstore(model, collection_name)
+    )
+
+
+def stored_ids(vectorstore, doc, page_number):
+    where = {"$and": [{"source_doc_id": str(doc.id)}, {"page_number": page_number}]}
+    return set(vectorstore.get(where=where, include=[])["ids"])
+
+
+def add_evidence(doc, page_number):
+    name = f"evidence_artifacts/p{page_number}.png"
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, "evidence_artifacts"), exist_ok=True)
+    open(os.path.join(settings.MEDIA_ROOT, name), "wb").close()
+    return EvidenceArtifact.objects.create(source_doc=doc, page_number=page_number, highlighted_text="x", image_path=name)
+
+
+def run_test():
+    print("=== CHANGED PAGES RE-INGEST TEST ===")
+    model = CountingEmbedding(size=8)
+    use_scratch_environment(tempfile.mkdtemp(), model)
+    os.makedirs(os.path.join(settings.MEDIA_ROOT, "source_documents"))
+    path = os.path.join(settings.MEDIA_ROOT, "source_documents", "policy.pdf")
+    write_pdf(path, ["Tawarruq", "Murabahah", "Ijarah", "Wakalah", "Sukuk"])
+    doc = SourceDocument.objects.create(title="Policy", authority="BNM", source_url="http://x/policy.pdf")
+    doc.file_path.name = "source_documents/policy.pdf"
+    doc.save()
+    vectorstore = ingestion.get_vectorstore()
+
+    # 1. First ingestion embeds every page
+    assert ingestion.ingest_document(doc)
+    per_page = {n: stored_ids(vectorstore, doc, n) for n in range(1, 6)}
+    first_total = len(model.texts)
+    assert first_total == sum(len(ids) for ids in per_page.values()) > 0
+    evidence = {n: add_evidence(doc, n) for n in (2, 3, 5)}
+
+    # 2. The file is replaced: page 3 rewritten, page 5 removed
+    write_pdf(path, ["Tawarruq", "Murabahah", "Mudarabah", "Wakalah"])
+    model.texts.clear()
+    assert ingestion.ingest_document(SourceDocument.objects.get(id=doc.id))
+    doc.refresh_from_db()
+    assert model.texts and all(text.startswith("Mudarabah") for text in model.texts), "only page 3 is embedded"
+    for n in (1, 2, 4):
+        assert stored_ids(vectorstore, doc, n) == per_page[n], f"page {n} chunks must be untouched"
+    assert stored_ids(vectorstore, doc, 3).isdisjoint(per_page[3])
+    assert not stored_ids(vectorstore, doc, 5), "chunks of the removed page are deleted"
+    assert sorted(doc.pages.values_list('page_number', flat=True)) == [1, 2, 3, 4]
+    assert set(doc.evidence_artifacts.values_list('page_number', flat=True)) == {2}
+    assert not os.path.exists(evidence[3].image_path.path) and os.path.exists(evidence[2].image_path.path)
+    assert doc.chunk_count == ingestion.count_document_chunks(vectorstore, doc.id)
+    print(f"ingest_document: {len(model.texts)} of {first_total} chunks embedded again, page 5 dropped")
+
+    # 3. Same through the bulk pipeline: page 1 rewritten
+    write_pdf(path, ["Istisna", "Murabahah", "Mudarabah", "Wakalah"])
+    model.texts.clear()
+    before = {n: stored_ids(vectorstore, doc, n) for n in range(1, 5)}
+    result = pipeline.run_ingestion_pipeline([SourceDocument.objects.get(id=doc.id)], workers=1)
+    doc.refresh_from_db()
+    assert not result['errors'], result['errors']
+    assert model.texts and all(text.startswith("Istisna") for text in model.texts), "only page 1 is embedded"
+    for n in (2, 3, 4):
+        assert stored_ids(vectorstore, doc, n) == before[n]
+    assert doc.is_ingested and doc.chunk_count == ingestion.count_document_chunks(vectorstore, doc.id)
+    print(f"pipeline: {len(model.texts)} chunks embedded again (page 1 only)")
+
+    # 4. An unchanged file is skipped outright
+    model.texts.clear()
+    assert not ingestion.ingest_document(doc)
+    assert pipeline.run_ingestion_pipeline([doc], workers=1)['skipped'] == [str(doc.id)]
+    assert not model.texts
+
+    # 5. Re-embedding one page in place keeps chunks another document shares
+    copy_path = os.path.join(settings.MEDIA_ROOT, "source_documents", "copy.pdf")
+    write_pdf(copy_path, ["Murabahah"])
+    copy = SourceDocument.objects.create(title="Copy", authority="BNM", source_url="http://x/copy.pdf")
+    copy.file_path.name = "source_documents/copy.pdf"
+    copy.save()
+    assert ingestion.ingest_document(copy)
+    shared = ChunkOccurrence.objects.filter(source_doc=copy).count()
+    assert shared and ingestion.count_document_chunks(vectorstore, copy.id) == 0, "stored once, in Policy"
+    add_evidence(doc, 2)
+    write_pdf(path, ["Istisna", "Salam", "Mudarabah", "Wakalah"])
+    model.texts.clear()
+    ingestion.reembed_page(doc, 2)
+    assert model.texts and all(text.startswith("Salam") for text in model.texts)
+    assert stored_ids(vectorstore, doc, 2).isdisjoint(before[2])
+    assert stored_ids(vectorstore, doc, 3) == before[3]
+    assert ingestion.count_document_chunks(vectorstore, copy.id) == shared, "shared chunks re-homed, not deleted"
+    assert not ChunkOccurrence.objects.filter(source_doc=copy).exists()
+    assert not doc.evidence_artifacts.filter(page_number=2).exists()
+    assert doc.chunk_count == ingestion.count_document_chunks(vectorstore, doc.id)
+    print(f"reembed_page: page 2 replaced, {shared} chunks shared with Copy re-homed to it")
+
+    # 6. Re-embedding an unchanged page overwrites its chunks under the same IDs
+    model.texts.clear()
+    ingestion.reembed_page(doc, 2)
+    assert len(model.texts) == len(stored_ids(vectorstore, doc, 2)) > 0
+
+    print("✅ All re-ingest checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
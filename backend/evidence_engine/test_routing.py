@@ -0,0 +1,81 @@
+"""
+Checks model routing (routing.py): which rule of settings.RAG_ROUTES a query
+and its retrieval scores select, RAG_MODEL_OVERRIDE, the fallback when no rule
+matches, and that the routing log is off by default and never holds the question.
+
+    python evidence_engine/test_routing.py
+"""
+import os
+import sys
+import json
+import tempfile
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings
+from langchain_core.documents import Document
+from evidence_engine.routing import ModelRouter, log_route
+
+
+def hits(*scores):
+    return [(Document(page_content=f"chunk {i}"), score) for i, score in enumerate(scores)]
+
+
+def run_test():
+    print("=== ROUTING TEST ===")
+    settings.RAG_MODEL_OVERRIDE = None
+    router = ModelRouter()
+
+    # 1. Rules of settings.RAG_ROUTES, first match wins
+    cases = [
+        ("What is tawarruq?", hits(0.2, 0.3), "lookup"),
+        ("What is tawarruq?", hits(0.6, 0.7), "default"),  # lookup, but nothing close enough
+        ("What is the difference between tawarruq and murabahah?", hits(0.2, 0.25), "comparison"),
+        ("How should a bank document commodity ownership in a tawarruq?", hits(0.1, 0.5), "focused"),
+        ("How should a bank document commodity ownership in a tawarruq?", hits(0.3, 0.35), "default"),
+    ]
+    for query, retrieved, expected in cases:
+        route = router.route(query, retrieved)
+        assert route.name == expected, (query, route.as_dict())
+    route = router.route("What is tawarruq?", hits(0.2, 0.3))
+    assert (route.model, route.context_k) == ("gemini-2.0-flash-lite", 5)
+    assert route.features == {"query_type": "lookup", "words": 3, "top_distance": 0.2, "spread": 0.1}
+    print(f"{len(cases)} queries routed as expected: {route.as_dict()}")
+
+    # 2. RAG_MODEL_OVERRIDE puts every route on one model, keeping its context size
+    settings.RAG_MODEL_OVERRIDE = "local-stand-in"
+    route = router.route("What is the difference between tawarruq and murabahah?", hits(0.2))
+    assert (route.name, route.model, route.context_k) == ("comparison", "local-stand-in", 20)
+    settings.RAG_MODEL_OVERRIDE = None
+
+    # 3. No rule matches (no catch-all configured): the original model and context size
+    router = ModelRouter(routes=[{'name': 'lookup', 'model': 'small', 'context_k': 3, 'when': {'query_type': ['lookup']}}])
+    route = router.route("Explain the Shariah requirements for sukuk", hits(0.3))
+    assert (route.name, route.model, route.context_k) == ("fallback", "gemini-2.0-flash", 15)
+    assert ModelRouter(routes=[]).route("What is tawarruq?", []).features["top_distance"] is None
+    print("Override and fallback applied")
+
+    # 4. The log is off by default; when on, it keeps a hash and length, not the question
+    settings.RAG_ROUTING_LOG = os.path.join(tempfile.mkdtemp(), "routing_log.jsonl")
+    query = "Is my tawarruq facility with account 1234 compliant?"
+    log_route(route, query, "generative", 1.2, 2.5, [])
+    assert not os.path.exists(settings.RAG_ROUTING_LOG)
+    settings.RAG_ROUTING_LOG_ENABLED = True
+    log_route(route, query, "generative", 1.2, 2.5, [{"stage": "rerank"}])
+    with open(settings.RAG_ROUTING_LOG, encoding="utf-8") as f:
+        line = f.read()
+    entry = json.loads(line)
+    assert "1234" not in line and "tawarruq" not in line and "query" not in entry
+    assert entry["query_chars"] == len(query) and len(entry["query_sha256"]) == 16
+    assert entry["route"] == "fallback" and entry["stages_cut"] == ["rerank"]
+    settings.RAG_ROUTING_LOG_ENABLED = False
+    print(f"Log entry: {entry}")
+
+    print("✅ All routing checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,77 @@
+"""
+Checks that task workers take turns on vector-writing tasks (tasks.py): the
+local Chroma directory supports one writing process at a time, so while one
+process holds the VectorWriterLock another only claims tasks that do not write
+vectors. Uses a throwaway database and lock file.
+
+    python evidence_engine/test_tasks.py
+"""
+import os
+import sys
+import tempfile
+import subprocess
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from evidence_engine.tasks import VECTOR_WRITER_KINDS, VectorWriterLock, claim_next, enqueue
+
+HOLD_LOCK = """
+import sys, time
+sys.path.insert(0, {backend!r})
+import os, django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+from evidence_engine.tasks import VectorWriterLock
+lock = VectorWriterLock({path!r})
+print(lock.acquire(), flush=True)
+sys.stdin.readline()
+"""
+
+
+def run_test():
+    print("=== TASK WORKER TEST ===")
+    workdir = tempfile.mkdtemp()
+    settings.DATABASES['default']['NAME'] = os.path.join(workdir, "db.sqlite3")
+    settings.CHROMA_SERVER_HOST = ""
+    call_command('migrate', verbosity=0)
+    path = os.path.join(workdir, "chroma_db.lock")
+    backend = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+    # 1. Another process holds the lock: this one cannot take it until that process lets go
+    other = subprocess.Popen([sys.executable, "-c", HOLD_LOCK.format(backend=backend, path=path)],
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    assert other.stdout.readline().strip() == "True"
+    lock = VectorWriterLock(path)
+    assert not lock.acquire(), "a second process must not write at the same time"
+
+    # 2. Meanwhile only tasks that do not write vectors are claimed
+    ingest = enqueue('ingest_documents', {'doc_ids': [], 'force': False})
+    scrape = enqueue('scrape', {'authorities': []})
+    task = claim_next("w2", exclude_kinds=VECTOR_WRITER_KINDS)
+    assert task.id == scrape.id and claim_next("w2", exclude_kinds=VECTOR_WRITER_KINDS) is None
+    print("Lock held elsewhere: the ingest task is left queued, the scrape task is claimed")
+
+    # 3. The lock is free once the other process exits (or dies)
+    other.communicate("\n")
+    assert lock.acquire() and lock.acquire(), "re-entrant within the process"
+    assert claim_next("w2").id == ingest.id
+    lock.release()
+    again = VectorWriterLock(path)
+    assert again.acquire()
+    again.release()
+
+    # 4. With a Chroma server there is nothing to serialize
+    settings.CHROMA_SERVER_HOST = "localhost"
+    assert lock.acquire() and VectorWriterLock(path).acquire()
+    settings.CHROMA_SERVER_HOST = ""
+
+    print("✅ All task worker checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
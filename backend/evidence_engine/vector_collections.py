@@ -0,0 +1,327 @@
+"""
+Blue/green rebuilds of the Chroma collection.
+
+A rebuild fills a new, versioned collection from the SourceDocuments while the
+active one keeps serving. Only once it passes validation is it activated, which
+is a single row update in VectorCollection: every process picks it up on its
+next get_vectorstore() (RAGService checks before each search), so no restart is
+needed and no Chroma files are deleted under a running server. The previous
+version is kept for rollback; older ones are dropped through the Chroma API.
+"""
+import random
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import SourceDocument, VectorCollection, BackgroundTask
+from .ingestion import COLLECTION_NAME, get_vectorstore, store_chunks, count_document_chunks
+from .parsing import iter_page_windows
+
+# A stored vector looked up by itself must come back at (about) zero distance
+PROBE_MAX_DISTANCE = 1e-4
+
+
+def new_collection_name():
+    return f"{COLLECTION_NAME}_v{timezone.now():%Y%m%d%H%M%S}"
+
+
+def collection_names(client):
+    # Chroma returns names or Collection objects depending on its version
+    return {getattr(c, 'name', c) for c in client.list_collections()}
+
+
+def current_collection():
+    """The ACTIVE VectorCollection. The original unversioned collection is registered on first use."""
+    record = VectorCollection.objects.filter(status=VectorCollection.Status.ACTIVE).first()
+    if record is None:
+        record, _ = VectorCollection.objects.update_or_create(
+            name=COLLECTION_NAME,
+            defaults={'status': VectorCollection.Status.ACTIVE, 'activated_at': timezone.now()}
+        )
+    return record
+
+
+def expected_documents():
+    """Documents whose chunks every collection must hold."""
+    return SourceDocument.objects.filter(is_active=True, is_ingested=True)
+
+
+def fill_document(vectorstore, source_doc):
+    """
+    Writes a document's chunks into `vectorstore`, replacing any it holds there.
+    Chunks stored once under another document (ChunkOccurrences, see dedupe.py)
+    are left out, as in the active collection. Embeddings normally come from
+    the embedding cache, so this makes few or no API calls.
+    Returns the document's entry for document_counts(): chunks written and
+    chunks left out.
+    """
+    old = vectorstore.get(where={"source_doc_id": str(source_doc.id)}, include=[])["ids"]
+    if old:
+        vectorstore.delete(ids=old)
+    shared = set(source_doc.chunk_occurrences.values_list('chunk_id', flat=True))
+    written = 0
+    windows = iter_page_windows(
+        source_doc.file_path.path, source_doc.id, source_doc.authority, source_doc.source_url,
+        window_pages=settings.INGEST_PAGE_WINDOW,
+        strip=settings.INGEST_STRIP_BOILERPLATE
+    )
+    for splits, ids, _ in windows:
+        keep = [(split, id_) for split, id_ in zip(splits, ids) if id_ not in shared]
+        if keep:
+            store_chunks(vectorstore, [split for split, _ in keep], [id_ for _, id_ in keep])
+            written += len(keep)
+    return {'chunks': written, 'shared': len(shared)}
+
+
+def document_counts(record):
+    """
+    {doc_id: {'chunks': n, 'shared': m}} recorded for the collection when its
+    documents were filled: what validate() checks it against and what
+    activate() writes to SourceDocument.chunk_count.
+    """
+    return dict((record.report or {}).get('documents') or {})
+
+
+def _attributed_outside(collection, doc_ids):
+    """
+    Returns (attributed, unattributed): IDs of chunks whose source_doc_id is not
+    in doc_ids, and of chunks without a source_doc_id (bulk scripts such as
+    ingest.py), which $nin also matches.
+    """
+    found = collection.get(where={"source_doc_id": {"$nin": doc_ids}} if doc_ids else None, include=["metadatas"])
+    attributed, unattributed = [], []
+    for id_, metadata in zip(found["ids"], found["metadatas"]):
+        (attributed if (metadata or {}).get("source_doc_id") else unattributed).append(id_)
+    return attributed, unattributed
+
+
+def copy_unattributed(source, target, batch_size=500):
+    """Copies chunks without a source_doc_id (vectors included) from one collection to another."""
+    doc_ids = [str(pk) for pk in SourceDocument.objects.values_list('id', flat=True)]
+    _, ids = _attributed_outside(source._collection, doc_ids)
+    for start in range(0, len(ids), batch_size):
+        stored = source._collection.get(
+            ids=ids[start:start + batch_size], include=['embeddings', 'documents', 'metadatas']
+        )
+        target._collection.upsert(
+            ids=stored['ids'],
+            embeddings=stored['embeddings'],
+            metadatas=stored['metadatas'],
+            documents=stored['documents']
+        )
+    return len(ids)
+
+
+def catch_up(record, vectorstore=None):
+    """
+    Applies to a non-active collection what happened in the active one since
+    record.synced_at: documents (re-)ingested since then, not filled yet, or
+    whose shared chunks changed (re-homed chunks) are filled again, and chunks
+    of documents that were deleted, deactivated or are being re-ingested are
+    removed. The recorded document counts are updated to match.
+    Returns (documents_refilled, chunks_removed).
+    """
+    vectorstore = vectorstore or get_vectorstore(collection_name=record.name)
+    started = timezone.now()
+    docs = list(expected_documents().annotate(shared=Count('chunk_occurrences')))
+    recorded = document_counts(record)
+    counts = {}
+    refilled = 0
+    for doc in docs:
+        doc_id = str(doc.id)
+        changed = doc.ingested_at and doc.ingested_at >= record.synced_at
+        if changed or doc_id not in recorded or recorded[doc_id]['shared'] != doc.shared:
+            counts[doc_id] = fill_document(vectorstore, doc)
+            refilled += 1
+        else:
+            counts[doc_id] = recorded[doc_id]
+    gone, _ = _attributed_outside(vectorstore._collection, list(counts))
+    for start in range(0, len(gone), 500):
+        vectorstore.delete(ids=gone[start:start + 500])
+    record.synced_at = started
+    record.report = {**(record.report or {}), 'documents': counts}
+    record.save(update_fields=['synced_at', 'report'])
+    if refilled or gone:
+        print(f"Caught up {record.name}: {refilled} documents refilled, {len(gone)} chunks removed")
+    return refilled, len(gone)
+
+
+def validate(record, vectorstore=None, probes=None):
+    """
+    Checks a collection before it may serve. Returns (ok, report):
+      mismatched: documents whose chunks differ from the count recorded when
+                  they were filled (document_counts), or were never filled
+      probes / probes_failed: stored vectors searched for by themselves, each
+                              must come back as the nearest hit
+      total / active_total: chunks in this collection and in the active one
+    """
+    vectorstore = vectorstore or get_vectorstore(collection_name=record.name)
+    collection = vectorstore._collection
+    probes = settings.VECTOR_VALIDATION_PROBES if probes is None else probes
+
+    docs = list(expected_documents())
+    counts = document_counts(record)
+    mismatched = []
+    for doc in docs:
+        actual = count_document_chunks(vectorstore, doc.id)
+        expected = counts.get(str(doc.id), {}).get('chunks')
+        if actual != expected:
+            mismatched.append({'doc': str(doc.id), 'title': doc.title, 'expected': expected, 'actual': actual})
+
+    total = collection.count()
+    failed = 0
+    for _ in range(min(probes, total)):
+        stored = collection.get(limit=1, offset=random.randrange(total), include=['embeddings'])
+        hit = collection.query(query_embeddings=[stored['embeddings'][0]], n_results=1, include=['distances'])
+        if not hit['distances'][0] or hit['distances'][0][0] > PROBE_MAX_DISTANCE:
+            failed += 1
+
+    active = current_collection()
+    active_total = total if active.name == record.name else get_vectorstore(
+        collection_name=active.name
+    )._collection.count()
+    report = {
+        'mismatched': mismatched,
+        'probes': min(probes, total),
+        'probes_failed': failed,
+        'total': total,
+        'active_total': active_total,
+    }
+    ok = not mismatched and not failed and (total or not docs)
+    return bool(ok), report
+
+
+def describe(report):
+    return (
+        f"{report['total']} chunks (active: {report['active_total']}), "
+        f"{len(report['mismatched'])} documents mismatched, "
+        f"{report['probes_failed']}/{report['probes']} probes failed"
+    )
+
+
+def build_collection(progress=None):
+    """
+    Builds a new collection version from the active documents and validates it,
+    while the active collection keeps serving. progress(done, total, title) is
+    called after each document. Returns the VectorCollection: READY if it passed
+    validation, FAILED otherwise.
+    """
+    active = current_collection()
+    record = VectorCollection.objects.create(name=new_collection_name(), synced_at=timezone.now())
+    vectorstore = get_vectorstore(collection_name=record.name)
+    docs = list(expected_documents())
+    print(f"Building vector collection {record.name} from {len(docs)} documents "
+          f"(serving from {active.name} meanwhile)")
+    errors, counts = {}, {}
+    try:
+        for done, doc in enumerate(docs, 1):
+            try:
+                counts[str(doc.id)] = fill_document(vectorstore, doc)
+            except Exception as e:
+                print(f"❌ {doc.title}: {e}")
+                errors[str(doc.id)] = str(e)
+            if progress:
+                progress(done, len(docs), doc.title)
+        copied = copy_unattributed(get_vectorstore(collection_name=active.name), vectorstore)
+        record.report = {'documents': counts}
+        ok, report = validate(record, vectorstore)
+    except Exception as e:
+        record.status = VectorCollection.Status.FAILED
+        record.error = str(e)
+        record.save()
+        raise
+
+    report.update(documents=counts, errors=errors, unattributed_copied=copied)
+    record.report = report
+    record.chunk_count = report['total']
+    if ok and not errors:
+        record.status = VectorCollection.Status.READY
+        print(f"✅ {record.name} passed validation: {describe(report)}")
+    else:
+        record.status = VectorCollection.Status.FAILED
+        record.error = f"Validation failed: {describe(report)}; {len(errors)} documents failed to parse"
+        print(f"❌ {record.name}: {record.error}")
+    record.save()
+    return record
+
+
+def ingestion_running():
+    return BackgroundTask.objects.filter(
+        kind='ingest_documents', status=BackgroundTask.Status.RUNNING
+    ).exists()
+
+
+def activate(record, force=False):
+    """
+    Switches every process to `record`. It is first caught up with what changed
+    since it was built (or retired) and validated again; with force=True a
+    failed validation does not stop the switch. The previous active collection
+    is retired and kept for rollback. SourceDocument.chunk_count is set to the
+    document counts of `record` in the same transaction.
+    """
+    if record.status == VectorCollection.Status.ACTIVE:
+        return record
+    if not force and ingestion_running():
+        # Its chunks would go to the collection being retired
+        raise RuntimeError("Ingestion is running; activate once it has finished")
+    vectorstore = get_vectorstore(collection_name=record.name)
+    if record.name not in collection_names(vectorstore._client) and not force:
+        raise RuntimeError(f"Collection {record.name} no longer exists in Chroma")
+
+    catch_up(record, vectorstore)
+    ok, report = validate(record, vectorstore)
+    record.report = {**(record.report or {}), **report}
+    record.chunk_count = report['total']
+    if not ok and not force:
+        record.save(update_fields=['report', 'chunk_count'])
+        raise RuntimeError(f"{record.name} failed validation: {describe(report)}")
+
+    previous = current_collection()
+    now = timezone.now()
+    counts = document_counts(record)
+    with transaction.atomic():
+        SourceDocument.objects.bulk_update(
+            [SourceDocument(id=doc_id, chunk_count=count['chunks']) for doc_id, count in counts.items()],
+            ['chunk_count'], batch_size=500
+        )
+        VectorCollection.objects.filter(status=VectorCollection.Status.ACTIVE).update(
+            status=VectorCollection.Status.RETIRED, retired_at=now, synced_at=now
+        )
+        record.status = VectorCollection.Status.ACTIVE
+        record.activated_at = now
+        record.retired_at = None
+        record.error = ""
+        record.save()
+    print(f"✅ Vector collection {record.name} is now active (was {previous.name})")
+    return record
+
+
+def rollback(force=False):
+    """Re-activates the most recently retired collection."""
+    previous = VectorCollection.objects.filter(
+        status=VectorCollection.Status.RETIRED
+    ).order_by('-retired_at').first()
+    if previous is None:
+        raise RuntimeError("No retired collection to roll back to")
+    return activate(previous, force=force)
+
+
+def cleanup(keep=None):
+    """
+    Drops failed builds and retired collections beyond the `keep` most recent
+    (settings.VECTOR_COLLECTIONS_KEEP), through the Chroma API.
+    Returns the names dropped.
+    """
+    keep = settings.VECTOR_COLLECTIONS_KEEP if keep is None else keep
+    retired = list(VectorCollection.objects.filter(status=VectorCollection.Status.RETIRED).order_by('-retired_at'))
+    doomed = retired[keep:] + list(VectorCollection.objects.filter(status=VectorCollection.Status.FAILED))
+    if not doomed:
+        return []
+    client = get_vectorstore()._client
+    existing = collection_names(client)
+    for record in doomed:
+        if record.name in existing:
+            client.delete_collection(record.name)
+        record.delete()
+        print(f"Dropped vector collection {record.name}")
+    return [record.name for record in doomed]
@@ -5,6 +5,8 @@ from django.utils.decorators import method_decorator
 from django.views import View
 from .models import ChatSession, ChatMessage
 from .rag_service import RAGService
+from .deadline import Deadline
+from .memory import ConversationMemory
 
 @method_decorator(csrf_exempt, name='dispatch')
 class ChatSessionView(View):
@@ -23,6 +25,7 @@ class ChatSessionView(View):
 class ChatMessageView(View):
     def post(self, request, session_id):
         """Send a message to the AI and get a response."""
+        deadline = Deadline.for_endpoint('chat_message')
         try:
             data = json.loads(request.body)
             user_text = data.get('text')
@@ -36,7 +39,7 @@ class ChatMessageView(View):
                 return JsonResponse({'error': 'Session not found'}, status=404)
 
             # 1. Save User Message
-            ChatMessage.objects.create(
+            user_message = ChatMessage.objects.create(
                 session=session,
                 sender=ChatMessage.Sender.USER,
                 text_content=user_text
@@ -44,7 +47,8 @@ class ChatMessageView(View):
 
             # 2. Call RAG Service
             rag = RAGService()
-            response_data = rag.answer_question(user_text)
+            memory = ConversationMemory(session, exclude_message=user_message)
+            response_data = rag.answer_question(user_text, deadline=deadline, memory=memory)
             
             ai_text = response_data['answer']
             evidence_url = response_data['evidence_url']
@@ -86,7 +90,8 @@ class ChatMessageView(View):
                 'response': ai_text,
                 'evidence_url': evidence_url,
                 'evidence_list': evidence_list,
-                'metadata': response_data.get('metadata')
+                'metadata': response_data.get('metadata'),
+                'stages_cut': response_data.get('stages_cut', [])
             })
 
         except Exception as e:
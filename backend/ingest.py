@@ -1,5 +1,4 @@
 import os
-import time
 from tqdm import tqdm
 from dotenv import load_dotenv
 
@@ -12,11 +11,16 @@ from langchain_community.document_loaders import Docx2txtLoader
 from langchain_community.document_loaders import UnstructuredExcelLoader
 from langchain_community.vectorstores.utils import filter_complex_metadata
 
+from evidence_engine.embedding import EmbeddingSubmitter
+from evidence_engine.embedding_cache import EmbeddingCache
+from evidence_engine.parsing import chunk_id
+
 load_dotenv()
 
 # --- CONFIGURATION ---
 DATA_FOLDER = os.path.join(os.path.dirname(__file__), "../data_source/BNM/data_bnm")
 DB_PATH = os.path.join(os.path.dirname(__file__), "chroma_db")
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "embedding_cache.sqlite3")
 # HARDCODE KEY IF .ENV FAILS
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") 
 
@@ -30,28 +34,28 @@ def get_loader_for_file(file_path):
     else:
         return None
 
-def add_documents_with_retry(vector_db, chunks, file_name):
+def add_documents_with_retry(vector_db, chunks, file_name, submitter):
     """
-    Retries with Exponential Backoff (60s -> 120s -> 240s)
+    Embeds through the shared EmbeddingSubmitter (batched, concurrent, adaptive
+    token bucket that backs off on 429 / RESOURCE_EXHAUSTED), then upserts the vectors
+    under deterministic IDs, so running the script again does not duplicate chunks.
     """
-    max_retries = 5
-    base_delay = 60
-    
-    for attempt in range(max_retries):
-        try:
-            vector_db.add_documents(chunks)
-            return True
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                # EXPONENTIAL BACKOFF: Wait longer each time
-                delay = base_delay * (2 ** attempt) 
-                print(f"\n⏳ Rate limit on {file_name}. Waiting {delay}s... (Attempt {attempt+1}/{max_retries})")
-                time.sleep(delay)
-            else:
-                print(f"\n❌ Critical error on {file_name}: {e}")
-                return False
-    return False
+    try:
+        texts = [chunk.page_content for chunk in chunks]
+        vectors = submitter.embed(texts)
+        vector_db._collection.upsert(
+            ids=[
+                chunk_id(file_name, chunk.metadata.get('page', 0) + 1, chunk.metadata.get('start_index', 0), chunk.page_content)
+                for chunk in chunks
+            ],
+            embeddings=vectors,
+            metadatas=[chunk.metadata for chunk in chunks],
+            documents=texts
+        )
+        return True
+    except Exception as e:
+        print(f"\n❌ Critical error on {file_name}: {e}")
+        return False
 
 def ingest_data():
     if not GOOGLE_API_KEY:
@@ -71,6 +75,8 @@ def ingest_data():
         embedding_function=embeddings
     )
 
+    submitter = EmbeddingSubmitter(embeddings, cache=EmbeddingCache(CACHE_PATH))
+
     all_files = os.listdir(DATA_FOLDER)
     valid_files = [f for f in all_files if f.endswith(('.pdf', '.docx', '.doc', '.xlsx', '.xls'))]
     
@@ -89,7 +95,8 @@ def ingest_data():
             # Smaller chunks = Easier for Free Tier to handle
             text_splitter = RecursiveCharacterTextSplitter(
                 chunk_size=500,  # Reduced from 800
-                chunk_overlap=100
+                chunk_overlap=100,
+                add_start_index=True  # part of the chunk ID
             )
             chunks = text_splitter.split_documents(docs)
             chunks = filter_complex_metadata(chunks) # Fix for ['eng'] list error
@@ -98,10 +105,7 @@ def ingest_data():
                 for chunk in chunks:
                     chunk.metadata['source'] = file_name
                 
-                success = add_documents_with_retry(vector_db, chunks, file_name)
-                
-                if success:
-                    time.sleep(1) # Small breather
+                add_documents_with_retry(vector_db, chunks, file_name, submitter)
             else:
                 pass # Empty file
 
@@ -1,27 +1,32 @@
 """
-Repair ChromaDB by wiping and re-ingesting all SourceDocuments.
+Repair ChromaDB by re-ingesting all SourceDocuments.
 This ensures all metadata (especially source_doc_id) is correctly populated.
+Each document's old chunks are replaced, so running this repeatedly never duplicates chunks.
+Pass --force to re-embed documents whose files have not changed.
+To rebuild the whole store instead, use fresh_ingest.py (a new collection is
+built next to the active one and switched to without a restart).
 """
 import os
+import sys
 import django
-import shutil
 
 # Setup Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
 from evidence_engine.models import SourceDocument
-from evidence_engine.ingestion import ingest_document, CHROMA_DB_DIR
+from evidence_engine.pipeline import run_ingestion_pipeline
 
-def repair_chroma():
+def repair_chroma(force=False):
     print("=" * 60)
     print("ChromaDB Repair Script")
     print("=" * 60)
     
-    # 1. Delete existing ChromaDB (SKIPPED - file locks)
-    # Note: Re-ingesting will update metadata without needing to delete
+    # 1. Delete existing ChromaDB (SKIPPED)
+    # Not needed: ingest_document replaces each document's chunks in place.
+    # For a clean store, fresh_ingest.py builds a new collection version instead.
     print(f"\n[1/3] Skipping ChromaDB deletion (keeping existing data)")
-    print("Note: Re-ingestion will update/add metadata to existing chunks")
+    print("Note: Changed documents have their chunks replaced; unchanged ones are skipped")
     
     # 2. Get all SourceDocuments
     print("\n[2/3] Fetching SourceDocuments from database...")
@@ -38,20 +43,13 @@ def repair_chroma():
     
     # 3. Re-ingest all documents
     print("\n[3/3] Re-ingesting documents into ChromaDB...")
-    for i, doc in enumerate(source_docs, 1):
-        print(f"\n[{i}/{source_docs.count()}] Processing: {doc.title}")
-        try:
-            ingest_document(doc)
-            print(f"✓ Successfully ingested: {doc.title}")
-        except Exception as e:
-            print(f"✗ Error ingesting {doc.title}: {e}")
+    run_ingestion_pipeline(source_docs, force=force)
     
     print("\n" + "=" * 60)
     print("Repair Complete!")
     print("=" * 60)
     print("\nNext steps:")
-    print("1. Restart Django server (Ctrl+C, then 'python manage.py runserver')")
-    print("2. Test the chat interface")
+    print("1. Test the chat interface (no restart needed)")
 
 if __name__ == "__main__":
-    repair_chroma()
+    repair_chroma(force="--force" in sys.argv)
@@ -8,7 +8,7 @@ def reset_db():
     if os.path.exists(DB_PATH):
         print(f"🗑️ Deleting existing brain at: {DB_PATH}")
         shutil.rmtree(DB_PATH)
-        print("✅ Deleted. You can now run ingest.py for a fresh start.")
+        print("✅ Deleted. Run `python manage.py ingest` for a fresh start (cached embeddings are reused).")
     else:
         print("🤷 Brain not found (nothing to delete).")
 
@@ -0,0 +1,50 @@
+"""
+Summarises the model-routing log (settings.RAG_ROUTING_LOG, written when
+RAG_ROUTING_LOG_ENABLED is set) per route:
+request count, model, extractive share, and generation / total latency percentiles.
+
+Usage: python routing_report.py [routing_log.jsonl]
+"""
+import os
+import sys
+import json
+from collections import defaultdict
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_log.jsonl")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def report(path):
+    if not os.path.exists(path):
+        print(f"❌ No routing log at {path}")
+        return
+
+    by_route = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                by_route[(entry["route"], entry["model"])].append(entry)
+
+    print(f"{'route':<12} {'model':<24} {'n':>5} {'extr%':>6} {'gen p50':>8} {'gen p95':>8} {'tot p50':>8} {'tot p95':>8} {'cut%':>5}")
+    for (route, model), entries in sorted(by_route.items()):
+        gen = [e["generation_s"] for e in entries if e["answer_mode"] == "generative"]
+        total = [e["total_s"] for e in entries]
+        extractive = sum(1 for e in entries if e["answer_mode"] == "extractive")
+        cut = sum(1 for e in entries if e["stages_cut"])
+        print(
+            f"{route:<12} {str(model):<24} {len(entries):>5} {extractive / len(entries):>6.0%} "
+            f"{percentile(gen, 50):>8.2f} {percentile(gen, 95):>8.2f} "
+            f"{percentile(total, 50):>8.2f} {percentile(total, 95):>8.2f} {cut / len(entries):>5.0%}"
+        )
+
+
+if __name__ == "__main__":
+    report(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LOG)
@@ -13,36 +13,19 @@ sys.path.append(os.path.dirname(__file__))
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django.setup()
 
-from scrapers.bnm_scraper import scrape_bnm
-from evidence_engine.models import SourceDocument
-from evidence_engine.ingestion import ingest_document
-
-def run_ingestion():
-    print("Checking for un-ingested documents...")
-    docs = SourceDocument.objects.filter(is_ingested=False, is_active=True)
-    if not docs.exists():
-        print("No new documents to ingest.")
-        return
-
-    for doc in docs:
-        print(f"Ingesting: {doc.title}")
-        try:
-            ingest_document(doc)
-        except Exception as e:
-            print(f"Failed to ingest {doc.title}: {e}")
+from evidence_engine.tasks import enqueue
 
 def job():
-    print("Starting scheduled job...")
-    try:
-        scrape_bnm()
-    except Exception as e:
-        print(f"Scraper failed: {e}")
-        
-    try:
-        run_ingestion()
-    except Exception as e:
-        print(f"Ingestion failed: {e}")
-    print("Job complete.")
+    # The work itself runs in `python manage.py taskworker` processes; this loop only
+    # enqueues it. unique=True keeps a slow run from piling up duplicate tasks.
+    print("Queueing scheduled jobs...")
+    # Every registered authority (SCRAPER_MODULES); new documents queue their own ingestion
+    scrape = enqueue('scrape', {'authorities': None, 'recheck': False}, unique=True)
+    print(f"Queued scrape (task {scrape.id}).")
+
+    # All active documents; files whose content hash is unchanged are skipped
+    ingest = enqueue('ingest_documents', {'doc_ids': None, 'force': False}, unique=True)
+    print(f"Queued ingestion (task {ingest.id}).")
 
 if __name__ == "__main__":
     print("Scheduler Service Started.")
@@ -0,0 +1,134 @@
+"""
+Scraper plugin interface.
+
+A Scraper only finds the document links on one authority's site (discovery).
+Downloading, dedupe, saving and queueing ingestion are shared by all of them
+(scrapers/engine.py).
+
+Adding an authority:
+  1. Subclass ListingScraper, for a paged HTML listing with a 'Next' link, or
+     Scraper. Set `authority` and `start_url`.
+  2. Decorate the class with @register.
+  3. Add its module to SCRAPER_MODULES in config/settings.py.
+"""
+import os
+import importlib
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+# authority -> Scraper subclass; filled in by the @register decorator below
+SCRAPERS = {}
+
+
+def register(cls):
+    """Registers a Scraper subclass for its authority."""
+    SCRAPERS[cls.authority] = cls
+    return cls
+
+
+def load_scrapers():
+    """Imports the modules in SCRAPER_MODULES (which register their scrapers) and returns SCRAPERS."""
+    for module in settings.SCRAPER_MODULES:
+        importlib.import_module(module)
+    return SCRAPERS
+
+
+class NeedsBrowser(Exception):
+    """Raised by discover() when the listing cannot be read without JavaScript."""
+
+
+def clean_title(raw_text):
+    """Sanitizes the document title by removing extra spaces and special characters."""
+    if not raw_text:
+        return "Untitled_Document"
+    # Remove newlines and tabs
+    text = raw_text.replace('\r', ' ').replace('\n', ' ').replace('\t', ' ')
+    # Collapse multiple spaces
+    text = ' '.join(text.split())
+    # Remove junk suffixes if present
+    text = text.replace("Download", "").replace("PDF", "").strip()
+    return text
+
+
+def collect_links(anchors, is_document_link):
+    """Turns (href, link text) pairs into {href: clean title} for the document links."""
+    pdf_links = {}
+    for href, raw_text in anchors:
+        if not href or not is_document_link(href):
+            continue
+        text = clean_title(raw_text)
+        # Check basename if text is still too short (e.g. "Click here")
+        if len(text) < 5:
+            text = clean_title(os.path.basename(href).replace("%20", " "))
+        pdf_links.setdefault(href, text)
+    return pdf_links
+
+
+def parse_listing(html, page_url, is_document_link):
+    """
+    Reads a listing page fetched over plain HTTP.
+    Returns (pdf_links, next_url, next_needs_js): next_url is None on the last page;
+    next_needs_js is True when there is a 'Next' control but it has no real link.
+    """
+    soup = BeautifulSoup(html, "lxml")
+    anchors = soup.find_all("a")
+    pdf_links = collect_links(
+        ((urljoin(page_url, a["href"]), a.get_text(" ")) for a in anchors if a.get("href")),
+        is_document_link,
+    )
+
+    for a in anchors:
+        label = a.get_text(" ").strip()
+        if "Next" not in label or len(label) > 12:
+            continue
+        parent_classes = a.parent.get("class", []) if a.parent else []
+        if "disabled" in a.get("class", []) + parent_classes:
+            return pdf_links, None, False
+        href = (a.get("href") or "").strip()
+        if not href or href.startswith("#") or href.lower().startswith("javascript:"):
+            return pdf_links, None, True
+        return pdf_links, urljoin(page_url, href), False
+    return pdf_links, None, False
+
+
+class Scraper:
+    """Finds the documents an authority publishes. Subclasses implement discover()."""
+    authority = None
+    start_url = None
+
+    def is_document_link(self, href):
+        return ".pdf" in href.lower()
+
+    def discover(self, fetcher):
+        """
+        Yields one {url: title} dict per listing page, reading pages with `fetcher`.
+        The caller may stop early. Raises NeedsBrowser to fall back to discover_browser().
+        """
+        raise NotImplementedError
+
+    def discover_browser(self):
+        """Same as discover(), driving a real browser. Only for listings that need JavaScript."""
+        raise NeedsBrowser(f"{self.authority} has no browser discovery")
+
+
+class ListingScraper(Scraper):
+    """A paged HTML listing read over plain HTTP, following its 'Next' links."""
+
+    def discover(self, fetcher):
+        url, page, visited = self.start_url, 1, set()
+        while url and url not in visited:
+            visited.add(url)
+            print(f"\n--- 📄 {self.authority} PAGE {page} ---")
+            html = fetcher.fetch_page(url)
+            if html is None:
+                if page == 1:
+                    raise NeedsBrowser("listing could not be loaded")
+                return
+            pdf_links, next_url, next_needs_js = parse_listing(html, url, self.is_document_link)
+            if page == 1 and not pdf_links:
+                raise NeedsBrowser("no document links in the static HTML (rendered by JavaScript?)")
+            yield pdf_links
+            if next_needs_js:
+                raise NeedsBrowser("pagination needs JavaScript")
+            url, page = next_url, page + 1
@@ -0,0 +1,218 @@
+"""
+Runs the registered scrapers (scrapers/base.py) on shared machinery:
+
+  - one Fetcher (scrapers/fetch.py): a pooled HTTP client with per-host
+    concurrency and rate limits, shared by every authority;
+  - one KnownDocuments index (scrapers/known_documents.py): URLs and the
+    hashes of files already downloaded, loaded once per run;
+  - storage: downloads are streamed to disk once and moved into place; a
+    page's new records are bulk-inserted;
+  - hand-off: the new documents of each page are queued as an
+    'ingest_documents' task for `manage.py taskworker`.
+
+Import after django.setup().
+"""
+import os
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from evidence_engine.models import SourceDocument, DocumentAlias
+from evidence_engine.tasks import enqueue
+from scrapers.base import NeedsBrowser, load_scrapers
+from scrapers.fetch import Fetcher, DownloadedFile
+from scrapers.known_documents import KnownDocuments
+
+# Downloads are streamed here, then moved into media/source_documents/ (same filesystem)
+DOWNLOAD_DIR = os.path.join(settings.MEDIA_ROOT, "incoming")
+
+
+def safe_filename(title):
+    # Use {title} as name, but formatted cleanly (no spaces)
+    name = "".join(x for x in title.replace(" ", "_") if x.isalnum() or x in "_-")
+    return f"{name[:150]}.pdf"
+
+
+def save_new_documents(docs, aliases):
+    """Bulk-inserts a page's new documents and alias URLs. Returns the documents saved."""
+    if not docs and not aliases:
+        return []
+    try:
+        with transaction.atomic():
+            SourceDocument.objects.bulk_create(docs)
+            DocumentAlias.objects.bulk_create(aliases, ignore_conflicts=True)
+        return docs
+    except IntegrityError:
+        pass
+
+    # Another crawl stored some of these URLs meanwhile: insert one at a time
+    saved, failed = [], set()
+    for doc in docs:
+        try:
+            with transaction.atomic():
+                doc.save(force_insert=True)
+            saved.append(doc)
+        except IntegrityError:
+            print(f"   ⏭️  Already stored meanwhile: {doc.title[:40]}...")
+            doc.file_path.storage.delete(doc.file_path.name)
+            failed.add(doc.id)
+    DocumentAlias.objects.bulk_create(
+        [alias for alias in aliases if alias.source_doc_id not in failed], ignore_conflicts=True
+    )
+    return saved
+
+
+def replace_file(doc, result, previous_hash):
+    """
+    Stores a republished version of a known document; saving the new file queues its
+    re-ingestion. A download identical to the last one (previous_hash) is dropped.
+    """
+    if result.sha256 == previous_hash:
+        os.remove(result.path)
+        print(f"   ⏭️  Unchanged: {doc.title[:40]}...")
+        if doc.is_active and not doc.is_ingested:
+            # Stored by an earlier crawl but never (completely) ingested
+            enqueue('ingest_documents', {'doc_ids': [str(doc.id)], 'force': False}, unique=True)
+            print(f"   ⏳ Not ingested yet, ingestion queued: {doc.title[:40]}...")
+    else:
+        old_name = doc.file_path.name
+        with DownloadedFile(result.path) as downloaded:
+            doc.file_path.save(os.path.basename(old_name), downloaded, save=False)
+        print(f"   🔄 Republished: {doc.title[:40]}... (changed pages will be re-ingested)")
+        if old_name:
+            doc.file_path.storage.delete(old_name)
+    doc.fetched_hash = result.sha256
+    doc.http_etag, doc.http_last_modified = result.etag, result.last_modified
+    doc.save()
+
+
+class ScrapeEngine:
+    """
+    Runs scrapers over one Fetcher and one KnownDocuments index. With recheck=True,
+    stored documents are fetched again with conditional GET and every listing page is
+    read; otherwise a listing stops at its first page with only known documents.
+    browser=True skips the plain-HTTP discovery.
+    """
+
+    def __init__(self, fetcher=None, known=None, recheck=False, browser=False):
+        self.fetcher = fetcher or Fetcher()
+        self.known = known if known is not None else KnownDocuments()
+        self.recheck = recheck
+        self.browser = browser
+
+    def close(self):
+        self.fetcher.close()
+
+    def run(self, authorities=None):
+        """Runs the scrapers of the given authorities (all registered ones by default). Returns {authority: documents saved}."""
+        scrapers = load_scrapers()
+        totals = {}
+        for authority in authorities or sorted(scrapers):
+            if authority not in scrapers:
+                print(f"⚠️ No scraper for {authority}.")
+                continue
+            totals[authority] = self.run_scraper(scrapers[authority]())
+        return totals
+
+    def run_scraper(self, scraper):
+        """Discovers and saves one authority's documents. Returns the number saved."""
+        total = 0
+        if not self.browser:
+            print(f"⚡ Reading {scraper.start_url} without a browser...")
+            pages = scraper.discover(self.fetcher)
+            try:
+                for pdf_links in pages:
+                    saved, new_links = self.process_links(scraper, pdf_links)
+                    total += saved
+                    if not new_links and not self.recheck:
+                        print("   ✋ Only known documents on this page. Stopping.")
+                        pages.close()
+                        break
+                return total
+            except NeedsBrowser as e:
+                print(f"   ⚠️ Browser needed: {e}.")
+        try:
+            # Pages read above are known by now and cost nothing the second time
+            for pdf_links in scraper.discover_browser():
+                total += self.process_links(scraper, pdf_links)[0]
+        except NeedsBrowser as e:
+            print(f"   ❌ Could not read the listing: {e}.")
+        return total
+
+    def process_links(self, scraper, pdf_links):
+        """
+        Downloads and saves the documents among `pdf_links` ({href: title}) that are not
+        known yet; the page's new records are inserted together and queued for ingestion.
+        Returns (documents saved, links not seen before).
+        """
+        known = self.known
+
+        # 1. Check Duplicates (in memory, no query per link)
+        jobs = [href for href in pdf_links if href not in known]
+        for href in jobs:
+            print(f"🔎 FOUND: {pdf_links[href]}")
+        new_links = len(jobs)
+        stored = {}
+        if self.recheck:
+            stored = {
+                doc.source_url: doc
+                for doc in SourceDocument.objects.filter(source_url__in=[href for href in pdf_links if href in known])
+            }
+            jobs += [(href, doc.http_etag, doc.http_last_modified) for href, doc in stored.items()]
+        skipped = len(pdf_links) - len(jobs)
+        if skipped:
+            print(f"   ⏭️  Skipping {skipped} existing documents")
+
+        # 2. Download concurrently
+        if jobs:
+            print(f"   ⬇️  Downloading {len(jobs)} documents...")
+        new_docs, aliases = [], []
+        for result in self.fetcher.fetch_all(jobs, dest_dir=DOWNLOAD_DIR):
+            title = pdf_links[result.url]
+            if result.status == 'failed':
+                print(f"   ❌ Failed: {title[:40]}... ({result.error})")
+                continue
+            if result.status == 'not_modified':
+                print(f"   ⏭️  Unchanged: {title[:40]}...")
+                continue
+            # One bad file (storage error, document deleted meanwhile) must not end the crawl
+            try:
+                if result.url in stored:
+                    replace_file(stored[result.url], result, known.fetched_hash(result.url))
+                    known.add(result.url, result.sha256, stored[result.url].id)
+                    continue
+
+                # 3. Same file published under another URL?
+                duplicate_id = known.document_with_hash(result.sha256)
+                if duplicate_id:
+                    aliases.append(DocumentAlias(url=result.url, source_doc_id=duplicate_id))
+                    known.add(result.url)
+                    print(f"   🔁 Same file as a stored document, not stored again: {title[:40]}...")
+                    continue
+
+                # 4. Create Record (inserted with the rest of the page below)
+                doc = SourceDocument(
+                    title=title,
+                    authority=scraper.authority,
+                    source_url=result.url,
+                    is_ingested=False,
+                    fetched_hash=result.sha256,
+                    http_etag=result.etag,
+                    http_last_modified=result.last_modified
+                )
+                # Moved into storage, not copied: the file is written once
+                with DownloadedFile(result.path) as downloaded:
+                    doc.file_path.save(safe_filename(title), downloaded, save=False)
+                known.add(result.url, result.sha256, doc.id)
+                new_docs.append(doc)
+            except Exception as e:
+                print(f"\n   ❌ Error saving {title[:40]}...: {e}")
+            finally:
+                if os.path.exists(result.path):
+                    os.remove(result.path)
+
+        # 5. Insert the page's records in one go and hand them to the ingestion queue
+        saved = save_new_documents(new_docs, aliases)
+        if saved:
+            doc_ids = [str(doc.id) for doc in saved]
+            task = enqueue('ingest_documents', {'doc_ids': doc_ids, 'force': False})
+            print(f"   💾 Saved {len(saved)} documents; ingestion queued (task {task.id}).")
+        return len(saved), new_links
@@ -0,0 +1,188 @@
+"""
+Concurrent HTTP downloads for the scrapers.
+
+One pooled requests.Session is shared by a thread pool; at most
+SCRAPER_PER_HOST_CONCURRENCY requests run against any one host at a time, and
+they start at least SCRAPER_HOST_MIN_INTERVAL seconds apart.
+Known documents are re-fetched with conditional GET (If-None-Match /
+If-Modified-Since), so an unchanged file costs a 304 and no body.
+Files can be streamed straight to disk and are hashed as they arrive.
+No Django models here; settings are only read for defaults.
+"""
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from django.conf import settings
+from django.core.files import File
+
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchResult:
+    """
+    Outcome of one download. status is 'fetched', 'not_modified' or 'failed';
+    etag / last_modified are the validators to send next time. A fetched body is
+    in `content`, or in the temporary file `path` when it was streamed to disk.
+    """
+
+    def __init__(self, url, status, content=None, etag="", last_modified="", error="",
+                 path=None, sha256="", size=0):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.error = error
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+    def __repr__(self):
+        return f"<FetchResult {self.status} {self.url}>"
+
+
+class DownloadedFile(File):
+    """
+    A download streamed to disk, for FieldFile.save(). FileSystemStorage moves a
+    file with a temporary_file_path() into place instead of copying it, so the
+    bytes are written once. Keep the temporary file on the same filesystem as MEDIA_ROOT.
+    """
+
+    def __init__(self, path):
+        super().__init__(open(path, "rb"), name=os.path.basename(path))
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class Fetcher:
+    """
+    Downloads PDFs concurrently with a connection pool, per-host limits and
+    conditional GET. One Fetcher is meant to be shared by all scrapers of a run,
+    so the per-host limits hold across them. Use as a context manager, or call close().
+    """
+
+    def __init__(self, max_workers=None, per_host=None, timeout=None, user_agent=None, min_interval=None):
+        self.max_workers = max_workers or settings.SCRAPER_CONCURRENCY
+        self.per_host = per_host or settings.SCRAPER_PER_HOST_CONCURRENCY
+        self.min_interval = settings.SCRAPER_HOST_MIN_INTERVAL if min_interval is None else min_interval
+        self.timeout = timeout or settings.SCRAPER_TIMEOUT
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent or settings.SCRAPER_USER_AGENT
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['GET'], respect_retry_after_header=True)
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.host_slots = {}
+        self.host_next_start = {}
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.session.close()
+
+    @contextmanager
+    def _slot(self, url):
+        """Holds one of the host's concurrency slots, waiting for its turn under the rate limit."""
+        host = urlsplit(url).netloc.lower()
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            slot = self.host_slots[host]
+        with slot:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.host_next_start.get(host, now))
+                self.host_next_start[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+    def fetch(self, url, etag="", last_modified="", dest_dir=None):
+        """
+        Downloads one URL (blocking). Pass the stored validators for a conditional GET.
+        With dest_dir, the body is streamed to a temporary file there instead of
+        being held in memory.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        out = None
+        try:
+            with self._slot(url), self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304:
+                    return FetchResult(url, 'not_modified', etag=etag, last_modified=last_modified)
+                response.raise_for_status()
+                digest, size, blocks = hashlib.sha256(), 0, []
+                for block in response.iter_content(CHUNK_SIZE):
+                    # Listing links sometimes lead to an HTML landing page instead of the file
+                    if size == 0 and not block.startswith(b"%PDF"):
+                        return FetchResult(url, 'failed', error=f"not a PDF ({response.headers.get('Content-Type', '?')})")
+                    if dest_dir and out is None:
+                        os.makedirs(dest_dir, exist_ok=True)
+                        out = tempfile.NamedTemporaryFile(dir=dest_dir, suffix=".part", delete=False)
+                    digest.update(block)
+                    size += len(block)
+                    if out:
+                        out.write(block)
+                    else:
+                        blocks.append(block)
+            if size == 0:
+                return FetchResult(url, 'failed', error="empty response")
+            if out:
+                out.close()
+            return FetchResult(
+                url, 'fetched', content=None if out else b"".join(blocks),
+                etag=response.headers.get('ETag', ""),
+                last_modified=response.headers.get('Last-Modified', ""),
+                path=out.name if out else None, sha256=digest.hexdigest(), size=size
+            )
+        except (requests.RequestException, OSError) as e:
+            # OSError: the temporary file could not be written (disk full, permissions)
+            return FetchResult(url, 'failed', error=str(e))
+        finally:
+            # Only a successful download hands its file over to the caller
+            if out and not out.closed:
+                out.close()
+                os.remove(out.name)
+
+    def fetch_page(self, url):
+        """Downloads an HTML page (blocking). Returns its text, or None if the request failed."""
+        try:
+            with self._slot(url):
+                response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.text
+        except requests.RequestException as e:
+            print(f"   ⚠️ Could not load {url}: {e}")
+            return None
+
+    def fetch_all(self, jobs, dest_dir=None):
+        """
+        Downloads many URLs concurrently. jobs is an iterable of url strings or
+        (url, etag, last_modified) tuples. Yields FetchResults as they complete.
+        """
+        futures = []
+        for job in jobs:
+            url, etag, last_modified = (job, "", "") if isinstance(job, str) else job
+            futures.append(self.pool.submit(self.fetch, url, etag, last_modified, dest_dir))
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,40 @@
+"""
+What the scrapers already have, loaded once per crawl instead of one query
+per link: every stored source URL and alias URL, the hash of each URL's last
+download, and the content hash of every stored file. A set of a few thousand URLs takes well under a megabyte.
+Import after django.setup().
+"""
+from evidence_engine.models import SourceDocument, DocumentAlias
+
+
+class KnownDocuments:
+    """In-memory index of stored URLs and file hashes; add() keeps it current during the crawl."""
+
+    def __init__(self):
+        self.urls = set(SourceDocument.objects.exclude(source_url=None).values_list('source_url', flat=True))
+        self.urls.update(DocumentAlias.objects.values_list('url', flat=True))
+        self.hashes = dict(SourceDocument.objects.exclude(content_hash="").values_list('content_hash', 'id'))
+        self.hashes.update(SourceDocument.objects.exclude(fetched_hash="").values_list('fetched_hash', 'id'))
+        self.fetched = dict(
+            SourceDocument.objects.exclude(source_url=None).exclude(fetched_hash="").values_list('source_url', 'fetched_hash')
+        )
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    def __len__(self):
+        return len(self.urls)
+
+    def document_with_hash(self, sha256):
+        """ID of the stored document with this file hash, or None."""
+        return self.hashes.get(sha256)
+
+    def fetched_hash(self, url):
+        """Hash of the file last downloaded from this URL ("" if unknown)."""
+        return self.fetched.get(url, "")
+
+    def add(self, url, sha256="", doc_id=None):
+        self.urls.add(url)
+        if sha256 and doc_id is not None:
+            self.hashes.setdefault(sha256, doc_id)
+            self.fetched[url] = sha256
@@ -0,0 +1,98 @@
+"""
+A local HTTP server with fixed pages and files, for exercising the scrapers
+without the network (see scrapers/test_fetch.py). Answers conditional GETs
+with 304, can add a delay to every response, and records the highest number
+of requests it served at once.
+"""
+import time
+import hashlib
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class LocalSite:
+    """
+    Serves `pages` ({path: (body_bytes, content_type)}) on 127.0.0.1 at a free port.
+    Pages may be added or replaced while it runs.
+    """
+
+    def __init__(self, pages=None, delay=0.0):
+        self.pages = dict(pages or {})
+        self.delay = delay
+        self.last_modified = formatdate(time.time() - 3600, usegmt=True)
+        self.requests = []  # (path, status)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def set_page(self, path, body, content_type="application/pdf"):
+        self.pages[path] = (body, content_type)
+        self.last_modified = formatdate(time.time(), usegmt=True)
+
+    def etag(self, body):
+        return '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with site.lock:
+                    site.in_flight += 1
+                    site.max_in_flight = max(site.max_in_flight, site.in_flight)
+                try:
+                    if site.delay:
+                        time.sleep(site.delay)
+                    self._respond()
+                finally:
+                    with site.lock:
+                        site.in_flight -= 1
+
+            def _respond(self):
+                path = self.path.split("?")[0]
+                if path not in site.pages:
+                    site.requests.append((path, 404))
+                    self.send_error(404)
+                    return
+                body, content_type = site.pages[path]
+                etag = site.etag(body)
+                since = self.headers.get("If-Modified-Since")
+                not_modified = self.headers.get("If-None-Match") == etag or (
+                    since and "If-None-Match" not in self.headers
+                    and parsedate_to_datetime(since) >= parsedate_to_datetime(site.last_modified)
+                )
+                if not_modified:
+                    site.requests.append((path, 304))
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                site.requests.append((path, 200))
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", site.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,151 @@
+"""
+Checks ScrapeEngine.process_links (scrapers/engine.py) against a stub Fetcher
+in a throwaway database and media folder: files stored once, identical files
+kept as aliases, the KnownDocuments lookup, bulk insertion, re-fetches compared
+with the last downloaded file, and how often ingestion is queued.
+
+    python scrapers/test_engine.py
+"""
+import os
+import sys
+import hashlib
+import tempfile
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import fitz
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from evidence_engine.models import SourceDocument, DocumentAlias, BackgroundTask
+from scrapers import engine
+from scrapers.fetch import FetchResult
+from scrapers.known_documents import KnownDocuments
+
+
+class StubFetcher:
+    """Serves {url: bytes} like Fetcher.fetch_all(dest_dir=...), streaming each body to a temporary file."""
+
+    def __init__(self, files):
+        self.files = files
+        self.requested = []
+        self.broken = set()
+
+    def fetch_all(self, jobs, dest_dir=None):
+        for job in jobs:
+            url = job if isinstance(job, str) else job[0]
+            self.requested.append(url)
+            if url not in self.files:
+                yield FetchResult(url, 'failed', error="404")
+                continue
+            body = self.files[url]
+            os.makedirs(dest_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=dest_dir, suffix=".part", delete=False) as out:
+                out.write(body)
+            if url in self.broken:
+                # The download vanished before it could be stored (disk trouble)
+                os.remove(out.name)
+            yield FetchResult(url, 'fetched', path=out.name, sha256=hashlib.sha256(body).hexdigest(), size=len(body))
+
+    def close(self):
+        pass
+
+
+class Scraper:
+    authority = 'BNM'
+
+
+def make_pdf(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((40, 60), text)
+    return doc.tobytes()
+
+
+def ingest_tasks():
+    return BackgroundTask.objects.filter(kind='ingest_documents')
+
+
+def run_test():
+    print("=== SCRAPE ENGINE TEST ===")
+    workdir = tempfile.mkdtemp()
+    settings.DATABASES['default']['NAME'] = os.path.join(workdir, "db.sqlite3")
+    settings.MEDIA_ROOT = os.path.join(workdir, "media")
+    engine.DOWNLOAD_DIR = os.path.join(settings.MEDIA_ROOT, "incoming")
+    call_command('migrate', verbosity=0)
+
+    site = "https://bnm.example/documents/"
+    links = {site + "tawarruq.pdf": "Tawarruq", site + "ijarah.pdf": "Ijarah", site + "tawarruq-copy.pdf": "Tawarruq (copy)"}
+    tawarruq_pdf = make_pdf("Tawarruq policy")
+    fetcher = StubFetcher({
+        site + "tawarruq.pdf": tawarruq_pdf,
+        site + "ijarah.pdf": make_pdf("Ijarah policy"),
+        site + "tawarruq-copy.pdf": tawarruq_pdf,
+    })
+
+    # 1. New documents: each file stored once, the identical copy as an alias, one insert and one task
+    crawl = engine.ScrapeEngine(fetcher=fetcher, known=KnownDocuments())
+    with CaptureQueriesContext(connection) as queries:
+        saved, new_links = crawl.process_links(Scraper(), links)
+    inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "evidence_engine_sourcedocument"')]
+    assert (saved, new_links) == (2, 3) and len(inserts) == 1
+    docs = {doc.source_url: doc for doc in SourceDocument.objects.all()}
+    assert sorted(docs) == [site + "ijarah.pdf", site + "tawarruq.pdf"]
+    alias = DocumentAlias.objects.get()
+    assert alias.url == site + "tawarruq-copy.pdf" and alias.source_doc_id == docs[site + "tawarruq.pdf"].id
+    tawarruq, ijarah = docs[site + "tawarruq.pdf"], docs[site + "ijarah.pdf"]
+    with open(tawarruq.file_path.path, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == tawarruq.fetched_hash and not tawarruq.is_ingested
+    assert not os.listdir(engine.DOWNLOAD_DIR), "temporary downloads are moved or removed"
+    assert ingest_tasks().count() == 1 and len(ingest_tasks().get().payload['doc_ids']) == 2
+    print(f"{saved} documents stored with {len(inserts)} insert, 1 alias, 1 ingestion task")
+
+    # 2. The same page again: everything is known, nothing is fetched or queued
+    fetcher.requested.clear()
+    with CaptureQueriesContext(connection) as queries:
+        assert crawl.process_links(Scraper(), links) == (0, 0)
+    assert not fetcher.requested and not queries.captured_queries
+    assert ingest_tasks().count() == 1
+
+    # 3. Recheck in a new crawl: identical downloads are unchanged, compared with the last fetched file.
+    #    Ijarah was ingested; Tawarruq's ingestion failed, so it is queued again, but only once.
+    ingest_tasks().update(status=BackgroundTask.Status.FAILED)
+    SourceDocument.objects.filter(id=ijarah.id).update(is_ingested=True, content_hash="from an older file")
+    for _ in range(2):
+        crawl = engine.ScrapeEngine(fetcher=fetcher, known=KnownDocuments(), recheck=True)
+        assert crawl.process_links(Scraper(), links) == (0, 0)
+    queued = ingest_tasks().filter(status=BackgroundTask.Status.QUEUED)
+    assert [task.payload['doc_ids'] for task in queued] == [[str(tawarruq.id)]]
+    ijarah.refresh_from_db()
+    assert ijarah.file_path.name == docs[site + "ijarah.pdf"].file_path.name
+    print("Unchanged re-fetches: nothing stored; a document never ingested is queued again once")
+
+    # 4. A republished file replaces the stored one and its re-ingestion is queued
+    fetcher.files[site + "ijarah.pdf"] = make_pdf("Ijarah policy, revised")
+    crawl = engine.ScrapeEngine(fetcher=fetcher, known=KnownDocuments(), recheck=True)
+    crawl.process_links(Scraper(), links)
+    ijarah.refresh_from_db()
+    with open(ijarah.file_path.path, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == ijarah.fetched_hash
+    assert crawl.known.fetched_hash(site + "ijarah.pdf") == ijarah.fetched_hash
+    assert queued.filter(payload__doc_ids=[str(ijarah.id)]).count() == 1
+
+    # 5. One file that cannot be stored does not stop the rest of the page
+    more = {site + "wakalah.pdf": "Wakalah", site + "sukuk.pdf": "Sukuk", site + "gone.pdf": "Gone"}
+    fetcher.files[site + "wakalah.pdf"] = make_pdf("Wakalah policy")
+    fetcher.files[site + "sukuk.pdf"] = make_pdf("Sukuk policy")
+    fetcher.broken.add(site + "wakalah.pdf")
+    saved, new_links = crawl.process_links(Scraper(), more)
+    assert (saved, new_links) == (1, 3)
+    assert SourceDocument.objects.filter(source_url=site + "sukuk.pdf").exists()
+    assert not SourceDocument.objects.filter(source_url=site + "wakalah.pdf").exists()
+    print("A broken download is reported and skipped; the rest of the page is saved")
+
+    print("✅ All scrape engine checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
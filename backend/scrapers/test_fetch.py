@@ -0,0 +1,157 @@
+"""
+Checks the scraper's HTTP downloader and static listing discovery against a
+local server (no network): concurrency, the per-host limits, conditional GET,
+rejection of non-PDFs, pagination, stopping at known documents and the
+browser fallback.
+
+    python scrapers/test_fetch.py
+"""
+import os
+import sys
+import time
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+import fitz
+from scrapers.fetch import Fetcher
+from scrapers.local_site import LocalSite
+from scrapers.base import ListingScraper, parse_listing
+from scrapers.engine import ScrapeEngine
+
+
+def make_pdf(text):
+    doc = fitz.open()
+    doc.new_page().insert_text((40, 60), text)
+    return doc.tobytes()
+
+
+def run_test():
+    print("=== FETCHER TEST ===")
+    pages = {f"/documents/doc{i}.pdf": (make_pdf(f"Document {i}"), "application/pdf") for i in range(12)}
+    pages["/documents/landing"] = (b"<html>Not a PDF</html>", "text/html")
+
+    with LocalSite(pages, delay=0.2) as site, Fetcher(max_workers=8, per_host=3, min_interval=0) as fetcher:
+        urls = [site.url(path) for path in pages] + [site.url("/documents/missing.pdf")]
+
+        # 1. Concurrent download, limited per host
+        started = time.monotonic()
+        results = {r.url: r for r in fetcher.fetch_all(urls)}
+        elapsed = time.monotonic() - started
+        fetched = [r for r in results.values() if r.status == 'fetched']
+        print(f"Fetched {len(fetched)} PDFs in {elapsed:.2f}s, at most {site.max_in_flight} requests at once")
+        assert len(fetched) == 12
+        assert site.max_in_flight == 3, "per-host limit not applied"
+        assert elapsed < 12 * 0.2, "downloads did not overlap"
+        assert results[site.url("/documents/landing")].status == 'failed'
+        assert results[site.url("/documents/missing.pdf")].status == 'failed'
+
+        # 2. Conditional GET: unchanged files answer 304
+        first = results[site.url("/documents/doc0.pdf")]
+        again = fetcher.fetch(first.url, first.etag, first.last_modified)
+        assert again.status == 'not_modified' and again.content is None
+        print("Unchanged file: 304 Not Modified")
+
+        # 3. A republished file is downloaded again
+        site.set_page("/documents/doc0.pdf", make_pdf("Document 0, revised"))
+        again = fetcher.fetch(first.url, first.etag, first.last_modified)
+        assert again.status == 'fetched' and again.etag != first.etag
+        print("Republished file: fetched with a new ETag")
+
+    # 4. Requests to one host start at least min_interval apart
+    with LocalSite(pages) as site, Fetcher(max_workers=8, per_host=8, min_interval=0.1) as fetcher:
+        started = time.monotonic()
+        results = list(fetcher.fetch_all(site.url(f"/documents/doc{i}.pdf") for i in range(6)))
+        elapsed = time.monotonic() - started
+        print(f"6 requests at most 10/s: {elapsed:.2f}s")
+        assert all(r.status == 'fetched' for r in results) and elapsed >= 0.5
+
+    print("✅ All fetcher checks passed.")
+
+
+def listing(doc_numbers, next_link):
+    links = "".join(f'<li><a href="/documents/doc{i}.pdf">Policy Document {i} PDF</a></li>' for i in doc_numbers)
+    return f"<html><body><ul>{links}</ul><ul class='pagination'>{next_link}</ul></body></html>".encode()
+
+
+class LocalListing(ListingScraper):
+    """Test scraper reading a listing on the local server."""
+    authority = 'TEST'
+
+    def __init__(self, start_url, browser_pages=()):
+        self.start_url = start_url
+        self.browser_pages = browser_pages
+
+    def discover_browser(self):
+        yield from self.browser_pages
+
+
+class CountingEngine(ScrapeEngine):
+    """Engine whose database step is replaced by a set of known URLs (the real one: test_engine.py)."""
+
+    def __init__(self, fetcher):
+        super().__init__(fetcher=fetcher, known=set())
+        self.pages = []
+
+    def process_links(self, scraper, pdf_links):
+        self.pages.append(sorted(pdf_links))
+        new = [href for href in pdf_links if href not in self.known]
+        self.known.update(new)
+        return len(new), len(new)
+
+
+def run_discovery_test():
+    print("\n=== STATIC DISCOVERY TEST ===")
+    html = "text/html"
+    pages = {
+        "/listing": (listing(range(0, 4), '<li><a href="/listing/2">Next</a></li>'), html),
+        "/listing/2": (listing(range(4, 8), '<li><a href="/listing/3">Next &raquo;</a></li>'), html),
+        "/listing/3": (listing(range(8, 10), '<li class="disabled"><a href="#">Next</a></li>'), html),
+        "/js-listing": (listing(range(0, 2), '<a href="javascript:void(0)">Next</a>'), html),
+        "/empty": (b"<html><body><div id='app'></div></body></html>", html),
+    }
+    is_pdf = LocalListing(None).is_document_link
+
+    with LocalSite(pages) as site, Fetcher(min_interval=0) as fetcher:
+        # 1. Links, titles and pagination from plain HTML
+        pdf_links, next_url, needs_js = parse_listing(fetcher.fetch_page(site.url("/listing")), site.url("/listing"), is_pdf)
+        assert list(pdf_links) == [site.url(f"/documents/doc{i}.pdf") for i in range(4)]
+        assert pdf_links[site.url("/documents/doc0.pdf")] == "Policy Document 0"
+        assert next_url == site.url("/listing/2") and not needs_js
+        _, next_url, needs_js = parse_listing(fetcher.fetch_page(site.url("/listing/3")), site.url("/listing/3"), is_pdf)
+        assert next_url is None and not needs_js
+        _, next_url, needs_js = parse_listing(fetcher.fetch_page(site.url("/js-listing")), site.url("/js-listing"), is_pdf)
+        assert next_url is None and needs_js
+        print("Links, titles and 'Next' read from static HTML")
+
+        # 2. Full crawl, then repeat crawls that stop at known documents
+        engine = CountingEngine(fetcher)
+        started = time.monotonic()
+        total = engine.run_scraper(LocalListing(site.url("/listing")))
+        print(f"Full crawl: {total} documents from {len(engine.pages)} pages in {time.monotonic() - started:.2f}s")
+        assert total == 10 and len(engine.pages) == 3
+
+        site.set_page("/listing", listing([10, 0, 1, 2], '<li><a href="/listing/2">Next</a></li>'), html)
+        engine.pages.clear()
+        assert engine.run_scraper(LocalListing(site.url("/listing"))) == 1
+        assert len(engine.pages) == 2
+        engine.pages.clear()
+        assert engine.run_scraper(LocalListing(site.url("/listing"))) == 0
+        assert len(engine.pages) == 1
+        print("Repeat crawl stops at the first page with only known documents")
+
+        # 3. Listings rendered by JavaScript fall back to the browser
+        browser_page = {site.url("/documents/doc11.pdf"): "Policy Document 11"}
+        assert engine.run_scraper(LocalListing(site.url("/empty"), [browser_page])) == 1
+        engine.known.clear()
+        assert engine.run_scraper(LocalListing(site.url("/js-listing"), [browser_page])) == 3
+        print("JavaScript listings fall back to the browser")
+
+    print("✅ All discovery checks passed.")
+
+
+if __name__ == "__main__":
+    run_test()
+    run_discovery_test()
@@ -0,0 +1,90 @@
+"""
+Offline calibration of the extractive fast path thresholds.
+
+Reads a labelled JSONL eval set (one object per line):
+    {"query": "What is Tawarruq?", "expected": "purchase of an asset"}
+    {"query": "What is Wakalah?", "expected": null}
+
+'expected' is a substring a correct extracted sentence must contain; null means
+the question should go to the LLM. Retrieval runs once per query, then
+EXTRACTIVE_MAX_DISTANCE / EXTRACTIVE_MIN_MARGIN are swept and the most permissive
+pair that keeps precision above the target is recommended for settings.py.
+
+Usage: python tune_extractive.py [eval.jsonl] [target_precision]
+"""
+import os
+import sys
+import json
+import django
+import dotenv
+
+# Setup Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+dotenv.load_dotenv()
+
+from evidence_engine.rag_service import RAGService
+from evidence_engine.extractive import extract_answer, match_lookup
+
+DISTANCES = [0.15, 0.2, 0.25, 0.3, 0.35, 0.4, 0.45, 0.5]
+MARGINS = [0.0, 0.01, 0.02, 0.05, 0.1]
+
+
+def load_eval_set(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(cases, max_distance, min_margin):
+    answered = correct = 0
+    for case, hits in cases:
+        result = extract_answer(case["query"], hits, max_distance=max_distance, min_margin=min_margin)
+        if not result:
+            continue
+        answered += 1
+        expected = case.get("expected")
+        if expected and expected.lower() in result[0].lower():
+            correct += 1
+    precision = correct / answered if answered else 1.0
+    coverage = answered / len(cases) if cases else 0.0
+    return answered, correct, precision, coverage
+
+
+def tune(path, target_precision):
+    print(f"--- Tuning extractive thresholds on {path} ---")
+    rag = RAGService()
+
+    cases = []
+    for case in load_eval_set(path):
+        if not match_lookup(case["query"]):
+            print(f"  (not a lookup query, ignored) {case['query']}")
+            continue
+        cases.append((case, rag.search_db(case["query"])))
+    print(f"{len(cases)} lookup queries retrieved.\n")
+
+    print(f"{'distance':>8} {'margin':>7} {'answered':>8} {'correct':>7} {'precision':>9} {'coverage':>8}")
+    best = None
+    for max_distance in DISTANCES:
+        for min_margin in MARGINS:
+            answered, correct, precision, coverage = evaluate(cases, max_distance, min_margin)
+            print(f"{max_distance:>8.2f} {min_margin:>7.2f} {answered:>8} {correct:>7} {precision:>9.2%} {coverage:>8.2%}")
+            if answered and precision >= target_precision and (best is None or coverage > best[2]):
+                best = (max_distance, min_margin, coverage, precision)
+
+    if best:
+        print(f"\n✅ Recommended (precision {best[3]:.2%}, coverage {best[2]:.2%}):")
+        print(f"EXTRACTIVE_MAX_DISTANCE = {best[0]}")
+        print(f"EXTRACTIVE_MIN_MARGIN = {best[1]}")
+    else:
+        print(f"\n❌ No threshold reaches {target_precision:.0%} precision. Keep the fast path strict or disable it.")
+
+
+if __name__ == "__main__":
+    eval_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "extractive_eval.jsonl")
+    target = float(sys.argv[2]) if len(sys.argv) > 2 else 0.95
+    if not os.path.isfile(eval_path):
+        print(f"❌ Eval set not found: {eval_path}")
+        print("Write a labelled JSONL file (see the format at the top of this script) and pass its path.")
+        sys.exit(1)
+    tune(eval_path, target)
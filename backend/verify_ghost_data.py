@@ -1,9 +1,8 @@
 import os
 import django
 import sys
+import argparse
 import dotenv
-from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
 # Setup
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -11,59 +10,50 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 dotenv.load_dotenv()
 
-from evidence_engine.models import SourceDocument
+from evidence_engine.ingestion import get_vectorstore, CHROMA_DB_DIR
+from evidence_engine.consistency import check_consistency, repair
 
-def check_ghosts():
+def check_ghosts(fix=False, full=False):
     print("--- 👻 Ghostbuster: Checking for Dead Data ---")
-    
-    # 1. Get all valid IDs from SQL
-    valid_ids = set(str(uid) for uid in SourceDocument.objects.values_list('id', flat=True))
-    print(f"SQL Database has {len(valid_ids)} valid SourceDocuments.")
-    
-    # 2. Check Chroma
-    CHROMA_DB_DIR = os.path.join(os.path.dirname(__file__), 'evidence_engine', 'chroma_db')
-    # Or try the other path
-    if not os.path.exists(CHROMA_DB_DIR):
-        CHROMA_DB_DIR = os.path.join(os.path.dirname(__file__), 'chroma_db')
-        
     print(f"Checking ChromaDB at: {CHROMA_DB_DIR}")
-    
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    vectorstore = Chroma(
-        collection_name="al_muwathiq_standards",
-        embedding_function=embeddings,
-        persist_directory=CHROMA_DB_DIR
-    )
-    
-    # Peek
-    try:
-        # Get all metadatas
-        data = vectorstore.get(include=["metadatas"])
-        metadatas = data['metadatas']
-        print(f"ChromaDB has {len(metadatas)} chunks.")
-        
-        ghost_count = 0
-        checked_count = 0
-        
-        for m in metadatas:
-            if not m: continue
-            sid = m.get('source_doc_id')
-            if sid:
-                checked_count += 1
-                if sid not in valid_ids:
-                    ghost_count += 1
-                    if ghost_count <= 5:
-                        print(f"❌ Found Ghost Chunk! ID: {sid} (Source: {m.get('source_title', 'Unknown')})")
-        
-        if ghost_count > 0:
-            print(f"\n🚨 FOUND {ghost_count} GHOST CHUNKS out of {checked_count} checked.")
-            print("Explanation: The vector database contains references to files that were deleted from the SQL database.")
-            print("Solution: You MUST stop the server and run 'clean_and_ingest.py' again.")
-        else:
-            print("\n✅ No ghosts found. Data is consistent.")
-            
-    except Exception as e:
-        print(f"Error reading Chroma: {e}")
+
+    # Deleting or deactivating a SourceDocument now removes its chunks (evidence_engine/signals.py),
+    # so this mostly catches data left over from before that, or from failed runs.
+    vectorstore = get_vectorstore()
+    report = check_consistency(vectorstore, full=full)
+    print(f"ChromaDB has {report['total']} chunks; {report['checked']} documents changed since the last "
+          f"check were looked up, the rest compared by total count.")
+
+    if report['baselined']:
+        print(f"ℹ️  Recorded chunk counts for {len(report['baselined'])} documents ingested before counts were kept.")
+
+    for doc, expected, actual in report['mismatched'][:10]:
+        state = "active" if doc.is_active else "inactive"
+        print(f"❌ {doc.title} ({state}): expected {expected} chunks, found {actual}")
+    if len(report['mismatched']) > 10:
+        print(f"   ... and {len(report['mismatched']) - 10} more documents")
+
+    if report['ghost_ids']:
+        print(f"❌ Found {len(report['ghost_ids'])} ghost chunks belonging to deleted documents.")
+    if report['unattributed']:
+        print(f"ℹ️  {report['unattributed']} chunks have no source_doc_id (bulk-ingested by ingest.py); not checked.")
+
+    if not report['mismatched'] and not report['ghost_ids']:
+        print("\n✅ No ghosts found. Data is consistent.")
+        return
+
+    if fix:
+        task = repair(vectorstore, report)
+        print("\n🧹 Ghost chunks and leftovers of inactive documents removed.")
+        if task:
+            print(f"Queued re-ingestion of the affected active documents (task {task.id}); "
+                  f"run `python manage.py taskworker` if no worker is running.")
+    else:
+        print("\nRun again with --fix to delete ghost chunks and re-ingest the affected documents.")
 
 if __name__ == "__main__":
-    check_ghosts()
+    parser = argparse.ArgumentParser(description="Checks ChromaDB against the SourceDocument table.")
+    parser.add_argument("--fix", action="store_true", help="Repair what the check finds.")
+    parser.add_argument("--full", action="store_true", help="Look up every document, not only the changed ones.")
+    args = parser.parse_args()
+    check_ghosts(fix=args.fix, full=args.full)